@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_sellerprofile_rating_1_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_rendered',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+    ]
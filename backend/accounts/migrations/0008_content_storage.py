@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 14:19
+
+import core.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_variants_rendered'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='portfolioitem',
+            name='media_file',
+            field=models.FileField(storage=core.storage.get_content_storage, upload_to='portfolio_media/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'mp4', 'pdf', 'docx'])]),
+        ),
+    ]
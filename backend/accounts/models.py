@@ -5,6 +5,9 @@ from django.db import models
 from django.utils import timezone
 import datetime
 
+from core.storage import get_content_storage
+from reviews.models import RatingAggregate
+
 
 # -----------------------------
 # Custom User Model
@@ -30,6 +33,8 @@ class User(AbstractUser):
         blank=True,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]
     )
+    # Name of the picture whose variants are rendered, see core.derivatives
+    profile_picture_rendered = models.CharField(max_length=100, blank=True, default='', editable=False)
     is_email_verified = models.BooleanField(default=False, db_index=True)
     is_profile_set = models.BooleanField(default=False, db_index=True)
     date_joined = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -56,7 +61,7 @@ class User(AbstractUser):
 # Seller Profile Model
 # -----------------------------
 
-class SellerProfile(models.Model):
+class SellerProfile(RatingAggregate):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='seller_profile')
     profile_title = models.CharField(max_length=100, db_index=True)
     bio = models.TextField()
@@ -95,6 +100,7 @@ class PortfolioItem(models.Model):
     url_link = models.URLField(max_length=500, blank=True, null=True)
     media_file = models.FileField(
         upload_to='portfolio_media/',
+        storage=get_content_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'mp4', 'pdf', 'docx'])]
     )
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
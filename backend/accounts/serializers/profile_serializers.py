@@ -5,6 +5,8 @@ from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from ..models import SellerProfile, PortfolioItem, Education, Skill, Language
+from core.fields import ImageVariantsField
+from core.nested_writes import sync_nested
 
 User = get_user_model()
 
@@ -106,9 +108,41 @@ class PortfolioItemSerializer(serializers.ModelSerializer):
 # ===========================
 
 class UserSummarySerializer(serializers.ModelSerializer):
+    profile_picture_variants = ImageVariantsField(source='profile_picture', variant_set='avatar')
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'profile_picture', 'first_name', 'last_name']
+        fields = ['id', 'username', 'email', 'profile_picture', 'profile_picture_variants', 'first_name', 'last_name']
+        read_only_fields = fields
+
+class UserCardSerializer(serializers.ModelSerializer):
+    """Public name and avatar only, for gig cards"""
+    profile_picture_variants = ImageVariantsField(source='profile_picture', variant_set='avatar')
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'profile_picture', 'profile_picture_variants']
+        read_only_fields = fields
+
+class SellerProfileCardSerializer(serializers.ModelSerializer):
+    user = UserCardSerializer(read_only=True)
+
+    class Meta:
+        model = SellerProfile
+        fields = ['id', 'user']
+
+class SellerProfileSummarySerializer(serializers.ModelSerializer):
+    """Public seller card for the gig page; the counts are annotated by the view"""
+    user = UserCardSerializer(read_only=True)
+    active_gigs_count = serializers.IntegerField(read_only=True, default=0)
+    completed_orders_count = serializers.IntegerField(read_only=True, default=0)
+
+    class Meta:
+        model = SellerProfile
+        fields = [
+            'id', 'user', 'profile_title', 'bio', 'location', 'created_at',
+            'rating_average', 'rating_count', 'active_gigs_count', 'completed_orders_count',
+        ]
         read_only_fields = fields
 
 class SellerProfileMiniSerializer(serializers.ModelSerializer):
@@ -134,9 +168,10 @@ class SellerProfileSerializer(serializers.ModelSerializer):
             'id', 'user',
             'profile_title', 'bio', 'portfolio_link',
             'is_profile_complete', 'created_at',
+            'rating_average', 'rating_count',
             'educations', 'skills', 'languages', 'portfolio_items'
         ]
-        read_only_fields = ['id', 'user', 'is_profile_complete', 'created_at']
+        read_only_fields = ['id', 'user', 'is_profile_complete', 'created_at', 'rating_average', 'rating_count']
 
     def _check_profile_completeness(self, instance):
         required_fields = [
@@ -150,13 +185,18 @@ class SellerProfileSerializer(serializers.ModelSerializer):
         ]
         return all(required_fields) and all(required_relations)
 
+    # Natural keys used to match submitted items (which carry no id) to existing rows
+    RELATED_KEYS = {
+        'educations': ('institution_name', 'degree_title'),
+        'skills': ('name',),
+        'languages': ('name',),
+        'portfolio_items': ('title',),
+    }
+
     def _update_related_objects(self, instance, field_name, model_class, items_data):
         if items_data is None:
             return
-        related_manager = getattr(instance, field_name)
-        related_manager.all().delete()
-        for item_data in items_data:
-            related_manager.create(**item_data)
+        sync_nested(getattr(instance, field_name), items_data, key_fields=self.RELATED_KEYS[field_name])
 
     @transaction.atomic
     def update(self, instance, validated_data): 
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.versions import invalidate_versions
+from .models import User, SellerProfile, PortfolioItem, Education, Skill, Language
+
+
+def invalidate_seller_profiles(profile_ids):
+    invalidate_versions(f'seller:{profile_id}' for profile_id in profile_ids if profile_id)
+
+
+@receiver(post_save, sender=SellerProfile)
+@receiver(post_delete, sender=SellerProfile)
+def seller_profile_changed(sender, instance, **kwargs):
+    invalidate_seller_profiles([instance.pk])
+
+
+@receiver(post_save, sender=PortfolioItem)
+@receiver(post_delete, sender=PortfolioItem)
+@receiver(post_save, sender=Education)
+@receiver(post_delete, sender=Education)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def seller_profile_item_changed(sender, instance, **kwargs):
+    invalidate_seller_profiles([instance.profile_id])
+
+
+@receiver(pre_save, sender=User)
+def remember_seller_flag(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._was_seller = False
+        return
+    instance._was_seller = User.objects.filter(pk=instance.pk, is_seller=True).exists()
+
+
+@receiver(post_save, sender=User)
+def seller_user_changed(sender, instance, **kwargs):
+    """
+    Public profiles embed the user's name and picture, and are only public
+    while the user is a seller, so a switch of role either way counts too.
+    """
+    if instance.is_seller or getattr(instance, '_was_seller', False):
+        invalidate_seller_profiles(SellerProfile.objects.filter(user=instance).values_list('pk', flat=True))
@@ -1,3 +1,29 @@
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from core.versions import get_versions
+from .models import User, SellerProfile
+
+
+class SellerRoleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('seller', 'seller@example.com', 'password123', is_seller=True)
+        self.scope = f'seller:{SellerProfile.objects.create(user=self.user, profile_title="Seller", bio="Bio").pk}'
+
+    def assert_profile_invalidated(self, change):
+        before = get_versions([self.scope])
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertNotEqual(get_versions([self.scope]), before)
+
+    def test_leaving_the_seller_role_invalidates_the_profile(self):
+        self.user.is_seller = False
+        self.assert_profile_invalidated(self.user.save)
+
+    def test_becoming_a_seller_again_invalidates_the_profile(self):
+        User.objects.filter(pk=self.user.pk).update(is_seller=False)
+        self.user.refresh_from_db()
+        self.user.is_seller = True
+        self.assert_profile_invalidated(self.user.save)
@@ -14,6 +14,8 @@ from .models import SellerProfile
 from .serializers.profile_serializers import SellerProfileSerializer
 from .serializers.auth_serializers import CustomUserDetailsSerializer
 from .permissions import IsSeller, IsSellerProfileOwner
+from core.conditional import conditional_get
+from core.versions import versions_etag
 
 from django.utils import timezone
 from django.db.models import Sum
@@ -89,6 +91,13 @@ class PublicSellerProfileBySellerIdView(generics.RetrieveAPIView):
 
     def get_serializer_context(self):
         return {'request': self.request}
+
+    def get_etag(self, request, *args, **kwargs):
+        return versions_etag([f"seller:{self.kwargs['seller_id']}"])
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
     
 class PublicSellerProfileByUsernameView(generics.RetrieveAPIView):
     serializer_class = SellerProfileSerializer
@@ -102,6 +111,20 @@ class PublicSellerProfileByUsernameView(generics.RetrieveAPIView):
     def get_serializer_context(self):
         return {'request': self.request}
 
+    def get_etag(self, request, *args, **kwargs):
+        profile_id = (
+            SellerProfile.objects.filter(user__username=self.kwargs['username'], user__is_seller=True)
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if profile_id is None:
+            return None
+        return versions_etag([f'seller:{profile_id}'])
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 
 # ==========================
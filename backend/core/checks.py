@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PER_PROCESS_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Version counters and cached responses must be seen by every worker."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PER_PROCESS_BACKENDS:
+        return []
+    return [Warning(
+        "The default cache is not shared between processes.",
+        hint=(
+            "Cache invalidation (core.versions) only reaches the process that made the "
+            "write, so other workers keep serving stale responses. Configure Redis or "
+            "Memcached in CACHES."
+        ),
+        id='core.W001',
+    )]
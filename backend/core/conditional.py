@@ -0,0 +1,36 @@
+"""
+Conditional GET for DRF views.
+
+Validators are computed before the view runs, from version counters or
+other cheap lookups, so a ``304 Not Modified`` skips serialization and the
+queries behind the body.
+"""
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from rest_framework import status
+
+
+def conditional_get(view_method):
+    """
+    Answer If-None-Match on a GET view method. The view provides
+    ``get_etag(request, *args, **kwargs)``, which may return ``None`` to skip.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_method(self, request, *args, **kwargs)
+
+        etag = self.get_etag(request, *args, **kwargs)
+        if etag is not None:
+            not_modified = get_conditional_response(request._request, etag=etag)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                return not_modified
+
+        response = view_method(self, request, *args, **kwargs)
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    return wrapper
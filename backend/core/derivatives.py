@@ -0,0 +1,63 @@
+"""
+Resized variants of uploaded images.
+
+``generate_image_variants`` renders WebP and JPEG variants for each size in
+``IMAGE_VARIANTS``, plus a tiny placeholder to show while the real image
+loads, for every uploaded image that has none yet. It runs from cron (e.g.
+every minute) with its own process pool, so neither requests nor web worker
+processes do any image work.
+
+Variant names are derived from the original's name (see
+``core.images.variant_name``). Each image field has a ``<field>_rendered``
+column next to it, holding the name of the file whose variants exist; the
+command sets it once the whole set is written. Serializers compare the two,
+so building variant URLs costs no storage calls, and a replaced file counts
+as not rendered until the command has caught up with it.
+
+Rendering writes straight to disk next to the original, so it needs a
+storage backend with local paths (FileSystemStorage).
+"""
+from django.conf import settings
+
+from .images import FORMATS, PLACEHOLDER_FORMAT, variant_name
+
+# Target widths per variant set. "default" serves gig and category media,
+# "avatar" serves profile pictures.
+IMAGE_VARIANTS = {
+    'default': {'card': 480, 'retina': 960, 'detail': 1280},
+    'avatar': {'card': 96, 'retina': 192, 'detail': 400},
+}
+PLACEHOLDER_WIDTH = 24
+
+
+def get_variant_widths(variant_set):
+    return getattr(settings, 'IMAGE_VARIANTS', IMAGE_VARIANTS)[variant_set]
+
+
+def rendered_field_name(field_name):
+    """The column recording which file of ``field_name`` has its variants rendered."""
+    return f'{field_name}_rendered'
+
+
+def is_rendered(instance, field_name):
+    field_file = getattr(instance, field_name)
+    return bool(field_file) and getattr(instance, rendered_field_name(field_name)) == field_file.name
+
+
+def variant_urls(field_file, variant_set='default', build_url=None):
+    """
+    ``{'card': {'webp': url, 'jpeg': url}, ..., 'placeholder': url}`` for a
+    file whose variants are rendered (see ``is_rendered``).
+    """
+    storage = field_file.storage
+    build_url = build_url or (lambda url: url)
+
+    def url_for(variant, extension):
+        return build_url(storage.url(variant_name(field_file.name, variant, extension)))
+
+    urls = {
+        variant: {extension: url_for(variant, extension) for extension in FORMATS}
+        for variant in get_variant_widths(variant_set)
+    }
+    urls['placeholder'] = url_for('placeholder', PLACEHOLDER_FORMAT)
+    return urls
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+
+from .derivatives import is_rendered, variant_urls
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only URLs of the resized variants of an image field (see core.derivatives).
+    ``None`` until the variants of the current file have been rendered; clients
+    then fall back to the original. Reads the field's ``<field>_rendered``
+    column, so querysets limited with only() must load it too.
+    """
+
+    def __init__(self, variant_set='default', **kwargs):
+        self.variant_set = variant_set
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if not is_rendered(instance, self.source):
+            # Serialized as None without calling to_representation()
+            return None
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        build_url = request.build_absolute_uri if request is not None else None
+        return variant_urls(value, self.variant_set, build_url)
@@ -0,0 +1,152 @@
+"""
+Homepage snapshot.
+
+``/api/core/home/`` returns everything the homepage needs in one response:
+the category tree with active gig counts, featured gigs and trending gigs.
+The response is built ahead of time and kept in the cache, so serving it
+reads one cache entry and never touches the database.
+
+The snapshot records the version counters it was built from (see
+core.versions). A request that finds them moved, because a gig or category
+was written since, or finds the snapshot older than
+``HOME_SNAPSHOT_INTERVAL`` seconds, still gets the snapshot it found, and
+starts a rebuild on a background thread. A cache lock lets at most one
+rebuild start every ``HOME_SNAPSHOT_MIN_INTERVAL`` seconds across all
+processes. ``build_home_snapshot`` rebuilds it from cron, or before the first
+request after a deploy.
+
+Builds from requests take the same short lock as gigs.cache.get_or_compute,
+so only one runs at a time: a rebuild that finds it taken is skipped, and on
+a cold cache the other requests wait briefly for the snapshot instead of all
+building it.
+
+The snapshot is shared by every visitor, so cards carry no ``is_saved`` flag
+and media URLs are not made absolute.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from gigs.cache import LOCK_SUFFIX, LOCK_TIMEOUT, WAIT_ATTEMPTS, WAIT_INTERVAL
+from gigs.models import Category, Gig, SubCategory
+from gigs.serializers import CategorySerializer, GigCardSerializer, SubCategorySerializer
+from gigs.trending import trending_gig_ids
+from .versions import get_versions
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'core:home'
+REBUILD_LOCK_KEY = 'core:home:rebuild'
+BUILD_LOCK_KEY = SNAPSHOT_KEY + LOCK_SUFFIX
+SCOPES = ['gigs', 'taxonomy', 'trending']
+CARD_FIELDS = [name for name in GigCardSerializer.Meta.fields if name != 'is_saved']
+
+_executor = None
+
+
+def get_interval():
+    return getattr(settings, 'HOME_SNAPSHOT_INTERVAL', 5 * 60)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='home-snapshot')
+    return _executor
+
+
+def category_tree():
+    """Active categories with their subcategories, each with its number of active gigs."""
+    active_gigs = Q(gig__status='active')
+    subcategories = {}
+    for subcategory in SubCategory.objects.annotate(gig_count=Count('gig', filter=active_gigs)).order_by('name'):
+        data = SubCategorySerializer(subcategory).data
+        data['gig_count'] = subcategory.gig_count
+        subcategories.setdefault(subcategory.category_id, []).append(data)
+
+    tree = []
+    categories = Category.objects.filter(is_active=True).annotate(gig_count=Count('gig', filter=active_gigs))
+    for category in categories.order_by('name'):
+        data = CategorySerializer(category).data
+        data['gig_count'] = category.gig_count
+        data['subcategories'] = subcategories.get(category.pk, [])
+        tree.append(data)
+    return tree
+
+
+def gig_cards(queryset, limit):
+    queryset = GigCardSerializer.setup_eager_loading(queryset, CARD_FIELDS)
+    return GigCardSerializer(list(queryset[:limit]), many=True, fields=CARD_FIELDS).data
+
+
+def build_snapshot():
+    """Build the homepage data, store it and return it."""
+    # Read before the queries, so a write made during the build leaves it stale
+    versions = get_versions(SCOPES)
+    limit = getattr(settings, 'HOME_GIG_LIMIT', 12)
+    active = Gig.objects.active()
+    trending_ids = trending_gig_ids()[:limit]
+    data = {
+        'categories': category_tree(),
+        'featured_gigs': gig_cards(active.filter(is_featured=True).order_by('-popularity_score', '-id'), limit),
+        'trending_gigs': gig_cards(active.filter(pk__in=trending_ids).order_by('-trending_score', '-id'), limit),
+        'generated_at': timezone.now().isoformat(),
+    }
+    cache.set(SNAPSHOT_KEY, {'data': data, 'versions': versions, 'built_at': time.time()}, None)
+    return data
+
+
+def build_snapshot_once():
+    """Build the snapshot unless another worker is building it; ``None`` if one is."""
+    if not cache.add(BUILD_LOCK_KEY, 1, LOCK_TIMEOUT):
+        return None
+    try:
+        return build_snapshot()
+    finally:
+        cache.delete(BUILD_LOCK_KEY)
+
+
+def _rebuild_in_background():
+    try:
+        build_snapshot_once()
+    except Exception:
+        logger.exception("Rebuilding the homepage snapshot failed; the previous one is still served")
+    finally:
+        # The thread's connection is not closed by the request cycle
+        connection.close()
+
+
+def schedule_rebuild():
+    min_interval = getattr(settings, 'HOME_SNAPSHOT_MIN_INTERVAL', 10)
+    # The lock is left to expire, which spaces rebuilds out under a burst of writes
+    if cache.add(REBUILD_LOCK_KEY, 1, min_interval):
+        get_executor().submit(_rebuild_in_background)
+
+
+def _build_cold():
+    # Nothing to serve yet: one request builds, the others wait for its snapshot
+    data = build_snapshot_once()
+    if data is not None:
+        return data
+    for _ in range(WAIT_ATTEMPTS):
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(SNAPSHOT_KEY)
+        if entry is not None:
+            return entry['data']
+    return build_snapshot()
+
+
+def get_home_snapshot():
+    entry = cache.get(SNAPSHOT_KEY)
+    if entry is None:
+        return _build_cold()
+    if entry['versions'] != get_versions(SCOPES) or time.time() - entry['built_at'] > get_interval():
+        schedule_rebuild()
+    return entry['data']
+
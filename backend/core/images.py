@@ -0,0 +1,78 @@
+"""
+Image derivative rendering.
+
+Runs inside the image worker processes, so it only depends on Pillow and the
+standard library: no Django settings or models are touched here.
+"""
+import os
+import uuid
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+PLACEHOLDER_FORMAT = 'jpeg'
+PLACEHOLDER_QUALITY = 40
+
+
+def variant_name(name, variant, extension):
+    """``gig_thumbnails/logo.png`` -> ``gig_thumbnails/logo__card.webp``"""
+    root, _ = os.path.splitext(name)
+    return f'{root}__{variant}.{extension}'
+
+
+def _save(image, path, options):
+    # Write under a temporary name so readers never see a half-written file;
+    # it is unique because two jobs may render the same image at once
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    image.save(tmp_path, **options)
+    os.replace(tmp_path, path)
+
+
+def _resized(image, width):
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def render_variants(source_path, widths, placeholder_width):
+    """
+    Write every ``<source>__<variant>.<format>`` file that does not exist yet
+    next to ``source_path``. ``widths`` maps variant names to target widths;
+    images are never upscaled. Returns the paths written.
+    """
+    outputs = {
+        (variant, extension): variant_name(source_path, variant, extension)
+        for variant in widths
+        for extension in FORMATS
+    }
+    placeholder_path = variant_name(source_path, 'placeholder', PLACEHOLDER_FORMAT)
+    missing = {key: path for key, path in outputs.items() if not os.path.exists(path)}
+    if not missing and os.path.exists(placeholder_path):
+        return []
+
+    try:
+        with Image.open(source_path) as original:
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError):
+        return []
+    rgb = image.convert('RGB')
+    # WebP keeps transparency, JPEG cannot
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    sources = {'jpeg': rgb, 'webp': image.convert('RGBA') if has_alpha else rgb}
+
+    written = []
+    for (variant, extension), path in missing.items():
+        _save(_resized(sources[extension], widths[variant]), path, FORMATS[extension])
+        written.append(path)
+
+    # Written last: its presence means every variant is in place
+    if not os.path.exists(placeholder_path):
+        placeholder = _resized(rgb, placeholder_width)
+        _save(placeholder, placeholder_path, {'format': 'JPEG', 'quality': PLACEHOLDER_QUALITY})
+        written.append(placeholder_path)
+    return written
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Model
+
+
+def pk_chunks(queryset, chunk_size):
+    """
+    Yield the rows of ``queryset`` in primary key order, ``chunk_size`` at a
+    time. Each chunk is read with ``pk > last pk``, so it costs the same on
+    the last chunk as on the first. Rows may be model instances, flat
+    ``values_list`` pks or ``values_list`` tuples starting with the pk.
+    """
+    queryset = queryset.order_by('pk')
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield chunk
+        last = chunk[-1]
+        last_pk = last.pk if isinstance(last, Model) else last[0] if isinstance(last, tuple) else last
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+
+
+class ChunkedCommand(BaseCommand):
+    """A command that walks tables with ``pk_chunks``, taking ``--chunk-size``."""
+
+    chunk_size = 1000
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=self.chunk_size)
+
+    def chunks(self, queryset, options):
+        return pk_chunks(queryset, options['chunk_size'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.home import build_snapshot
+
+
+class Command(BaseCommand):
+    help = "Rebuild the cached homepage snapshot served by /api/core/home/, e.g. from cron or after a deploy."
+
+    def handle(self, *args, **options):
+        data = build_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Homepage snapshot built: {len(data['categories'])} categories, "
+            f"{len(data['featured_gigs'])} featured and {len(data['trending_gigs'])} trending gigs."
+        ))
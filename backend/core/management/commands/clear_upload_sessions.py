@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete upload sessions that saw no chunk within UPLOAD_SESSION_TTL, along with their part files."
+
+    def handle(self, *args, **options):
+        ttl = getattr(settings, 'UPLOAD_SESSION_TTL', 60 * 60 * 24)
+        expired = UploadSession.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=ttl))
+
+        total = 0
+        for session in expired.iterator():
+            session.discard()
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired upload sessions."))
@@ -0,0 +1,106 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db.models import F
+
+from accounts.models import User
+from core.derivatives import PLACEHOLDER_WIDTH, get_variant_widths, rendered_field_name
+from core.images import PLACEHOLDER_FORMAT, render_variants, variant_name
+from core.management.base import ChunkedCommand
+from core.versions import bump_versions
+from gigs.models import Category, Gig, GigGallery
+
+logger = logging.getLogger(__name__)
+
+
+def image_sources():
+    """``(queryset, image field, variant set, extra columns, scopes for a row)`` per image field."""
+    return [
+        (
+            Gig.objects.all(), 'thumbnail_image', 'default', ['category_id'],
+            lambda pk, category_id: ['gigs', f'gig:{pk}', f'category:{category_id}'],
+        ),
+        (
+            GigGallery.objects.filter(media_type='image'), 'media_file', 'default', ['gig_id'],
+            lambda pk, gig_id: [f'gig:{gig_id}'],
+        ),
+        (
+            Category.objects.all(), 'image', 'default', [],
+            lambda pk: ['taxonomy'],
+        ),
+        (
+            User.objects.all(), 'profile_picture', 'avatar', ['seller_profile__pk'],
+            lambda pk, profile_id: ['gigs', f'seller:{profile_id}'] if profile_id else [],
+        ),
+    ]
+
+
+def with_files(queryset, field, rendered=True):
+    """Rows with a file; ``rendered=False`` leaves out those whose variants are rendered."""
+    queryset = queryset.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+    if not rendered:
+        queryset = queryset.exclude(**{rendered_field_name(field): F(field)})
+    return queryset
+
+
+class Command(ChunkedCommand):
+    help = (
+        "Render the resized variants of uploaded images that have none yet, e.g. "
+        "every minute from cron. --all re-checks every image and renders missing files."
+    )
+
+    chunk_size = 200
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--all', action='store_true', help="Also re-check images already marked as rendered.")
+
+    def handle(self, *args, **options):
+        # spawn: the workers only need Pillow, not a forked copy of Django and its connections
+        executor = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        total = 0
+        with executor:
+            for queryset, field, variant_set, extra, scopes_for in image_sources():
+                total += self.render_field(executor, queryset, field, variant_set, extra, scopes_for, options)
+        self.stdout.write(self.style.SUCCESS(f"Rendered variants for {total} images."))
+
+    def render_field(self, executor, queryset, field, variant_set, extra, scopes_for, options):
+        model = queryset.model
+        storage = model._meta.get_field(field).storage
+        widths = get_variant_widths(variant_set)
+        rows = with_files(queryset, field, rendered=options['all']).values_list('pk', field, *extra)
+
+        total = 0
+        for chunk in self.chunks(rows, options):
+            try:
+                paths = [storage.path(name) for _, name, *_ in chunk]
+            except NotImplementedError:
+                logger.warning("Image variants need a storage with local paths; skipping %s", field)
+                return total
+            jobs = [executor.submit(render_variants, path, widths, PLACEHOLDER_WIDTH) for path in paths]
+
+            scopes = set()
+            for (pk, name, *values), path, job in zip(chunk, paths, jobs):
+                job.result()
+                # The placeholder is written last, so it marks a complete set
+                if not os.path.exists(variant_name(path, 'placeholder', PLACEHOLDER_FORMAT)):
+                    logger.warning("Could not render the variants of %s", name)
+                    continue
+                # A file replaced in the meantime stays pending
+                marked = (
+                    model.objects.filter(pk=pk, **{field: name})
+                    .exclude(**{rendered_field_name(field): name})
+                    .update(**{rendered_field_name(field): name})
+                )
+                if marked:
+                    total += 1
+                    scopes.update(scopes_for(pk, *values))
+            # Responses cached before the variants existed left them out
+            bump_versions(scopes)
+        return total
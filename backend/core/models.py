@@ -1,3 +1,59 @@
+import os
+import uuid
+
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+from .uploads import get_upload_dir
+
+
+class UploadSession(models.Model):
+    """
+    A file being uploaded in chunks. Received bytes are appended to a part file
+    outside MEDIA_ROOT; ``offset`` is how many of them have been stored, so a
+    client that lost its connection resumes from there.
+    """
+    TARGET_CHOICES = [
+        ('gig_gallery', 'Gig gallery'),
+        ('portfolio_item', 'Portfolio item'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def part_path(self):
+        return os.path.join(get_upload_dir(), f'{self.pk}.part')
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    def discard(self):
+        """Delete the session and whatever was received."""
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
+        self.delete()
+
+
+class StoredBlob(models.Model):
+    """A file in core.storage.ContentAddressedStorage and how many field values point at it."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
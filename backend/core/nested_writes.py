@@ -0,0 +1,128 @@
+"""
+Diff-based writes for nested collections (a gig's packages, a profile's skills...).
+
+``sync_nested`` compares the submitted items with the rows already in the
+collection and only writes what differs. Whatever the collection size that is at
+most one ``bulk_update``, one ``bulk_create`` and one ``delete``; an
+unchanged collection costs the single read.
+
+Items are matched to rows by ``id`` when they carry one, otherwise by the
+collection's natural key (e.g. a skill's ``name``), so clients that do not
+round-trip ids still update rows in place instead of replacing them.
+"""
+from dataclasses import dataclass, field as dataclass_field
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils import timezone
+
+from .signals import release_file
+
+
+@dataclass
+class NestedDiff:
+    created: list = dataclass_field(default_factory=list)
+    updated: list = dataclass_field(default_factory=list)
+    deleted: list = dataclass_field(default_factory=list)
+    unchanged: list = dataclass_field(default_factory=list)
+
+    @property
+    def changed(self):
+        return bool(self.created or self.updated or self.deleted)
+
+
+def writable_fields(model, parent_field):
+    """Concrete fields an item may set: not the pk, the parent FK or auto timestamps."""
+    fields = {}
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.name == parent_field or not field.editable:
+            continue
+        fields[field.name] = field
+        fields[field.attname] = field
+    return fields
+
+
+def coerce_pk(model, value):
+    if value in (None, ''):
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except ValidationError:
+        return None
+
+
+def is_file_reference(field, value):
+    """Clients echo stored files back as URLs; only an actual upload replaces a file."""
+    return isinstance(field, models.FileField) and isinstance(value, str)
+
+
+def sync_nested(manager, items, key_fields=(), delete_missing=True):
+    """
+    Make the rows behind the reverse FK ``manager`` match ``items`` (a list of dicts).
+
+    Rows matched by ``id`` or ``key_fields`` are updated when a value differs,
+    unmatched items are created and, with ``delete_missing``, rows no item
+    matched are deleted. Unknown keys in the items are ignored.
+    """
+    model = manager.model
+    parent_field = manager.field.name
+    parent = manager.instance
+    fields = writable_fields(model, parent_field)
+
+    existing = list(manager.all())
+    by_id = {row.pk: row for row in existing}
+    by_key = {}
+    if key_fields:
+        for row in existing:
+            by_key.setdefault(tuple(getattr(row, name) for name in key_fields), row)
+
+    diff = NestedDiff()
+    update_fields = set()
+    for item in items:
+        values = {
+            fields[name].attname: fields[name].to_python(value)
+            for name, value in item.items()
+            if name in fields and not is_file_reference(fields[name], value)
+        }
+        row = by_id.get(coerce_pk(model, item.get('id')))
+        if row is None and key_fields and all(name in values for name in key_fields):
+            row = by_key.get(tuple(values[name] for name in key_fields))
+        if row is None or row.pk not in by_id:
+            diff.created.append(model(**{parent_field: parent}, **values))
+            continue
+
+        del by_id[row.pk]
+        changed = [name for name, value in values.items() if getattr(row, name) != value]
+        if not changed:
+            diff.unchanged.append(row)
+            continue
+        for name in changed:
+            if isinstance(fields[name], models.FileField):
+                # bulk_update sends no pre_save, so release the replaced file here
+                release_file(fields[name], getattr(row, name).name)
+            setattr(row, name, values[name])
+        update_fields.update(changed)
+        diff.updated.append(row)
+
+    if diff.updated:
+        # bulk_update skips pre_save, which is what stamps auto_now fields and
+        # stores newly uploaded files, so do both here
+        write_fields = [model._meta.get_field(name) for name in sorted(update_fields)]
+        auto_now_fields = [field for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)]
+        now = timezone.now()
+        for row in diff.updated:
+            for field in auto_now_fields:
+                setattr(row, field.attname, now)
+            for field in write_fields:
+                if isinstance(field, models.FileField):
+                    field.pre_save(row, add=False)
+        model.objects.bulk_update(diff.updated, [field.name for field in write_fields + auto_now_fields])
+
+    if diff.created:
+        model.objects.bulk_create(diff.created)
+
+    if delete_missing and by_id:
+        diff.deleted = list(by_id.values())
+        model.objects.filter(pk__in=list(by_id)).delete()
+
+    return diff
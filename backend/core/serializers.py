@@ -0,0 +1,115 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.utils.text import get_valid_filename
+from rest_framework import serializers
+
+from accounts.models import PortfolioItem
+from accounts.serializers.profile_serializers import PortfolioItemSerializer
+from gigs.models import Gig, GigGallery
+from gigs.serializers import GigGallerySerializer
+from .models import UploadSession
+from .uploads import get_chunk_size, get_max_upload_size
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    expires_at = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'target', 'filename', 'size', 'chunk_size', 'offset', 'created_at', 'expires_at']
+        read_only_fields = ['id', 'chunk_size', 'offset', 'created_at']
+
+    def get_expires_at(self, obj):
+        return obj.updated_at + timedelta(seconds=getattr(settings, 'UPLOAD_SESSION_TTL', 60 * 60 * 24))
+
+    def validate_filename(self, value):
+        name = get_valid_filename(os.path.basename(value))
+        if not name:
+            raise serializers.ValidationError("Invalid file name.")
+        return name
+
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("The file is empty.")
+        if value > get_max_upload_size():
+            raise serializers.ValidationError(f"File too large. Should not exceed {get_max_upload_size()} bytes.")
+        return value
+
+    def validate(self, data):
+        # Fail before any byte is sent when the target field would reject the name
+        field = ATTACH_SERIALIZERS[data['target']].Meta.file_field
+        try:
+            field.run_validators(File(None, name=data['filename']))
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'filename': e.messages})
+        return data
+
+    def create(self, validated_data):
+        validated_data['user'] = self.context['request'].user
+        validated_data['chunk_size'] = get_chunk_size()
+        return super().create(validated_data)
+
+
+class GigGalleryAttachSerializer(serializers.Serializer):
+    """Adds the uploaded file to one of the user's gigs as a new gallery item."""
+    gig = serializers.PrimaryKeyRelatedField(queryset=Gig.objects.all())
+    media_type = serializers.ChoiceField(choices=GigGallery.MEDIA_TYPE_CHOICES)
+
+    class Meta:
+        file_field = GigGallery._meta.get_field('media_file')
+        output_serializer = GigGallerySerializer
+
+    def validate_gig(self, gig):
+        if gig.seller.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("You can only add media to your own gigs.")
+        return gig
+
+    def attach(self, file):
+        return GigGallery.objects.create(media_file=file, **self.validated_data)
+
+
+class PortfolioItemAttachSerializer(serializers.Serializer):
+    """Sets the media of an existing portfolio item, or creates one with ``title`` and ``description``."""
+    portfolio_item = serializers.PrimaryKeyRelatedField(queryset=PortfolioItem.objects.all(), required=False)
+    title = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(required=False)
+
+    class Meta:
+        file_field = PortfolioItem._meta.get_field('media_file')
+        output_serializer = PortfolioItemSerializer
+
+    def validate_portfolio_item(self, item):
+        if item.profile.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("You can only update your own portfolio.")
+        return item
+
+    def validate(self, data):
+        if 'portfolio_item' not in data:
+            if not hasattr(self.context['request'].user, 'seller_profile'):
+                raise serializers.ValidationError("Create a seller profile first.")
+            missing = {name: "This field is required." for name in ('title', 'description') if not data.get(name)}
+            if missing:
+                raise serializers.ValidationError(missing)
+        return data
+
+    def attach(self, file):
+        item = self.validated_data.get('portfolio_item')
+        if item is None:
+            item = PortfolioItem(
+                profile=self.context['request'].user.seller_profile,
+                title=self.validated_data['title'],
+                description=self.validated_data['description'],
+            )
+        item.media_file = file
+        item.save()
+        return item
+
+
+ATTACH_SERIALIZERS = {
+    'gig_gallery': GigGalleryAttachSerializer,
+    'portfolio_item': PortfolioItemAttachSerializer,
+}
@@ -0,0 +1,102 @@
+from functools import lru_cache, partial
+
+from django.apps import apps
+from django.core.signals import request_finished
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .storage import ContentAddressedStorage, get_content_storage
+
+# Instance attribute holding the file names a row was loaded or last saved with
+STORED_NAMES_ATTR = '_stored_file_names'
+
+
+@lru_cache(maxsize=None)
+def counted_file_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def release_file(field, name):
+    """Drop the reference ``field`` held to ``name`` once the transaction commits."""
+    if name and isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage):
+        transaction.on_commit(partial(field.storage.delete, name))
+
+
+def release_stored_files(sender, instance, **kwargs):
+    """A deleted row no longer references its files (see core.storage)."""
+    for field in counted_file_fields(sender):
+        file = getattr(instance, field.attname)
+        if file:
+            release_file(field, file.name)
+
+
+def file_names(instance, fields):
+    """``{attname: name}`` of the given fields, leaving out deferred ones; nothing is loaded."""
+    names = {}
+    for field in fields:
+        if field.attname in instance.__dict__:
+            value = instance.__dict__[field.attname]
+            names[field.attname] = getattr(value, 'name', value) or None
+    return names
+
+
+def remember_stored_files(sender, instance, **kwargs):
+    """Note the file names a row was loaded with, so saves can tell whether they changed."""
+    setattr(instance, STORED_NAMES_ATTR, file_names(instance, counted_file_fields(sender)))
+
+
+def release_replaced_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    """A row whose file was replaced or cleared no longer references the old one."""
+    if raw or instance._state.adding:
+        return
+    remembered = getattr(instance, STORED_NAMES_ATTR, {})
+    current = file_names(instance, counted_file_fields(sender))
+    # Only a field whose name differs from the remembered one (or that was deferred
+    # when loaded) costs a read of the stored row
+    fields = [
+        field for field in counted_file_fields(sender)
+        if (update_fields is None or field.name in update_fields)
+        and field.attname in current
+        and (field.attname not in remembered or remembered[field.attname] != current[field.attname])
+    ]
+    if not fields:
+        return
+    stored = sender._base_manager.filter(pk=instance.pk).values_list(*[field.attname for field in fields]).first()
+    if stored is None:
+        return
+    for field, old_name in zip(fields, stored):
+        file = getattr(instance, field.attname)
+        if old_name != (file.name if file else None):
+            release_file(field, old_name)
+
+
+def remember_saved_files(sender, instance, **kwargs):
+    remembered = getattr(instance, STORED_NAMES_ATTR, {})
+    remembered.update(file_names(instance, counted_file_fields(sender)))
+    setattr(instance, STORED_NAMES_ATTR, remembered)
+
+
+@receiver(request_finished)
+def discard_unconfirmed_blobs(sender, **kwargs):
+    # Every transaction of the request has ended by now
+    storage = get_content_storage()
+    if isinstance(storage, ContentAddressedStorage):
+        storage.discard_unconfirmed()
+
+
+def connect_file_release():
+    # Connected per model: a receiver for every sender would stop Django
+    # from fast-deleting rows of models that have no files at all
+    for model in apps.get_models():
+        if counted_file_fields(model):
+            for signal, handler in [
+                (post_init, remember_stored_files),
+                (pre_save, release_replaced_files),
+                (post_save, remember_saved_files),
+                (post_delete, release_stored_files),
+            ]:
+                signal.connect(handler, sender=model, dispatch_uid=f'{handler.__name__}:{model._meta.label}')
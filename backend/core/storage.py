@@ -0,0 +1,171 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under the SHA-256 of their content
+(``blobs/3f/3f9a...c1.png``) instead of their ``upload_to`` path, so a file
+uploaded again for another gig is not stored again. Only the fields that
+opt in with ``storage=get_content_storage`` use it: gig thumbnails, gig
+gallery media and portfolio media, which sellers upload over and over.
+Other fields keep the default storage and their ``upload_to`` paths. The digest is
+computed while the upload is written to disk; if a blob with that digest
+already exists the new copy is dropped.
+
+``StoredBlob`` counts how many field values point at each blob. ``delete()``
+only removes the file, and its image variants, when the last one is gone;
+core.signals calls it when a row holding a file is deleted or its file is
+replaced. Files stored before a field used this backend keep their names and
+are never deleted, since nothing counts their references.
+
+A blob first written inside a transaction that then rolls back has no
+``StoredBlob`` row left. Such files are removed when the request finishes
+(``discard_unconfirmed()``), unless another transaction has counted a
+reference to the same content since.
+
+A blob's content never changes under its name, so it can be served with a
+far-future ``immutable`` Cache-Control header (see ``core.views.serve_media``).
+"""
+import glob
+import hashlib
+import os
+import posixpath
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+CONTENT_STORAGE_ALIAS = 'content'
+INCOMING_DIR = 'incoming'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Blobs this thread wrote in a transaction that has not committed yet
+_unconfirmed = threading.local()
+
+
+def get_content_storage():
+    """The ``content`` storage of STORAGES, for ``FileField(storage=get_content_storage)``."""
+    return storages[CONTENT_STORAGE_ALIAS]
+
+
+def get_blob_prefix():
+    return getattr(settings, 'CONTENT_STORAGE_PREFIX', 'blobs')
+
+
+class HashingFile(File):
+    """Hashes the wrapped file's chunks as the storage reads them."""
+
+    def __init__(self, file):
+        super().__init__(file, file.name)
+        self.digest = hashlib.sha256()
+
+    def chunks(self, chunk_size=None):
+        for chunk in self.file.chunks(chunk_size):
+            self.digest.update(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is chosen from the content in _save()
+        return name
+
+    def is_blob(self, name):
+        return bool(name) and name.startswith(get_blob_prefix() + '/')
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        incoming = posixpath.join(get_blob_prefix(), INCOMING_DIR, uuid.uuid4().hex + extension)
+        if hasattr(content, 'temporary_file_path'):
+            # Moved rather than streamed, so hash it first
+            digest = hashlib.sha256()
+            for chunk in content.chunks():
+                digest.update(chunk)
+        else:
+            content = HashingFile(content)
+            digest = content.digest
+        super()._save(incoming, content)
+
+        hexdigest = digest.hexdigest()
+        name = posixpath.join(get_blob_prefix(), hexdigest[:2], hexdigest + extension)
+        self._store(incoming, name)
+        return name
+
+    def _store(self, incoming, name):
+        try:
+            self._store_reference(incoming, name)
+        except IntegrityError:
+            # Another process inserted the row between our read and insert; it is there now
+            self._store_reference(incoming, name)
+
+    def _store_reference(self, incoming, name):
+        from .models import StoredBlob
+
+        incoming_path = self.path(incoming)
+        path = self.path(name)
+        in_transaction = transaction.get_connection().in_atomic_block
+        # The row lock orders this against a delete() of the same blob
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                blob = StoredBlob.objects.create(name=name, size=os.path.getsize(incoming_path))
+            if os.path.exists(path):
+                os.remove(incoming_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(incoming_path, path)
+                if in_transaction:
+                    self._track_unconfirmed(name)
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+    def _track_unconfirmed(self, name):
+        pending = getattr(_unconfirmed, 'names', None)
+        if pending is None:
+            pending = _unconfirmed.names = set()
+        pending.add(name)
+        transaction.on_commit(lambda: pending.discard(name))
+
+    def discard_unconfirmed(self):
+        """
+        Remove the blobs this thread wrote in transactions that rolled back:
+        their ``on_commit`` never ran, so they are still tracked.
+        """
+        from .models import StoredBlob
+
+        pending = getattr(_unconfirmed, 'names', None)
+        if not pending:
+            return
+        _unconfirmed.names = set()
+        for name in pending:
+            with transaction.atomic():
+                if StoredBlob.objects.select_for_update().filter(name=name).exists():
+                    continue
+                self._remove_files(name)
+
+    def delete(self, name):
+        """Drop one reference to ``name``; the file goes with the last one."""
+        from .models import StoredBlob
+
+        if not self.is_blob(name):
+            return
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.ref_count > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            blob.delete()
+        self._remove_files(name)
+
+    def _remove_files(self, name):
+        """The blob and its image variants."""
+        root, _ = os.path.splitext(self.path(name))
+        for path in [self.path(name), *glob.glob(glob.escape(root) + '__*')]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -1,3 +1,346 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from accounts.models import User, SellerProfile, Skill
+from gigs.models import Category, SubCategory, Gig, GigGallery
+from .home import BUILD_LOCK_KEY, REBUILD_LOCK_KEY, SNAPSHOT_KEY, build_snapshot, build_snapshot_once
+from .images import variant_name
+from .management.base import pk_chunks
+from .models import StoredBlob, UploadSession
+from .nested_writes import sync_nested
+from .views import CHUNK_CONTENT_TYPE
+from .versions import VERSION_KEY, bump_versions, versions_etag
+
+
+class HomeSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('seller', 'seller@example.com', 'password123', is_seller=True)
+        cls.seller = SellerProfile.objects.create(user=user, profile_title='Seller', bio='Bio')
+        cls.category = Category.objects.create(name='Design')
+        cls.subcategory = SubCategory.objects.create(category=cls.category, name='Logos')
+        cls.gig = Gig.objects.create(
+            seller=cls.seller, title='Logo', description='Description', category=cls.category,
+            subcategory=cls.subcategory, delivery_time=3, status='active', is_featured=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_served_from_the_snapshot_without_queries(self):
+        data = self.client.get('/api/core/home/').data
+        self.assertEqual([gig['id'] for gig in data['featured_gigs']], [self.gig.pk])
+        self.assertEqual(data['categories'][0]['gig_count'], 1)
+        self.assertEqual(data['categories'][0]['subcategories'][0]['gig_count'], 1)
+        self.assertNotIn('is_saved', data['featured_gigs'][0])
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/core/home/')
+
+    def test_a_gig_write_is_picked_up_by_the_next_rebuild(self):
+        build_snapshot()
+        Gig.objects.create(
+            seller=self.seller, title='Banner', description='Description', category=self.category,
+            subcategory=self.subcategory, delivery_time=3, status='active',
+        )
+        # Hold the lock so no background rebuild starts: the stale snapshot is still served
+        cache.add(REBUILD_LOCK_KEY, 1, 60)
+        with self.assertNumQueries(0):
+            data = self.client.get('/api/core/home/').data
+        self.assertEqual(data['categories'][0]['gig_count'], 1)
+
+        self.assertEqual(build_snapshot()['categories'][0]['gig_count'], 2)
+
+    def test_a_cold_cache_waits_for_the_build_in_progress(self):
+        # Another worker holds the build lock and stores its snapshot while this one waits
+        cache.add(BUILD_LOCK_KEY, 1, 60)
+
+        def snapshot_arrives(seconds):
+            if cache.get(SNAPSHOT_KEY) is None:
+                build_snapshot()
+
+        with mock.patch('core.home.time.sleep', side_effect=snapshot_arrives) as sleep:
+            with mock.patch('core.home.build_snapshot', wraps=build_snapshot) as build:
+                data = self.client.get('/api/core/home/').data
+        self.assertEqual(sleep.call_count, 1)
+        build.assert_not_called()
+        self.assertEqual([gig['id'] for gig in data['featured_gigs']], [self.gig.pk])
+
+    def test_a_rebuild_is_skipped_while_another_is_running(self):
+        cache.add(BUILD_LOCK_KEY, 1, 60)
+        with self.assertNumQueries(0):
+            self.assertIsNone(build_snapshot_once())
+        self.assertIsNone(cache.get(SNAPSHOT_KEY))
+
+        cache.delete(BUILD_LOCK_KEY)
+        self.assertIsNotNone(build_snapshot_once())
+        # The lock is released after the build
+        self.assertTrue(cache.add(BUILD_LOCK_KEY, 1, 60))
+
+
+class VersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_an_evicted_counter_does_not_bring_back_old_etags(self):
+        issued = versions_etag(['gig:1'])
+        bump_versions(['gig:1'])
+        cache.delete(VERSION_KEY.format(scope='gig:1'))
+        self.assertNotEqual(versions_etag(['gig:1']), issued)
+
+
+
+class PkChunksTests(TestCase):
+
+    def test_instances_pks_and_tuples_are_walked_in_pk_order(self):
+        categories = [Category.objects.create(name=name) for name in ['C', 'A', 'B']]
+        pks = [category.pk for category in categories]
+        chunks = list(pk_chunks(Category.objects.order_by('name'), 2))
+        self.assertEqual([[category.pk for category in chunk] for chunk in chunks], [pks[:2], pks[2:]])
+        self.assertEqual(list(pk_chunks(Category.objects.values_list('pk', flat=True), 2)), [pks[:2], pks[2:]])
+        self.assertEqual(
+            list(pk_chunks(Category.objects.values_list('pk', 'name'), 1)),
+            [[(pk, name)] for pk, name in zip(pks, 'CAB')],
+        )
+        self.assertEqual(list(pk_chunks(Category.objects.none(), 2)), [])
+
+class SyncNestedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('seller', 'seller@example.com', 'password123', is_seller=True)
+        cls.profile = SellerProfile.objects.create(user=user, profile_title='Seller', bio='Bio')
+
+    def setUp(self):
+        self.python = Skill.objects.create(profile=self.profile, name='Python', level='expert')
+        self.django = Skill.objects.create(profile=self.profile, name='Django', level='beginner')
+        self.css = Skill.objects.create(profile=self.profile, name='CSS', level='beginner')
+
+    def test_rows_keep_their_ids_and_missing_ones_are_deleted(self):
+        diff = sync_nested(self.profile.skills, [
+            {'id': self.python.pk, 'name': 'Python', 'level': 'expert'},
+            # Matched by natural key, without an id
+            {'name': 'Django', 'level': 'intermediate'},
+            {'name': 'Go', 'level': 'beginner'},
+        ], key_fields=('name',))
+
+        self.assertEqual([row.pk for row in diff.unchanged], [self.python.pk])
+        self.assertEqual([row.pk for row in diff.updated], [self.django.pk])
+        self.assertEqual([row.pk for row in diff.deleted], [self.css.pk])
+        self.assertEqual([row.name for row in diff.created], ['Go'])
+        skills = {skill.name: skill for skill in self.profile.skills.all()}
+        self.assertEqual(set(skills), {'Python', 'Django', 'Go'})
+        self.assertEqual(skills['Django'].pk, self.django.pk)
+        self.assertEqual(skills['Django'].level, 'intermediate')
+
+    def test_an_unchanged_collection_costs_one_read(self):
+        items = [{'name': skill.name, 'level': skill.level} for skill in (self.python, self.django, self.css)]
+        with self.assertNumQueries(1):
+            diff = sync_nested(self.profile.skills, items, key_fields=('name',))
+        self.assertFalse(diff.changed)
+
+    def test_an_id_from_another_parent_creates_a_row(self):
+        other = SellerProfile.objects.create(
+            user=User.objects.create_user('other', 'other@example.com', 'password123'), profile_title='Other', bio='Bio',
+        )
+        sync_nested(other.skills, [{'id': self.python.pk, 'name': 'Python', 'level': 'expert'}], key_fields=('name',))
+        self.assertNotEqual(other.skills.get().pk, self.python.pk)
+        self.assertTrue(Skill.objects.filter(pk=self.python.pk, profile=self.profile).exists())
+
+
+class TempMediaTestCase(TestCase):
+    """Stores media and upload sessions in a directory removed after each test."""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=root + '/media', UPLOAD_SESSION_DIR=root + '/uploads')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class BlobReferenceTests(TempMediaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('seller', 'seller@example.com', 'password123', is_seller=True)
+        cls.seller = SellerProfile.objects.create(user=user, profile_title='Seller', bio='Bio')
+        cls.category = Category.objects.create(name='Design')
+        cls.subcategory = SubCategory.objects.create(category=cls.category, name='Logos')
+
+    def create_gig(self, thumbnail):
+        return Gig.objects.create(
+            seller=self.seller, title='Logo', description='Description', category=self.category,
+            subcategory=self.subcategory, delivery_time=3, thumbnail_image=thumbnail,
+        )
+
+    def test_replacing_a_file_releases_the_old_blob(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            gig = self.create_gig(ContentFile(b'old', name='old.png'))
+        old_name = gig.thumbnail_image.name
+        self.assertTrue(old_name.startswith('blobs/'))
+
+        gig.thumbnail_image = ContentFile(b'new', name='new.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            gig.save()
+        self.assertFalse(StoredBlob.objects.filter(name=old_name).exists())
+        self.assertFalse(gig.thumbnail_image.storage.exists(old_name))
+        self.assertEqual(StoredBlob.objects.get(name=gig.thumbnail_image.name).ref_count, 1)
+
+    def test_saves_without_a_new_file_do_not_read_the_stored_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            gig = self.create_gig(ContentFile(b'logo', name='logo.png'))
+        gig.title = 'Logo design'
+        loaded = Gig.objects.get(pk=gig.pk)
+        deferred = Gig.objects.only('pk', 'title').get(pk=gig.pk)
+        with CaptureQueriesContext(connection) as queries:
+            gig.save()
+            loaded.save()
+            deferred.save(update_fields=['title'])
+        self.assertFalse([query for query in queries if 'SELECT' in query['sql'] and 'thumbnail_image' in query['sql']])
+
+        # A new file does read it
+        loaded.thumbnail_image = ContentFile(b'new', name='new.png')
+        with CaptureQueriesContext(connection) as queries:
+            loaded.save()
+        self.assertTrue([query for query in queries if 'SELECT' in query['sql'] and 'thumbnail_image' in query['sql']])
+
+    def test_only_opted_in_fields_are_content_addressed(self):
+        category = Category.objects.create(name='Writing', image=ContentFile(b'icon', name='icon.png'))
+        self.assertTrue(category.image.name.startswith('category_images/'))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_a_blob_written_by_a_rolled_back_transaction_is_removed(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            gig = self.create_gig(ContentFile(b'lost', name='lost.png'))
+            raise RuntimeError
+        storage = gig.thumbnail_image.storage
+        self.assertTrue(storage.exists(gig.thumbnail_image.name))
+        storage.discard_unconfirmed()
+        self.assertFalse(storage.exists(gig.thumbnail_image.name))
+
+
+class ImageVariantTests(TempMediaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('seller', 'seller@example.com', 'password123', is_seller=True)
+        seller = SellerProfile.objects.create(user=user, profile_title='Seller', bio='Bio')
+        category = Category.objects.create(name='Design')
+        cls.gig = Gig.objects.create(
+            seller=seller, title='Logo', description='Description', category=category,
+            subcategory=SubCategory.objects.create(category=category, name='Logos'), delivery_time=3, status='active',
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def upload_thumbnail(self, color):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 600), color).save(buffer, 'PNG')
+        self.gig.thumbnail_image = ContentFile(buffer.getvalue(), name='logo.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gig.save()
+        return self.gig.thumbnail_image.name
+
+    def card_variants(self):
+        return APIClient().get('/api/gigs/').data['results'][0]['thumbnail_variants']
+
+    def test_the_command_renders_and_marks_pending_images(self):
+        name = self.upload_thumbnail('red')
+        self.assertIsNone(self.card_variants())
+
+        call_command('generate_image_variants', stdout=StringIO())
+        self.gig.refresh_from_db()
+        self.assertEqual(self.gig.thumbnail_image_rendered, name)
+        with Image.open(default_storage.path(variant_name(name, 'card', 'webp'))) as image:
+            self.assertEqual(image.size, (480, 240))
+        # The cached listing was invalidated when the variants were marked
+        variants = self.card_variants()
+        self.assertTrue(variants['card']['webp'].endswith(variant_name(name, 'card', 'webp')))
+        self.assertTrue(variants['placeholder'].endswith(variant_name(name, 'placeholder', 'jpeg')))
+
+    def test_a_replaced_image_is_pending_until_rendered(self):
+        self.upload_thumbnail('red')
+        call_command('generate_image_variants', stdout=StringIO())
+        name = self.upload_thumbnail('blue')
+        self.assertIsNone(self.card_variants())
+        call_command('generate_image_variants', stdout=StringIO())
+        self.assertTrue(self.card_variants()['card']['jpeg'].endswith(variant_name(name, 'card', 'jpeg')))
+
+    def test_listing_variants_makes_no_storage_calls(self):
+        name = self.upload_thumbnail('red')
+        Gig.objects.filter(pk=self.gig.pk).update(thumbnail_image_rendered=name)
+        with mock.patch.object(FileSystemStorage, 'exists') as exists:
+            self.assertIsNotNone(self.card_variants())
+        exists.assert_not_called()
+
+
+class UploadSessionTests(TempMediaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('seller', 'seller@example.com', 'password123', is_seller=True)
+        seller = SellerProfile.objects.create(user=cls.user, profile_title='Seller', bio='Bio')
+        category = Category.objects.create(name='Design')
+        cls.gig = Gig.objects.create(
+            seller=seller, title='Logo', description='Description', category=category,
+            subcategory=SubCategory.objects.create(category=category, name='Logos'), delivery_time=3,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/core/uploads/', {'target': 'gig_gallery', 'filename': 'logo.png', 'size': 6})
+        self.url = f"/api/core/uploads/{response.data['id']}/"
+
+    def send(self, data, offset):
+        return self.client.generic(
+            'PATCH', self.url, data, content_type=CHUNK_CONTENT_TYPE, HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_a_chunk_at_the_wrong_offset_is_refused(self):
+        self.assertEqual(self.send(b'abc', 0).status_code, 204)
+        response = self.send(b'abc', 0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '3')
+
+    def test_head_reports_where_to_resume(self):
+        self.send(b'abcd', 0)
+        response = self.client.head(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Upload-Offset'], '4')
+
+    def test_idle_sessions_expire(self):
+        UploadSession.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(self.client.head(self.url).status_code, 404)
+        self.assertEqual(self.send(b'abc', 0).status_code, 404)
+
+    def test_commit_attaches_the_assembled_file(self):
+        self.assertEqual(self.client.post(self.url + 'commit/', {'gig': self.gig.pk, 'media_type': 'image'}).status_code, 409)
+        self.send(b'abc', 0)
+        self.send(b'def', 3)
+        response = self.client.post(self.url + 'commit/', {'gig': self.gig.pk, 'media_type': 'image'})
+        self.assertEqual(response.status_code, 201)
+        with GigGallery.objects.get(gig=self.gig).media_file.open('rb') as media:
+            self.assertEqual(media.read(), b'abcdef')
+        self.assertFalse(UploadSession.objects.exists())
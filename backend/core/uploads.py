@@ -0,0 +1,73 @@
+"""
+Storage side of chunked uploads (see core.models.UploadSession).
+
+A chunk is first copied from the request stream to a file of its own, in
+small reads, so memory use does not depend on the chunk or file size and no
+database lock is held while a slow client sends it. It is then appended to
+the session's part file. Once the last byte has arrived the part file is
+handed to the target's FileField as an ``AssembledFile``: FileSystemStorage
+moves it into place instead of copying it.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.http import UnreadablePostError
+
+READ_SIZE = 64 * 1024
+
+
+def get_upload_dir():
+    return getattr(settings, 'UPLOAD_SESSION_DIR', None) or os.path.join(
+        settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir(), 'upload_sessions',
+    )
+
+
+def get_chunk_size():
+    return getattr(settings, 'UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024)
+
+
+def get_max_upload_size():
+    return getattr(settings, 'UPLOAD_MAX_SIZE', 500 * 1024 * 1024)
+
+
+def receive_chunk(stream, length):
+    """
+    Copy up to ``length`` bytes from ``stream`` into a new file in the upload
+    directory and return its path. It holds fewer than ``length`` bytes when
+    the client disconnected mid-chunk; those bytes are kept so the upload
+    resumes after them.
+    """
+    upload_dir = get_upload_dir()
+    os.makedirs(upload_dir, exist_ok=True)
+    written = 0
+    with tempfile.NamedTemporaryFile(dir=upload_dir, suffix='.chunk', delete=False) as chunk:
+        while written < length:
+            try:
+                data = stream.read(min(READ_SIZE, length - written))
+            except (UnreadablePostError, OSError):
+                break
+            if not data:
+                break
+            chunk.write(data)
+            written += len(data)
+    return chunk.name
+
+
+def write_chunk(path, offset, chunk_path):
+    """Copy the received chunk into ``path`` at ``offset``. Returns the number of bytes stored."""
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as part, open(chunk_path, 'rb') as chunk:
+        part.seek(offset)
+        shutil.copyfileobj(chunk, part, READ_SIZE)
+        # Drop bytes left over from an earlier attempt past this point
+        part.truncate()
+        return part.tell() - offset
+
+
+class AssembledFile(File):
+    """A finished part file; storages that support it move it rather than copy it."""
+
+    def temporary_file_path(self):
+        return self.file.name
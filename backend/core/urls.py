@@ -1,3 +1,12 @@
-from django.urls import path
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 
-urlpatterns = [] 
\ No newline at end of file
+from .views import UploadSessionViewSet, home
+
+router = DefaultRouter()
+router.register('uploads', UploadSessionViewSet, basename='upload')
+
+urlpatterns = [
+    path('home/', home, name='home'),
+    path('', include(router.urls)),
+]
@@ -0,0 +1,55 @@
+"""
+Version counters kept in the shared cache.
+
+A counter names something clients can hold a copy of (``gig:<id>``,
+``taxonomy``, ``seller:<id>``...). Writes bump it, and readers fold the
+current values into cache keys and ETags, so a change invalidates every
+copy without tracking where those copies live.
+
+A counter that is missing, because it was evicted or the cache restarted,
+starts again from the clock in nanoseconds rather than from 1. A counter
+restarting at a value it held before would make ETags and cache keys from
+that time valid again.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{scope}'
+
+
+def get_versions(scopes):
+    keys = [VERSION_KEY.format(scope=scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            seed = time.time_ns()
+            cache.add(key, seed, None)
+            versions[key] = cache.get(key, seed)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(scopes):
+    for scope in set(scopes):
+        key = VERSION_KEY.format(scope=scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Unknown counter: a fresh seed is above any value it had before
+            cache.set(key, time.time_ns(), None)
+
+
+def invalidate_versions(scopes):
+    """Bump now, and again on commit so copies cached mid-transaction are dropped too."""
+    scopes = set(scopes)
+    bump_versions(scopes)
+    transaction.on_commit(lambda: bump_versions(scopes))
+
+
+def versions_etag(scopes, *parts):
+    """A weak ETag derived from version counters alone, so it costs no queries."""
+    versions = ','.join(f'{scope}={version}' for scope, version in zip(scopes, get_versions(scopes)))
+    raw = '|'.join([versions, *map(str, parts)])
+    return 'W/"%s"' % hashlib.sha1(raw.encode('utf-8')).hexdigest()
@@ -1,3 +1,156 @@
-from django.shortcuts import render
+import os
+from datetime import timedelta
 
-# Create your views here.
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.views.static import serve
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
+from rest_framework.response import Response
+
+from .home import get_home_snapshot
+from .models import UploadSession
+from .serializers import ATTACH_SERIALIZERS, UploadSessionSerializer
+from .storage import IMMUTABLE_CACHE_CONTROL, get_blob_prefix
+from .uploads import AssembledFile, receive_chunk, write_chunk
+
+CHUNK_CONTENT_TYPE = 'application/offset+octet-stream'
+
+
+# ===========================
+# Chunked uploads
+# ===========================
+
+class UploadSessionViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Resumable uploads for large gallery and portfolio media.
+
+    1. ``POST /uploads/`` with ``target``, ``filename`` and ``size`` opens a session.
+    2. ``PATCH /uploads/<id>/`` sends the next chunk as the raw request body
+       (``Content-Type: application/offset+octet-stream``) with its position
+       in an ``Upload-Offset`` header. Chunks may not exceed ``chunk_size``.
+    3. After a dropped connection, ``HEAD /uploads/<id>/`` returns the stored
+       ``Upload-Offset`` to resume from.
+    4. ``POST /uploads/<id>/commit/`` attaches the finished file to its target.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        ttl = getattr(settings, 'UPLOAD_SESSION_TTL', 60 * 60 * 24)
+        return UploadSession.objects.filter(
+            user=self.request.user,
+            updated_at__gte=timezone.now() - timedelta(seconds=ttl),
+        )
+
+    def offset_response(self, session, status_code=status.HTTP_200_OK, data=None):
+        response = Response(data, status=status_code)
+        response['Upload-Offset'] = str(session.offset)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        session = self.get_object()
+        return self.offset_response(session, data=self.get_serializer(session).data)
+
+    def partial_update(self, request, *args, **kwargs):
+        if request.content_type != CHUNK_CONTENT_TYPE:
+            return Response(
+                {'detail': f"Chunks must be sent as {CHUNK_CONTENT_TYPE}."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response(
+                {'detail': "Upload-Offset and Content-Length headers are required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        session = self.get_object()
+        # Checked before the body is read, and again under the lock
+        rejected = self.check_chunk(session, offset, length)
+        if rejected:
+            return rejected
+
+        chunk_path = receive_chunk(request.stream, length)
+        try:
+            with transaction.atomic():
+                # The row lock keeps two requests from writing the same session at once
+                session = UploadSession.objects.select_for_update().get(pk=session.pk)
+                rejected = self.check_chunk(session, offset, length)
+                if rejected:
+                    return rejected
+                session.offset += write_chunk(session.part_path, offset, chunk_path)
+                session.save(update_fields=['offset', 'updated_at'])
+        finally:
+            os.remove(chunk_path)
+        return self.offset_response(session, status.HTTP_204_NO_CONTENT)
+
+    def check_chunk(self, session, offset, length):
+        """The error response for a chunk that cannot go at ``offset``, or None."""
+        if offset != session.offset:
+            return self.offset_response(
+                session, status.HTTP_409_CONFLICT,
+                {'detail': "Upload-Offset does not match the stored offset.", 'offset': session.offset},
+            )
+        if length > session.chunk_size or offset + length > session.size:
+            return self.offset_response(
+                session, status.HTTP_400_BAD_REQUEST,
+                {'detail': f"Chunks are at most {session.chunk_size} bytes and may not pass the file size."},
+            )
+        return None
+
+    def perform_destroy(self, instance):
+        instance.discard()
+
+    @action(detail=True, methods=['post'])
+    def commit(self, request, pk=None):
+        session = self.get_object()
+        if not session.is_complete:
+            return self.offset_response(
+                session, status.HTTP_409_CONFLICT,
+                {'detail': "The upload is not complete.", 'offset': session.offset, 'size': session.size},
+            )
+        attach_serializer = ATTACH_SERIALIZERS[session.target](data=request.data, context={'request': request})
+        attach_serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic(), open(session.part_path, 'rb') as part:
+            target = attach_serializer.attach(AssembledFile(part, name=session.filename))
+            session.discard()
+        output_serializer = attach_serializer.Meta.output_serializer(target, context={'request': request})
+        return Response(output_serializer.data, status=status.HTTP_201_CREATED)
+
+
+# ===========================
+# Homepage
+# ===========================
+
+@api_view(['GET'])
+@authentication_classes([])  # The same for everyone; authenticating would cost a session lookup
+@permission_classes([permissions.AllowAny])
+def home(request):
+    """Category tree, featured and trending gigs in one response, from the snapshot in core.home."""
+    return Response(get_home_snapshot())
+
+
+# ===========================
+# Media
+# ===========================
+
+def serve_media(request, path):
+    """
+    Development server for MEDIA_ROOT. Content-addressed blobs and their
+    variants never change, so browsers may cache them for good; the web
+    server in front of production should send the same header for that prefix.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if path.startswith(get_blob_prefix() + '/') and response.status_code == status.HTTP_200_OK:
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
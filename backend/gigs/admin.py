@@ -9,3 +9,4 @@ admin.site.register(GigPackage)
 admin.site.register(GigFAQ)
 admin.site.register(GigGallery)
 admin.site.register(SavedGig)
+admin.site.register(Tag)
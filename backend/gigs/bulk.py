@@ -0,0 +1,223 @@
+"""
+Bulk gig import.
+
+Items are validated one by one, then written in chunks of
+``GIG_IMPORT_CHUNK_SIZE``. Each chunk is one transaction. New gigs cost one
+insert per table (gigs, packages, FAQs, tags); updated gigs share one
+update, and their packages and FAQs are diffed per gig with
+core.nested_writes, so unchanged lists cost a read and nothing else. An
+invalid item is reported with its index and skipped, and the rest of the
+batch still goes in. Items naming the same gig ``id`` more than once are all
+rejected, since no order between them would be the obvious one.
+"""
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import SellerProfile
+from core.nested_writes import sync_nested
+from .cache import invalidate_gigs
+from .models import Gig, GigFAQ, GigPackage, SubCategory
+from .serializers import GigImportSerializer, GigSerializer
+from .signals import gig_content_changed
+from .suggest import schedule_suggest_update
+from .tags import sync_tags_for_gigs
+
+logger = logging.getLogger(__name__)
+
+
+class GigImporter:
+    """Creates items without an ``id`` and updates the seller's gigs for items with one."""
+
+    def __init__(self, seller, chunk_size=None):
+        self.seller = seller
+        self.chunk_size = chunk_size or getattr(settings, 'GIG_IMPORT_CHUNK_SIZE', 100)
+
+    def run(self, items):
+        """Return one result per item: ``{'index', 'status', 'id'}`` or ``{'index', 'status', 'errors'}``."""
+        self.results = [None] * len(items)
+        valid = self.validate(items)
+        valid = self.resolve_subcategories(valid)
+        valid = self.resolve_instances(valid)
+
+        for start in range(0, len(valid), self.chunk_size):
+            self.write_chunk(valid[start:start + self.chunk_size])
+        return self.results
+
+    def fail(self, index, errors):
+        self.results[index] = {'index': index, 'status': 'error', 'errors': errors}
+
+    def validate(self, items):
+        valid = []
+        id_counts = Counter(item.get('id') for item in items if isinstance(item, dict))
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                self.fail(index, {'non_field_errors': ['Expected an object.']})
+                continue
+            if item.get('id') is not None and id_counts[item['id']] > 1:
+                self.fail(index, {'id': ['The same gig appears more than once in the batch.']})
+                continue
+            serializer = GigImportSerializer(data=item, partial='id' in item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                self.fail(index, serializer.errors)
+        return valid
+
+    def resolve_subcategories(self, valid):
+        """Check every subcategory (and its category) with one query for the whole batch."""
+        ids = {data['subcategory_id'] for _, data in valid if 'subcategory_id' in data}
+        categories = dict(SubCategory.objects.filter(pk__in=ids).values_list('pk', 'category_id'))
+
+        resolved = []
+        for index, data in valid:
+            if 'subcategory_id' in data:
+                category_id = categories.get(data['subcategory_id'])
+                if category_id is None:
+                    self.fail(index, {'subcategory_id': ['Unknown subcategory.']})
+                    continue
+                if data.setdefault('category_id', category_id) != category_id:
+                    self.fail(index, {'subcategory_id': ['Subcategory does not belong to the category.']})
+                    continue
+            elif 'category_id' in data:
+                self.fail(index, {'subcategory_id': ['Required when category_id is given.']})
+                continue
+            resolved.append((index, data))
+        return resolved
+
+    def resolve_instances(self, valid):
+        """Load the gigs being updated with one query; only the seller's own gigs qualify."""
+        ids = [data['id'] for _, data in valid if 'id' in data]
+        instances = Gig.objects.filter(seller=self.seller).in_bulk(ids)
+
+        resolved = []
+        for index, data in valid:
+            instance = None
+            if 'id' in data:
+                instance = instances.get(data.pop('id'))
+                if instance is None:
+                    self.fail(index, {'id': ['Gig not found.']})
+                    continue
+            resolved.append((index, data, instance))
+        return resolved
+
+    def write_chunk(self, chunk):
+        creates = [(index, data) for index, data, instance in chunk if instance is None]
+        updates = [(index, data, instance) for index, data, instance in chunk if instance is not None]
+        try:
+            with transaction.atomic():
+                created = self.create_gigs(creates)
+                updated = self.update_gigs(updates)
+                gig_content_changed.send(sender=Gig, gig_ids=[gig.pk for gig in created + updated])
+        except DatabaseError:
+            # The database's message can name tables and constraints; keep it in the logs
+            logger.exception("Bulk import of %d gigs for seller %s failed", len(chunk), self.seller.pk)
+            for index, *_ in chunk:
+                self.fail(index, {'non_field_errors': ['Could not be saved.']})
+            return
+
+        for (index, _), gig in zip(creates, created):
+            self.results[index] = {'index': index, 'status': 'created', 'id': gig.pk}
+        for (index, _, _), gig in zip(updates, updated):
+            self.results[index] = {'index': index, 'status': 'updated', 'id': gig.pk}
+
+    def create_gigs(self, creates):
+        if not creates:
+            return []
+        gigs = []
+        children = []
+        for _, data in creates:
+            data = dict(data)
+            packages = data.pop('packages', [])
+            faqs = data.pop('faqs', [])
+            GigSerializer.publish_drafts(data)
+            gig = Gig(seller=self.seller, **data)
+            set_price_range(gig, packages)
+            gigs.append(gig)
+            children.append((packages, faqs))
+
+        self.insert_gigs(gigs)
+        GigPackage.objects.bulk_create([
+            GigPackage(gig=gig, **package) for gig, (packages, _) in zip(gigs, children) for package in packages
+        ])
+        GigFAQ.objects.bulk_create([
+            GigFAQ(gig=gig, **faq) for gig, (_, faqs) in zip(gigs, children) for faq in faqs
+        ])
+        sync_tags_for_gigs(gig for gig in gigs if gig.tags)
+        return gigs
+
+    def insert_gigs(self, gigs):
+        if connection.features.can_return_rows_from_bulk_insert:
+            Gig.objects.bulk_create(gigs)
+            return
+
+        # MySQL does not return ids from a multi-row INSERT. With the seller
+        # locked for the transaction, the seller's gigs above the highest id
+        # it had before are the inserted rows, numbered in insertion order.
+        SellerProfile.objects.select_for_update().filter(pk=self.seller.pk).values_list('pk').first()
+        seller_gigs = Gig.objects.filter(seller=self.seller)
+        last_id = seller_gigs.aggregate(last_id=Max('pk'))['last_id'] or 0
+        Gig.objects.bulk_create(gigs)
+        inserted = list(seller_gigs.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'title'))
+        if [title for _, title in inserted] != [gig.title for gig in gigs]:
+            raise DatabaseError("Could not match the imported gigs to their ids.")
+        for gig, (pk, _) in zip(gigs, inserted):
+            gig.pk = pk
+            gig._state.adding = False
+            gig._state.db = Gig.objects.db
+
+    def update_gigs(self, updates):
+        if not updates:
+            return []
+        now = timezone.now()
+        gigs = []
+        fields = {'updated_at'}
+        packages = {}
+        faqs = {}
+        moved_from = set()
+        for _, data, gig in updates:
+            data = dict(data)
+            GigSerializer.publish_drafts(data)
+            if 'packages' in data:
+                packages[gig] = data.pop('packages')
+                set_price_range(gig, packages[gig])
+                fields.update(['min_price', 'max_price'])
+            if 'faqs' in data:
+                faqs[gig] = data.pop('faqs')
+            if (data.get('category_id', gig.category_id), data.get('subcategory_id', gig.subcategory_id)) != (
+                gig.category_id, gig.subcategory_id,
+            ):
+                moved_from.add((gig.category_id, gig.subcategory_id))
+            for field, value in data.items():
+                setattr(gig, field, value)
+            fields.update(data)
+            gig.updated_at = now
+            gigs.append(gig)
+
+        Gig.objects.bulk_update(gigs, sorted(fields))
+        # Nested lists replace what the gig had, as in a full update; rows
+        # that match keep their ids
+        for gig, items in packages.items():
+            sync_nested(gig.packages, items, key_fields=GigSerializer.NESTED_KEYS[GigPackage])
+        for gig, items in faqs.items():
+            sync_nested(gig.faqs, items, key_fields=GigSerializer.NESTED_KEYS[GigFAQ])
+        if 'tags' in fields:
+            sync_tags_for_gigs(gigs)
+        if moved_from:
+            # gig_content_changed only reaches the categories the gigs are in now
+            invalidate_gigs([], category_ids=[category_id for category_id, _ in moved_from])
+            schedule_suggest_update(
+                ref for category_id, subcategory_id in moved_from
+                for ref in [('category', category_id), ('subcategory', subcategory_id)]
+            )
+        return gigs
+
+
+def set_price_range(gig, packages):
+    prices = [package['price'] for package in packages]
+    gig.min_price = min(prices, default=None)
+    gig.max_price = max(prices, default=None)
@@ -0,0 +1,137 @@
+"""
+Response cache for anonymous catalogue browsing.
+
+Cache keys combine the request path, the normalized query string and the
+current value of every version counter the response depends on:
+
+* ``gigs``            any gig listing
+* ``category:<id>``   listings of one category
+* ``gig:<id>``        one gig's detail
+* ``taxonomy``        category and subcategory listings
+
+The counters live in core.versions. Writes bump them through
+``invalidate_versions`` (see gigs.signals), which moves readers to new keys
+instead of deleting entries. Counters are bumped when the write happens and
+again when its transaction commits, so a page cached by a concurrent reader
+in between is never served afterwards.
+Old entries simply expire.
+
+Entries carry a soft expiry. Once it passes, one worker takes a short lock and
+recomputes while the others keep serving the stale copy. On a cold key they
+wait briefly for that worker instead of all hitting the database.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import permissions, status
+from rest_framework.response import Response
+
+from core.versions import get_versions, invalidate_versions
+
+ENTRY_KEY = 'gigs:response:{digest}'
+LOCK_SUFFIX = ':lock'
+
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+WAIT_ATTEMPTS = 20
+
+
+def gig_scopes(gig_ids, category_ids=()):
+    scopes = ['gigs']
+    scopes += [f'gig:{gig_id}' for gig_id in gig_ids]
+    scopes += [f'category:{category_id}' for category_id in category_ids if category_id]
+    return scopes
+
+
+def invalidate_gigs(gig_ids, category_ids=()):
+    """
+    Invalidate cached responses showing the given gigs, now and on commit.
+    ``category_ids`` adds categories the gigs no longer belong to (moved or deleted gigs).
+    """
+    from .models import Gig
+
+    category_ids = set(category_ids)
+    category_ids.update(Gig.objects.filter(pk__in=gig_ids).values_list('category_id', flat=True))
+    invalidate_versions(gig_scopes(gig_ids, category_ids))
+
+
+def invalidate_taxonomy():
+    invalidate_versions(['taxonomy', 'gigs'])
+
+
+def build_cache_key(request, scopes):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+        if value != ''
+    )
+    query = '&'.join(f'{key}={value}' for key, value in params)
+    versions = ','.join(f'{scope}={version}' for scope, version in zip(scopes, get_versions(scopes)))
+    raw = f'{request.get_host()}|{request.path}|{query}|{versions}'
+    return ENTRY_KEY.format(digest=hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+def get_or_compute(key, compute, timeout, grace):
+    """
+    Return cached data for ``key``, recomputing at most once across workers.
+    ``compute`` returns the data to cache, or ``None`` when it must not be cached.
+    """
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None and entry['fresh_until'] > now:
+        return entry['data']
+
+    lock_key = key + LOCK_SUFFIX
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            data = compute()
+            if data is not None:
+                cache.set(key, {'data': data, 'fresh_until': time.time() + timeout}, timeout + grace)
+            return data
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        # Someone else is refreshing; the stale copy is still within its grace period
+        return entry['data']
+
+    for _ in range(WAIT_ATTEMPTS):
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['data']
+    return compute()
+
+
+def cache_response(view_method):
+    """
+    Cache a safe, anonymous viewset action. The view provides
+    ``get_cache_scopes()`` naming the version counters the response depends on.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method not in permissions.SAFE_METHODS or request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+
+        uncached = {}
+
+        def compute():
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                uncached['response'] = response
+                return None
+            return response.data
+
+        timeout = getattr(settings, 'GIG_CACHE_TIMEOUT', 60)
+        grace = getattr(settings, 'GIG_CACHE_STALE_GRACE', 30)
+        key = build_cache_key(request, self.get_cache_scopes())
+        data = get_or_compute(key, compute, timeout, grace)
+        if data is None:
+            return uncached.get('response') or view_method(self, request, *args, **kwargs)
+        return Response(data)
+
+    return wrapper
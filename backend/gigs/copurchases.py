@@ -0,0 +1,148 @@
+"""
+"Buyers also ordered" recommendations.
+
+Two gigs are related when the same buyers ordered both. Orders are streamed
+into a sparse buyer × gig matrix, where a buyer counts once per gig and
+cancelled orders not at all. Multiplying its transpose by it gives, for each
+pair of gigs, how many buyers ordered both. The counts are normalized to
+cosine similarity, ``both / sqrt(buyers_a * buyers_b)``, so the gigs that
+everybody orders do not top every rail, and each gig's best matches are
+stored as ``GigNeighbor`` rows of kind ``also_ordered``.
+
+The matrix holds one entry per distinct buyer and gig, and the product is
+taken ``GIG_ALSO_ORDERED_BLOCK_ROWS`` gigs at a time, so only one block of
+co-occurrence counts is in memory.
+"""
+from array import array
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from orders.models import Order
+from .models import Gig, GigNeighbor
+from .similar import WRITE_BATCH_SIZE, delete_inactive_neighbors, replace_neighbors
+
+KIND = 'also_ordered'
+READ_CHUNK_SIZE = 10000
+
+
+def get_neighbor_count():
+    return getattr(settings, 'GIG_ALSO_ORDERED_NEIGHBORS', 12)
+
+
+def counted_orders():
+    return Order.objects.exclude(status='cancelled')
+
+
+def build_matrix():
+    """
+    Return ``(gig_ids, matrix)``: a binary buyer × gig matrix of the counted
+    orders, with a column per ordered gig.
+    """
+    buyers = array('q')
+    gigs = array('q')
+    rows = counted_orders().order_by().values_list('buyer_id', 'gig_id')
+    for buyer_id, gig_id in rows.iterator(chunk_size=READ_CHUNK_SIZE):
+        buyers.append(buyer_id)
+        gigs.append(gig_id)
+    if not gigs:
+        return [], sparse.csr_matrix((0, 0), dtype=np.float32)
+
+    gig_ids, gig_index = np.unique(np.frombuffer(gigs, dtype=np.int64), return_inverse=True)
+    buyer_ids, buyer_index = np.unique(np.frombuffer(buyers, dtype=np.int64), return_inverse=True)
+    del buyers, gigs
+    matrix = sparse.csr_matrix(
+        (np.ones(len(gig_index), dtype=np.float32), (buyer_index, gig_index)),
+        shape=(len(buyer_ids), len(gig_ids)),
+    )
+    # Repeat orders of the same gig were summed; a buyer counts once
+    matrix.data[:] = 1
+
+    # A buyer with a huge basket (an agency, a test account) would link all of it
+    max_gigs = getattr(settings, 'GIG_ALSO_ORDERED_MAX_BUYER_GIGS', 200)
+    basket_sizes = np.diff(matrix.indptr)
+    if basket_sizes.max() > max_gigs:
+        matrix = matrix[np.flatnonzero(basket_sizes <= max_gigs)]
+    return gig_ids.tolist(), matrix
+
+
+def top_neighbors(matrix, positions, active, k, min_count):
+    """
+    Yield ``(position, [(neighbor_position, score), ...])`` for each column in
+    ``positions``, best first. Only columns flagged in ``active`` are
+    candidates, and only when at least ``min_count`` buyers ordered both.
+    """
+    buyers = np.asarray(matrix.sum(axis=0)).ravel()
+    transposed = matrix.T.tocsr()
+    block_rows = getattr(settings, 'GIG_ALSO_ORDERED_BLOCK_ROWS', 1000)
+    for first in range(0, len(positions), block_rows):
+        block = np.asarray(positions[first:first + block_rows], dtype=np.int64)
+        counts = (transposed[block] @ matrix).tocsr()
+        rows = np.repeat(block, np.diff(counts.indptr))
+        keep = (counts.indices != rows) & (counts.data >= min_count) & active[counts.indices]
+        counts.data = np.where(
+            keep, counts.data / np.sqrt(buyers[rows] * buyers[counts.indices]), 0,
+        ).astype(np.float32)
+        counts.eliminate_zeros()
+
+        for row, position in enumerate(block):
+            start, end = counts.indptr[row], counts.indptr[row + 1]
+            columns = counts.indices[start:end]
+            scores = counts.data[start:end]
+            if len(scores) > k:
+                best = np.argpartition(-scores, k)[:k]
+                columns, scores = columns[best], scores[best]
+            order = np.argsort(-scores)
+            yield int(position), [(int(columns[i]), float(scores[i])) for i in order]
+
+
+def gigs_with_new_orders(since):
+    """
+    Gigs whose co-purchases changed since ``since``: every gig ordered by a
+    buyer who placed, or had an order change state, after it.
+    """
+    buyers = Order.objects.filter(updated_at__gte=since).values('buyer_id')
+    return list(Order.objects.filter(buyer_id__in=buyers).order_by().values_list('gig_id', flat=True).distinct())
+
+
+def rebuild_copurchases(gig_ids=None):
+    """
+    Recompute the "also ordered" neighbors of ``gig_ids`` (default: every
+    active gig) and return how many gigs were processed. All orders are
+    read either way, since a gig's counts depend on its buyers' other orders.
+    """
+    ids, matrix = build_matrix()
+    active_ids = np.fromiter(
+        Gig.objects.filter(status='active').values_list('pk', flat=True).iterator(chunk_size=READ_CHUNK_SIZE),
+        dtype=np.int64,
+    )
+    active = np.isin(np.asarray(ids, dtype=np.int64), active_ids)
+    wanted = None if gig_ids is None else set(gig_ids)
+    positions = [
+        position for position, pk in enumerate(ids)
+        if active[position] and (wanted is None or pk in wanted)
+    ]
+    k = get_neighbor_count()
+    min_count = getattr(settings, 'GIG_ALSO_ORDERED_MIN_BUYERS', 2)
+
+    batch_ids = []
+    rows = []
+    for position, neighbors in top_neighbors(matrix, positions, active, k, min_count):
+        batch_ids.append(ids[position])
+        rows.extend(
+            GigNeighbor(gig_id=ids[position], neighbor_id=ids[neighbor], kind=KIND, rank=rank, score=score)
+            for rank, (neighbor, score) in enumerate(neighbors)
+        )
+        if len(batch_ids) == WRITE_BATCH_SIZE:
+            replace_neighbors(KIND, batch_ids, rows)
+            batch_ids, rows = [], []
+    replace_neighbors(KIND, batch_ids, rows)
+
+    # Gigs left without counted orders, e.g. after a cancellation
+    unordered = GigNeighbor.objects.filter(kind=KIND).exclude(gig_id__in=counted_orders().values('gig_id'))
+    if gig_ids is not None:
+        unordered = unordered.filter(gig_id__in=gig_ids)
+    unordered.delete()
+    delete_inactive_neighbors(KIND, gig_ids)
+    return len(positions)
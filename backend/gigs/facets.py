@@ -0,0 +1,89 @@
+"""
+Facet counts for gig listings.
+
+All facets come from one grouped query over the filtered queryset: rows are
+bucketed by category, subcategory, price band and delivery band in SQL, and
+the handful of resulting groups are rolled up per facet in Python. The cost
+follows the size of the result set, not the number of facet values.
+"""
+from collections import defaultdict
+
+from django.db.models import Case, Count, IntegerField, Value, When
+
+# (upper bound exclusive, label); the last band is open ended
+PRICE_BANDS = [
+    (25, 'Under $25'),
+    (50, '$25 - $50'),
+    (100, '$50 - $100'),
+    (250, '$100 - $250'),
+    (None, '$250 & above'),
+]
+
+# (upper bound inclusive in days, label)
+DELIVERY_BANDS = [
+    (1, 'Express 24H'),
+    (3, 'Up to 3 days'),
+    (7, 'Up to 7 days'),
+    (None, 'Anytime'),
+]
+
+
+def _band_case(field, bands, lookup):
+    whens = [When(**{f'{field}__isnull': True, 'then': Value(None)})]
+    whens += [
+        When(**{f'{field}__{lookup}': bound, 'then': Value(index)})
+        for index, (bound, _) in enumerate(bands)
+        if bound is not None
+    ]
+    return Case(*whens, default=Value(len(bands) - 1), output_field=IntegerField())
+
+
+def compute_facets(queryset):
+    """Return category, subcategory, price and delivery time counts for ``queryset``."""
+    grouped = (
+        queryset.model.objects.filter(pk__in=queryset.values('pk'))
+        .annotate(
+            price_band=_band_case('min_price', PRICE_BANDS, 'lt'),
+            delivery_band=_band_case('delivery_time', DELIVERY_BANDS, 'lte'),
+        )
+        .values(
+            'category_id', 'category__name',
+            'subcategory_id', 'subcategory__name',
+            'price_band', 'delivery_band',
+        )
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+
+    categories = defaultdict(int)
+    subcategories = defaultdict(int)
+    prices = defaultdict(int)
+    delivery = defaultdict(int)
+    for row in grouped:
+        category = (row['category_id'], row['category__name'])
+        subcategory = (row['subcategory_id'], row['subcategory__name'])
+        categories[category] += row['count']
+        subcategories[subcategory] += row['count']
+        prices[row['price_band']] += row['count']
+        delivery[row['delivery_band']] += row['count']
+
+    def by_count(counts):
+        return [
+            {'id': key[0], 'name': key[1], 'count': count}
+            for key, count in sorted(counts.items(), key=lambda item: (-item[1], item[0][1]))
+        ]
+
+    return {
+        'category': by_count(categories),
+        'subcategory': by_count(subcategories),
+        'price': [
+            {'label': label, 'max': bound, 'count': prices[index]}
+            for index, (bound, label) in enumerate(PRICE_BANDS)
+            if prices[index]
+        ],
+        'delivery_time': [
+            {'label': label, 'max_days': bound, 'count': delivery[index]}
+            for index, (bound, label) in enumerate(DELIVERY_BANDS)
+            if delivery[index]
+        ],
+    }
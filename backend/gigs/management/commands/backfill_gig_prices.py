@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models import Max, Min
+
+from core.management.base import ChunkedCommand
+from gigs.models import Gig, GigPackage
+
+
+class Command(ChunkedCommand):
+    help = "Backfill the denormalized Gig.min_price / Gig.max_price columns from packages."
+
+    def handle(self, *args, **options):
+        total = 0
+        for chunk in self.chunks(Gig.objects.values_list('pk', flat=True), options):
+            prices = {
+                row['gig_id']: row
+                for row in GigPackage.objects.filter(gig_id__in=chunk)
+                .values('gig_id')
+                .annotate(min_price=Min('price'), max_price=Max('price'))
+                .order_by()
+            }
+            gigs = [
+                Gig(
+                    pk=gig_id,
+                    min_price=prices.get(gig_id, {}).get('min_price'),
+                    max_price=prices.get(gig_id, {}).get('max_price'),
+                )
+                for gig_id in chunk
+            ]
+            with transaction.atomic():
+                Gig.objects.bulk_update(gigs, ['min_price', 'max_price'])
+
+            total += len(chunk)
+            self.stdout.write(f"Backfilled {total} gigs")
+
+        self.stdout.write(self.style.SUCCESS(f"Price range backfilled for {total} gigs."))
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.versions import bump_versions
+from gigs.copurchases import gigs_with_new_orders, rebuild_copurchases
+
+
+class Command(BaseCommand):
+    help = "Recompute the \"buyers also ordered\" neighbors (all active gigs, or those with new orders)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--updated-within', type=float, metavar='HOURS',
+            help="Only recompute gigs whose buyers ordered in the last HOURS hours, e.g. from an hourly cron job.",
+        )
+
+    def handle(self, *args, **options):
+        gig_ids = None
+        if options['updated_within'] is not None:
+            gig_ids = gigs_with_new_orders(timezone.now() - timedelta(hours=options['updated_within']))
+
+        total = rebuild_copurchases(gig_ids)
+        bump_versions(['also_ordered'])
+        self.stdout.write(self.style.SUCCESS(f"Recomputed \"also ordered\" gigs for {total} gigs."))
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.versions import bump_versions
+from gigs.models import Gig
+from gigs.similar import rebuild_similar_gigs
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed \"similar gigs\" neighbors (all active gigs, or recently updated ones)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--updated-within', type=float, metavar='HOURS',
+            help=(
+                "Only recompute gigs updated in the last HOURS hours, and the gigs listing them, "
+                "e.g. from an hourly cron job. New matches for unchanged gigs need a full run."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        gig_ids = None
+        if options['updated_within'] is not None:
+            since = timezone.now() - timedelta(hours=options['updated_within'])
+            gig_ids = list(Gig.objects.filter(updated_at__gte=since).values_list('pk', flat=True))
+
+        total = rebuild_similar_gigs(gig_ids)
+        bump_versions(['similar'])
+        self.stdout.write(self.style.SUCCESS(f"Recomputed similar gigs for {total} gigs."))
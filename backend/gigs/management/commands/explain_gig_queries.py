@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from gigs.models import Category, Gig, SubCategory
+from gigs.pagination import KeysetPagination
+from gigs.views import GigsByCategoryView, GigViewSet
+
+SORT_MARKERS = ('TEMP B-TREE FOR ORDER BY', 'Using filesort')
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the first page query of each public gig listing and report "
+        "which Gig indexes the database chooses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plan', action='store_true', help="Print the full plan of each query too.")
+
+    def listing_cases(self):
+        category = Category.objects.order_by('pk').first()
+        subcategory = SubCategory.objects.order_by('pk').first()
+        category_slug = category.slug if category else 'design'
+        subcategory_slug = subcategory.slug if subcategory else 'logo-design'
+        seller_id = Gig.objects.values_list('seller_id', flat=True).first() or 1
+        return [
+            ('newest', GigViewSet, {}, {}),
+            ('category, newest', GigViewSet, {'category__slug': category_slug}, {}),
+            ('subcategory, cheapest', GigViewSet, {'subcategory__slug': subcategory_slug, 'sort': 'price-low'}, {}),
+            ('featured', GigViewSet, {'is_featured': 'true'}, {}),
+            ('seller', GigViewSet, {'seller__id': seller_id}, {}),
+            ('popular', GigViewSet, {'sort': 'popular'}, {}),
+            ('category page', GigsByCategoryView, {}, {'category_id': category.pk if category else 1}),
+        ]
+
+    def first_page(self, view_class, params, kwargs):
+        """The queryset a view paginates for an anonymous first page, as the paginator orders and slices it."""
+        request = Request(APIRequestFactory().get('/', params))
+        view = view_class(request=request, format_kwarg=None, kwargs=kwargs, action='list')
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = KeysetPagination()
+        ordering = paginator.get_ordering(queryset)
+        return queryset.order_by(*paginator.get_order_by(queryset.model, ordering))[:paginator.page_size]
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Gig._meta.db_table)
+        index_names = sorted(name for name, info in constraints.items() if info['index'] or info['primary_key'])
+
+        for label, view_class, params, kwargs in self.listing_cases():
+            plan = self.first_page(view_class, params, kwargs).explain()
+            used = [name for name in index_names if name in plan]
+            line = f"{label}: {', '.join(used) or self.style.WARNING('no index (full scan)')}"
+            # SQLite and MySQL wording for sorting the matched rows instead of reading them in index order
+            if any(marker in plan for marker in SORT_MARKERS):
+                line += self.style.WARNING(' + sort')
+            self.stdout.write(line)
+            if options['verbose_plan']:
+                self.stdout.write(plan + '\n')
@@ -0,0 +1,18 @@
+from core.management.base import ChunkedCommand
+from gigs.models import Gig
+from gigs.search import reindex_gigs
+
+
+class Command(ChunkedCommand):
+    help = "Rebuild the gig full-text search index from scratch."
+
+    chunk_size = 500
+
+    def handle(self, *args, **options):
+        total = 0
+        for chunk in self.chunks(Gig.objects.values_list('pk', flat=True), options):
+            reindex_gigs(chunk)
+            total += len(chunk)
+            self.stdout.write(f"Indexed {total} gigs")
+
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt for {total} gigs."))
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.management.base import ChunkedCommand
+from gigs.models import Gig, SavedGig
+from gigs.trending import clear_boards, event_score, logaddexp
+from orders.models import Order
+from reviews.models import GigRating, OrderRating
+
+
+class Command(ChunkedCommand):
+    help = "Recompute Gig.trending_score from the orders, saves and ratings of the last DAYS days."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--days', type=float, default=30,
+            help="Older events have decayed to next to nothing and are skipped (default: 30).",
+        )
+
+    def events(self, chunk, since):
+        yield 'order', Order.objects.filter(
+            gig_id__in=chunk, created_at__gte=since,
+        ).exclude(status='cancelled').values_list('gig_id', 'created_at')
+        yield 'save', SavedGig.objects.filter(
+            gig_id__in=chunk, created_at__gte=since,
+        ).values_list('gig_id', 'created_at')
+        yield 'rating', GigRating.objects.filter(
+            gig_id__in=chunk, timestamp__gte=since,
+        ).values_list('gig_id', 'timestamp')
+        yield 'rating', OrderRating.objects.filter(
+            order__gig_id__in=chunk, timestamp__gte=since,
+        ).values_list('order__gig_id', 'timestamp')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+
+        total = 0
+        for chunk in self.chunks(Gig.objects.values_list('pk', flat=True), options):
+            scores = dict.fromkeys(chunk, 0.0)
+            for kind, rows in self.events(chunk, since):
+                for gig_id, when in rows.order_by().iterator():
+                    scores[gig_id] = logaddexp(scores[gig_id], event_score(kind, when))
+            gigs = [Gig(pk=gig_id, trending_score=score) for gig_id, score in scores.items()]
+            with transaction.atomic():
+                Gig.objects.bulk_update(gigs, ['trending_score'])
+
+            total += len(chunk)
+
+        clear_boards()
+        self.stdout.write(self.style.SUCCESS(f"Trending scores rebuilt for {total} gigs."))
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models import Count
+
+from core.management.base import ChunkedCommand
+from gigs.models import Gig, SavedGig
+
+
+class Command(ChunkedCommand):
+    help = "Recount the denormalized Gig.saves_count column from SavedGig rows."
+
+    def handle(self, *args, **options):
+        total = 0
+        for chunk in self.chunks(Gig.objects.values_list('pk', flat=True), options):
+            counts = dict(
+                SavedGig.objects.filter(gig_id__in=chunk)
+                .values('gig_id')
+                .annotate(n=Count('pk'))
+                .order_by()
+                .values_list('gig_id', 'n')
+            )
+            gigs = [Gig(pk=gig_id, saves_count=counts.get(gig_id, 0)) for gig_id in chunk]
+            with transaction.atomic():
+                Gig.objects.bulk_update(gigs, ['saves_count'])
+
+            total += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Saves recounted for {total} gigs."))
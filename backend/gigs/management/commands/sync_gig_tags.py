@@ -0,0 +1,25 @@
+from django.db.models import Count
+
+from core.management.base import ChunkedCommand
+from gigs.models import Gig, Tag
+from gigs.tags import sync_tags_for_gigs
+
+
+class Command(ChunkedCommand):
+    help = "Rebuild the normalized tag tables from Gig.tags and recount Tag.gig_count."
+
+    chunk_size = 500
+
+    def handle(self, *args, **options):
+        total = 0
+        for chunk in self.chunks(Gig.objects.only('pk', 'tags'), options):
+            sync_tags_for_gigs(chunk)
+            total += len(chunk)
+
+        # Recount from scratch in case earlier writes bypassed the serializer
+        tags = list(Tag.objects.annotate(actual=Count('gig_tags')))
+        for tag in tags:
+            tag.gig_count = tag.actual
+        Tag.objects.bulk_update(tags, ['gig_count'], batch_size=options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Synced tags for {total} gigs."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0004_alter_gig_seller'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GigSearchDocument',
+            fields=[
+                ('gig', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='gigs.gig')),
+                ('length', models.FloatField()),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GigSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('doc_length', models.FloatField()),
+                ('gig', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='gigs.gig')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', '-weight'], name='gigs_gigsea_term_213141_idx')],
+                'unique_together': {('term', 'gig')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_user_email'),
+        ('gigs', '0005_gigsearchdocument_gigsearchterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gig',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['min_price', 'id'], name='gigs_gig_min_pri_df06c7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['category', 'min_price'], name='gigs_gig_categor_9deb26_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-18 12:45
+
+import reviews.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_sellerprofile_rating_1_count_and_more'),
+        ('gigs', '0006_gig_max_price_gig_min_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gig',
+            name='popularity_score',
+            field=models.FloatField(default=reviews.models.default_popularity_score, editable=False),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='rating_average',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['popularity_score', 'id'], name='gigs_gig_popular_dfa3ff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['rating_average', 'id'], name='gigs_gig_rating__4dc87d_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0007_gig_popularity_score_gig_rating_1_count_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('gig_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-gig_count', 'name'], name='gigs_tag_gig_cou_c83339_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='GigTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gig', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gig_tags', to='gigs.gig')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gig_tags', to='gigs.tag')),
+            ],
+            options={
+                'unique_together': {('tag', 'gig')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0008_tag_gigtag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gig',
+            name='saves_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
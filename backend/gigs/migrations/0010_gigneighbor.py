@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0009_gig_saves_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GigNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('gig', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='gigs.gig')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_of', to='gigs.gig')),
+            ],
+            options={
+                'unique_together': {('gig', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0010_gigneighbor'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='gigneighbor',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='gigneighbor',
+            name='kind',
+            field=models.CharField(choices=[('similar', 'Similar'), ('also_ordered', 'Also ordered')], default='similar', max_length=20),
+        ),
+        migrations.AlterUniqueTogether(
+            name='gigneighbor',
+            unique_together={('gig', 'kind', 'rank')},
+        ),
+    ]
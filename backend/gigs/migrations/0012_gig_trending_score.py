@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_sellerprofile_rating_1_count_and_more'),
+        ('gigs', '0011_gigneighbor_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gig',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['trending_score', 'id'], name='gigs_gig_trendin_361e28_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['category', 'trending_score'], name='gigs_gig_categor_aab940_idx'),
+        ),
+    ]
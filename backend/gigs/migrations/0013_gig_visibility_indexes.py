@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_sellerprofile_rating_1_count_and_more'),
+        ('gigs', '0012_gig_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['status', 'created_at'], name='gigs_gig_status_9f4408_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['status', 'category', 'created_at'], name='gigs_gig_status_a66e25_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['status', 'subcategory', 'min_price'], name='gigs_gig_status_ad6e31_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['seller', 'status'], name='gigs_gig_seller__f03358_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['is_featured', 'status'], name='gigs_gig_is_feat_581c3c_idx'),
+        ),
+        # After (seller, status) exists, so MySQL keeps an index for the seller foreign key
+        migrations.RemoveIndex(
+            model_name='gig',
+            name='gigs_gig_seller__5defcc_idx',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0013_gig_visibility_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_rendered',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='thumbnail_image_rendered',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='giggallery',
+            name='media_file_rendered',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+    ]
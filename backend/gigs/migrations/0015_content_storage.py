@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 14:19
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0014_variants_rendered'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gig',
+            name='thumbnail_image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.get_content_storage, upload_to='gig_thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='giggallery',
+            name='media_file',
+            field=models.FileField(blank=True, null=True, storage=core.storage.get_content_storage, upload_to='gig_gallery/'),
+        ),
+    ]
@@ -1,8 +1,12 @@
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
+from django.db.models import Max, Min
 from django.utils.text import slugify
 
+from core.storage import get_content_storage
+from reviews.models import RatingAggregate, default_popularity_score
+
 class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -15,6 +19,8 @@ class Category(models.Model):
     slug = models.SlugField(unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to='category_images/', blank=True, null=True)
+    # Name of the image whose variants are rendered, see core.derivatives
+    image_rendered = models.CharField(max_length=100, blank=True, default='', editable=False)
     is_active = models.BooleanField(default=True)
 
     def save(self, *args, **kwargs):
@@ -40,7 +46,20 @@ class SubCategory(models.Model):
         return f"{self.category.name} → {self.name}"
 
 
-class Gig(TimeStampedModel):
+class GigQuerySet(models.QuerySet):
+
+    def active(self):
+        return self.filter(status='active')
+
+    def visible_to(self, user):
+        """Active gigs, plus the user's own drafts and paused gigs."""
+        # Only sellers have gigs; everyone else keeps the plain status filter the indexes lead with
+        if user.is_authenticated and user.is_seller:
+            return self.filter(models.Q(status='active') | models.Q(seller__user=user))
+        return self.active()
+
+
+class Gig(TimeStampedModel, RatingAggregate):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
         ('active', 'Active'),
@@ -54,22 +73,63 @@ class Gig(TimeStampedModel):
     subcategory = models.ForeignKey('Subcategory', on_delete=models.CASCADE)
     delivery_time = models.IntegerField()
     tags = models.CharField(max_length=255, blank=True, null=True)
-    thumbnail_image = models.ImageField(upload_to='gig_thumbnails/', blank=True, null=True)
+    thumbnail_image = models.ImageField(upload_to='gig_thumbnails/', storage=get_content_storage, blank=True, null=True)
+    # Name of the thumbnail whose variants are rendered, see core.derivatives
+    thumbnail_image_rendered = models.CharField(max_length=100, blank=True, default='', editable=False)
     status = models.CharField(
         max_length=10,
         choices=STATUS_CHOICES,
         default='draft'
     )
     is_featured = models.BooleanField(default=False)
+    # Denormalized from the gig's packages, see refresh_price_range()
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, editable=False)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, editable=False)
+    # Bayesian-weighted rating, see RatingAggregate.bayesian_rating()
+    popularity_score = models.FloatField(default=default_popularity_score, editable=False)
+    # Number of users who saved the gig, maintained by gigs.saves
+    saves_count = models.PositiveIntegerField(default=0, editable=False)
+    # Log of the time-weighted sum of orders, saves and ratings, see gigs.trending
+    trending_score = models.FloatField(default=0, editable=False)
+
+    objects = GigQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def refresh_price_range(self):
+        """
+        Recompute min_price/max_price from the gig's packages.
+        Must be called after any write to the gig's packages.
+        """
+        prices = self.packages.aggregate(min_price=Min('price'), max_price=Max('price'))
+        Gig.objects.filter(pk=self.pk).update(**prices)
+        self.min_price = prices['min_price']
+        self.max_price = prices['max_price']
+
+    def apply_rating_change(self, removed=None, added=None):
+        return super().apply_rating_change(removed, added) + ['popularity_score']
+
+    def recompute_rating_summary(self):
+        super().recompute_rating_summary()
+        self.popularity_score = self.bayesian_rating()
+
     class Meta:
         indexes = [
             models.Index(fields=['category']),
             models.Index(fields=['subcategory']),
-            models.Index(fields=['seller']),
+            # Public listings filter on status first, see GigQuerySet.active()
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'category', 'created_at']),
+            models.Index(fields=['status', 'subcategory', 'min_price']),
+            models.Index(fields=['seller', 'status']),
+            models.Index(fields=['is_featured', 'status']),
+            models.Index(fields=['min_price', 'id']),
+            models.Index(fields=['category', 'min_price']),
+            models.Index(fields=['popularity_score', 'id']),
+            models.Index(fields=['rating_average', 'id']),
+            models.Index(fields=['trending_score', 'id']),
+            models.Index(fields=['category', 'trending_score']),
         ]
 
 
@@ -108,7 +168,9 @@ class GigGallery(models.Model):
 
     gig = models.ForeignKey('Gig', on_delete=models.CASCADE, related_name='gallery')
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPE_CHOICES)
-    media_file = models.FileField(upload_to='gig_gallery/', blank=True, null=True)
+    media_file = models.FileField(upload_to='gig_gallery/', storage=get_content_storage, blank=True, null=True)
+    # Name of the image whose variants are rendered, see core.derivatives
+    media_file_rendered = models.CharField(max_length=100, blank=True, default='', editable=False)
     # media_url = models.CharField(max_length=255) # Removed media_url
 
     def __str__(self):
@@ -127,3 +189,79 @@ class SavedGig(TimeStampedModel):
 
     class Meta:
         unique_together = ('user', 'gig')
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    # Number of gigs carrying the tag, maintained by gigs.tags
+    gig_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-gig_count', 'name']),
+        ]
+
+
+class GigTag(models.Model):
+    """Normalized form of Gig.tags, kept in sync by gigs.tags.sync_gig_tags()."""
+    gig = models.ForeignKey('Gig', on_delete=models.CASCADE, related_name='gig_tags')
+    tag = models.ForeignKey('Tag', on_delete=models.CASCADE, related_name='gig_tags')
+
+    def __str__(self):
+        return f"{self.tag_id} → {self.gig_id}"
+
+    class Meta:
+        unique_together = ('tag', 'gig')
+
+
+class GigSearchDocument(models.Model):
+    """Per-gig statistics for the search index (used for BM25 length normalization)."""
+    gig = models.OneToOneField('Gig', on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    length = models.FloatField()
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search document for {self.gig_id}"
+
+
+class GigSearchTerm(models.Model):
+    """A posting in the gig search inverted index."""
+    gig = models.ForeignKey('Gig', on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()  # field-weighted term frequency
+    doc_length = models.FloatField()  # copied from GigSearchDocument so ranking needs no join
+
+    def __str__(self):
+        return f"{self.term} → {self.gig_id}"
+
+    class Meta:
+        unique_together = ('term', 'gig')
+        indexes = [
+            models.Index(fields=['term', '-weight']),
+        ]
+
+
+class GigNeighbor(models.Model):
+    """
+    One precomputed related gig, see gigs.similar and gigs.copurchases.
+    ``rank`` 0 is the closest.
+    """
+    KIND_CHOICES = [
+        ('similar', 'Similar'),
+        ('also_ordered', 'Also ordered'),
+    ]
+
+    gig = models.ForeignKey('Gig', on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey('Gig', on_delete=models.CASCADE, related_name='neighbor_of')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='similar')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    def __str__(self):
+        return f"{self.gig_id} → {self.neighbor_id} ({self.kind}, {self.score:.2f})"
+
+    class Meta:
+        unique_together = ('gig', 'kind', 'rank')
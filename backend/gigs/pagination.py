@@ -0,0 +1,194 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_key(value):
+    # DjangoJSONEncoder truncates datetimes to milliseconds, which would break
+    # the equality half of the seek predicate.
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset's own ordering.
+
+    The ordering set by the view is extended with the primary key as a
+    tie-breaker, and the cursor stores the sort key values of the last row of
+    the page. The next page is fetched with a ``WHERE (key, id) > cursor``
+    predicate, so every page costs the same no matter how deep it is.
+
+    Rows whose sort key is NULL, such as a gig without packages sorted by
+    price, come after all the others in either direction. The total count is
+    only computed when the client asks for it with ``?count=true``.
+    """
+    page_size = api_settings.PAGE_SIZE or 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.count = None
+
+        self.fields = [self._get_field(queryset.model, field.lstrip('-')) for field in self.ordering]
+        queryset = queryset.order_by(*self.get_order_by(queryset.model, self.ordering))
+
+        if self._wants_count(request):
+            self.count = queryset.count()
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self._seek_filter(cursor))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link()}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering:
+            ordering = ['-created_at']
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def get_order_by(self, model, ordering):
+        """``ordering`` as ORDER BY terms, with NULLs last for nullable keys."""
+        order_by = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if not self._is_nullable(self._get_field(model, name)):
+                order_by.append(field)
+            elif field.startswith('-'):
+                order_by.append(F(name).desc(nulls_last=True))
+            else:
+                order_by.append(F(name).asc(nulls_last=True))
+        return order_by
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        values = [attrgetter(field.lstrip('-').replace('__', '.'))(last) for field in self.ordering]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values))
+
+    def encode_cursor(self, values):
+        raw = json.dumps(values, default=_encode_key).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [self._to_python(field, value) for field, value in zip(self.fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _to_python(self, field, value):
+        if field is None:
+            # Not a model field (e.g. an annotation); compared as decoded
+            return value
+        if value is None:
+            if not self._is_nullable(field):
+                raise ValidationError("NULL for a non-nullable sort key")
+            return None
+        return field.to_python(value)
+
+    def _seek_filter(self, values):
+        """
+        Build ``(k1, k2, ...) > (v1, v2, ...)`` honouring each key's direction.
+        A NULL key sorts after every value, so it is "after" any non-NULL
+        cursor value, and nothing but another NULL ties with a NULL one.
+        """
+        seek = Q()
+        for position, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            value = values[position]
+            if value is None:
+                # Nothing sorts after NULL on this key
+                continue
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f'{name}__{lookup}': value})
+            if self._is_nullable(self.fields[position]):
+                condition |= Q(**{f'{name}__isnull': True})
+            for previous, previous_value in zip(self.ordering[:position], values):
+                previous = previous.lstrip('-')
+                if previous_value is None:
+                    condition &= Q(**{f'{previous}__isnull': True})
+                else:
+                    condition &= Q(**{previous: previous_value})
+            seek |= condition
+        return seek
+
+    def _wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def _get_field(self, model, field_name):
+        """The model field behind ``field_name``, following ``__`` through relations."""
+        field = None
+        for part in field_name.split('__'):
+            if model is None:
+                return None
+            try:
+                field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            model = field.related_model
+        return field
+
+    def _is_nullable(self, field):
+        return field is not None and field.null
@@ -0,0 +1,126 @@
+import json
+import re
+
+from django.conf import settings
+from django.utils.datastructures import MultiValueDict
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, DataAndFiles, FormParser, MultiPartParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Newline delimited JSON: one object per line, blank lines ignored.
+    Parses to a list so views can treat it like a JSON array.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for number, line in enumerate(stream, start=1):
+            line = line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON parse error on line {number} - {exc}')
+        return items
+
+
+def decode_json_field(name, value):
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError as exc:
+        raise ParseError(f'{name} is not valid JSON - {exc}')
+
+
+BRACKETED_KEY_RE = re.compile(r'^([^\[\]]+)((?:\[[^\[\]]+\])+)$')
+BRACKET_RE = re.compile(r'\[([^\[\]]+)\]')
+
+
+def set_bracketed(payload, key, value):
+    """
+    Store ``value`` under ``key`` in ``payload``, expanding bracketed keys:
+    ``packages[0][price]`` sets ``payload['packages']['0']['price']``.
+    """
+    match = BRACKETED_KEY_RE.match(key)
+    parts = [match.group(1), *BRACKET_RE.findall(match.group(2))] if match else [key]
+    node = payload
+    for part in parts[:-1]:
+        node = node.setdefault(part, {})
+        if not isinstance(node, dict):
+            raise ParseError(f'{key} conflicts with another field of the same name')
+    if isinstance(node.get(parts[-1]), dict):
+        raise ParseError(f'{key} conflicts with another field of the same name')
+    node[parts[-1]] = value
+
+
+def single_or_list(values):
+    """The value of a form key, or the list of its values when it was sent more than once."""
+    return values[0] if len(values) == 1 else list(values)
+
+
+def indexed_to_lists(node):
+    """Turn dicts keyed by indexes only (``{'0': ..., '1': ...}``) into lists, in index order."""
+    if not isinstance(node, dict):
+        return node
+    node = {key: indexed_to_lists(value) for key, value in node.items()}
+    if node and all(key.isdigit() for key in node):
+        return [node[key] for key in sorted(node, key=int)]
+    return node
+
+
+class GigPayloadParserMixin:
+    """
+    Turns a gig form submission into the plain structure GigSerializer reads.
+
+    ``packages`` and ``faqs`` are decoded once, and each ``gallery_meta`` entry
+    is paired with its file from ``gallery_files`` as a ``gallery_uploads``
+    item. Nested values may also be sent as bracketed keys, e.g.
+    ``packages[0][price]`` or ``gallery_uploads[0][media_file]``. A key sent
+    more than once keeps all its values, as a list. Uploaded files are placed
+    in the payload as they are, never copied.
+    """
+    JSON_FIELDS = ('packages', 'faqs')
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        data, files = getattr(parsed, 'data', parsed), getattr(parsed, 'files', MultiValueDict())
+        return DataAndFiles(self.build_payload(data, files), MultiValueDict())
+
+    def build_payload(self, data, files):
+        payload = {}
+        for key, values in data.lists():
+            set_bracketed(payload, key, single_or_list(values))
+        for key, uploaded in files.lists():
+            if key != 'gallery_files':
+                set_bracketed(payload, key, single_or_list(uploaded))
+        payload = indexed_to_lists(payload)
+
+        for name in self.JSON_FIELDS:
+            if name in payload:
+                payload[name] = decode_json_field(name, payload[name])
+
+        gallery_meta = decode_json_field('gallery_meta', payload.pop('gallery_meta', None) or '[]')
+        if not isinstance(gallery_meta, list):
+            raise ParseError('gallery_meta must be a list')
+        gallery_files = files.getlist('gallery_files')
+        if gallery_files:
+            payload['gallery_uploads'] = payload.get('gallery_uploads', []) + [
+                {'media_type': meta.get('media_type'), 'media_file': media_file}
+                for meta, media_file in zip(gallery_meta, gallery_files)
+                if isinstance(meta, dict)
+            ]
+        return payload
+
+
+class GigMultiPartParser(GigPayloadParserMixin, MultiPartParser):
+    pass
+
+
+class GigFormParser(GigPayloadParserMixin, FormParser):
+    pass
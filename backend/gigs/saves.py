@@ -0,0 +1,66 @@
+"""
+Saved gigs.
+
+Saving and unsaving take gig ids and are idempotent: saving a saved gig or
+unsaving one that is not saved changes nothing. A user's save writes run
+one at a time, behind a lock on the user row, so double clicks cannot race
+into the unique constraint, and ``Gig.saves_count`` moves by exactly the
+number of rows added or removed.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from core.versions import invalidate_versions
+from .cache import invalidate_gigs
+from .models import Gig, SavedGig
+from .trending import record_events
+
+
+def saved_scope(user):
+    """Version scope of the user's saved gigs, part of the ETag of gig reads."""
+    return f'saved:{user.pk}'
+
+
+def saved_gig_ids(user, gig_ids):
+    """The subset of ``gig_ids`` the user has saved, in one query."""
+    if not user.is_authenticated or not gig_ids:
+        return set()
+    return set(SavedGig.objects.filter(user=user, gig_id__in=gig_ids).values_list('gig_id', flat=True))
+
+
+def _lock_user(user):
+    get_user_model().objects.select_for_update().filter(pk=user.pk).values_list('pk').first()
+
+
+def _saves_changed(user, gig_ids):
+    # Cards show saves_count too, so every cached listing of the gigs goes stale
+    invalidate_versions([saved_scope(user)])
+    invalidate_gigs(gig_ids)
+
+
+def save_gigs(user, gig_ids):
+    """Save the given gigs for ``user``. Returns the ids that were not saved before."""
+    gig_ids = set(gig_ids)
+    with transaction.atomic():
+        _lock_user(user)
+        already_saved = saved_gig_ids(user, gig_ids)
+        new_ids = sorted(Gig.objects.filter(pk__in=gig_ids - already_saved).values_list('pk', flat=True))
+        if new_ids:
+            SavedGig.objects.bulk_create([SavedGig(user=user, gig_id=gig_id, action='save') for gig_id in new_ids])
+            Gig.objects.filter(pk__in=new_ids).update(saves_count=F('saves_count') + 1)
+            record_events(new_ids, 'save')
+            _saves_changed(user, new_ids)
+    return new_ids
+
+
+def unsave_gigs(user, gig_ids):
+    """Unsave the given gigs for ``user``. Returns the ids that were saved."""
+    with transaction.atomic():
+        _lock_user(user)
+        removed_ids = sorted(saved_gig_ids(user, set(gig_ids)))
+        if removed_ids:
+            SavedGig.objects.filter(user=user, gig_id__in=removed_ids).delete()
+            Gig.objects.filter(pk__in=removed_ids).update(saves_count=F('saves_count') - 1)
+            _saves_changed(user, removed_ids)
+    return removed_ids
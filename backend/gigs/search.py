@@ -0,0 +1,307 @@
+"""
+Full-text search for gigs.
+
+Gigs are tokenized into an inverted index (``GigSearchTerm`` postings plus a
+``GigSearchDocument`` per gig) that is kept up to date from signals, and
+queries are ranked with BM25. Only the postings of the query terms are read,
+so a search costs the same no matter how many gigs the table holds.
+
+Listings are ranked in the database by ``rank_queryset``, which annotates
+each matching gig with its BM25 score as ``search_rank``, so every match can
+be paged through and no id list is sent back to the database. A query with
+no searchable terms (empty, or only stop words and one-letter words, e.g.
+``?q=the``) does not filter the listing at all, as if no query was sent.
+
+The backend is pluggable through the ``GIG_SEARCH_BACKEND`` setting.
+"""
+import math
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERM_LENGTH = 64
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'i', 'in',
+    'is', 'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'will', 'with',
+    'you', 'your',
+})
+
+# Relative weight of each gig field in the index. Category and subcategory
+# names carry the largest boost so a category hit ranks first without hiding
+# title and description matches.
+FIELD_WEIGHTS = {
+    'category': 4.0,
+    'subcategory': 4.0,
+    'title': 3.0,
+    'tags': 2.0,
+    'description': 1.0,
+    'seller': 1.0,
+    'packages': 0.5,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+STATS_CACHE_KEY = 'gigs:search:stats'
+STATS_CACHE_TIMEOUT = 60 * 10
+FREQUENCY_CACHE_KEY = 'gigs:search:df:{match}:{term}'
+
+
+def tokenize(text):
+    """Split text into lowercase index terms, dropping stop words."""
+    if not text:
+        return []
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def build_document(gig):
+    """
+    Return ``{term: weight}`` for a gig.
+
+    Expects ``seller__user``, ``category`` and ``subcategory`` to be selected
+    and ``packages`` to be prefetched.
+    """
+    user = gig.seller.user
+    fields = {
+        'category': gig.category.name,
+        'subcategory': gig.subcategory.name,
+        'title': gig.title,
+        'tags': (gig.tags or '').replace(',', ' '),
+        'description': gig.description,
+        'seller': ' '.join(filter(None, [user.username, user.first_name, user.last_name])),
+        'packages': ' '.join(package.description for package in gig.packages.all()),
+    }
+
+    terms = defaultdict(float)
+    for field, text in fields.items():
+        for token in tokenize(text):
+            terms[token] += FIELD_WEIGHTS[field]
+    return dict(terms)
+
+
+class BaseSearchBackend:
+    """Interface every gig search backend implements."""
+
+    def index_gigs(self, gigs):
+        raise NotImplementedError
+
+    def remove_gigs(self, gig_ids):
+        raise NotImplementedError
+
+    def search(self, query, limit=None):
+        """Return a list of ``(gig_id, score)`` pairs, best match first."""
+        raise NotImplementedError
+
+    def rank_queryset(self, queryset, query):
+        """
+        Restrict ``queryset`` to the gigs matching ``query``, annotated with
+        their score as ``search_rank`` and ordered best first.
+        """
+        raise NotImplementedError
+
+
+def query_terms(query):
+    """
+    ``(term, is_prefix, excluded)`` for each distinct term of ``query``. The last
+    term is a prefix so partially typed words still match, leaving out the other
+    query terms, which are scored on their own.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    return [
+        (term, True, terms[:-1]) if position == len(terms) - 1 else (term, False, [])
+        for position, term in enumerate(terms)
+    ]
+
+
+def bm25_idf(document_count, document_frequency):
+    return math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Inverted index stored in regular tables, so it works on MySQL and SQLite alike.
+
+    Postings are read per query term through the ``(term, -weight)`` index. Very
+    common terms are capped at ``GIG_SEARCH_MAX_POSTINGS`` of their highest
+    impact postings, which keeps latency flat as the catalog grows. Their
+    document frequency is counted once and cached with the collection stats.
+    """
+
+    def index_gigs(self, gigs):
+        from .models import GigSearchDocument, GigSearchTerm
+
+        gigs = list(gigs)
+        if not gigs:
+            return
+
+        documents = []
+        postings = []
+        for gig in gigs:
+            terms = build_document(gig)
+            length = sum(terms.values())
+            documents.append(GigSearchDocument(gig_id=gig.pk, length=length))
+            postings.extend(
+                GigSearchTerm(gig_id=gig.pk, term=term, weight=weight, doc_length=length)
+                for term, weight in terms.items()
+            )
+
+        gig_ids = [gig.pk for gig in gigs]
+        with transaction.atomic():
+            GigSearchTerm.objects.filter(gig_id__in=gig_ids).delete()
+            GigSearchDocument.objects.filter(gig_id__in=gig_ids).delete()
+            GigSearchDocument.objects.bulk_create(documents)
+            GigSearchTerm.objects.bulk_create(postings, batch_size=1000)
+
+    def remove_gigs(self, gig_ids):
+        from .models import GigSearchDocument, GigSearchTerm
+
+        GigSearchTerm.objects.filter(gig_id__in=gig_ids).delete()
+        GigSearchDocument.objects.filter(gig_id__in=gig_ids).delete()
+
+    def collection_stats(self):
+        """Return ``(document_count, average_length)``, cached for a few minutes."""
+        from .models import GigSearchDocument
+
+        stats = cache.get(STATS_CACHE_KEY)
+        if stats is None:
+            aggregate = GigSearchDocument.objects.aggregate(count=Count('pk'), avg=Avg('length'))
+            stats = (aggregate['count'] or 0, aggregate['avg'] or 1.0)
+            cache.set(STATS_CACHE_KEY, stats, STATS_CACHE_TIMEOUT)
+        return stats
+
+    def postings(self, term, is_prefix=False, excluded=()):
+        from .models import GigSearchTerm
+
+        if not is_prefix:
+            return GigSearchTerm.objects.filter(term=term)
+        return GigSearchTerm.objects.filter(term__startswith=term).exclude(term__in=excluded)
+
+    def document_frequency(self, term, is_prefix=False, excluded=()):
+        """Number of gigs the term (or prefix) matches, cached like the collection stats."""
+        match = 'prefix:' + ','.join(sorted(excluded)) if is_prefix else 'exact'
+        key = FREQUENCY_CACHE_KEY.format(match=match, term=term)
+        frequency = cache.get(key)
+        if frequency is None:
+            frequency = self.postings(term, is_prefix, excluded).values('gig_id').distinct().count()
+            cache.set(key, frequency, STATS_CACHE_TIMEOUT)
+        return frequency
+
+    def search(self, query, limit=None):
+        max_postings = getattr(settings, 'GIG_SEARCH_MAX_POSTINGS', 5000)
+        document_count, average_length = self.collection_stats()
+
+        scores = defaultdict(float)
+        for term, is_prefix, excluded in query_terms(query):
+            postings = list(
+                self.postings(term, is_prefix, excluded)
+                .order_by('-weight')
+                .values_list('gig_id', 'weight', 'doc_length')[:max_postings]
+            )
+            if not postings:
+                continue
+            capped = len(postings) == max_postings
+            if is_prefix:
+                # A gig matching several expansions ("logo", "logos") counts once, with the
+                # best of them; postings come best first
+                best = {}
+                for posting in postings:
+                    best.setdefault(posting[0], posting)
+                postings = list(best.values())
+
+            document_frequency = len(postings)
+            if capped:
+                document_frequency = self.document_frequency(term, is_prefix, excluded)
+            idf = bm25_idf(document_count, document_frequency)
+
+            for gig_id, weight, doc_length in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_length / average_length)
+                scores[gig_id] += idf * weight * (BM25_K1 + 1) / (weight + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+    def rank_queryset(self, queryset, query):
+        """
+        Scores every matching gig in SQL with the same BM25 formula as
+        ``search``, one indexed posting lookup per gig and term, without the
+        ``GIG_SEARCH_MAX_POSTINGS`` cap. Document frequencies are read through
+        the cached ``document_frequency``.
+        """
+        from .models import GigSearchTerm
+
+        document_count, average_length = self.collection_stats()
+        matches = Q()
+        score = Value(0.0)
+        for term, is_prefix, excluded in query_terms(query):
+            idf = bm25_idf(document_count, self.document_frequency(term, is_prefix, excluded))
+            norm = Value(BM25_K1 * (1 - BM25_B)) + Value(BM25_K1 * BM25_B / average_length) * F('doc_length')
+            contribution = Value(idf * (BM25_K1 + 1)) * F('weight') / (F('weight') + norm)
+            # Of several prefix expansions, the gig's heaviest posting scores best
+            best = (
+                self.postings(term, is_prefix, excluded)
+                .filter(gig_id=OuterRef('pk'))
+                .annotate(score=contribution)
+                .order_by('-weight')
+                .values('score')[:1]
+            )
+            score = score + Coalesce(Subquery(best, output_field=FloatField()), Value(0.0))
+            matches |= Q(pk__in=self.postings(term, is_prefix, excluded).values('gig_id'))
+        return queryset.filter(matches).annotate(search_rank=score).order_by('-search_rank')
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    backend_path = getattr(settings, 'GIG_SEARCH_BACKEND', 'gigs.search.DatabaseSearchBackend')
+    return import_string(backend_path)()
+
+
+def search_gigs(query, limit=None):
+    return get_backend().search(query, limit=limit)
+
+
+def rank_queryset(queryset, query):
+    """
+    ``queryset`` restricted to the gigs matching ``query`` and ordered by their
+    ``search_rank`` score, best first. Returned unchanged when the query has no
+    searchable terms.
+    """
+    if not tokenize(query):
+        return queryset
+    return get_backend().rank_queryset(queryset, query)
+
+
+def reindex_gigs(gig_ids):
+    """Rebuild the index entries of the given gigs; missing gigs are dropped."""
+    from .models import Gig
+
+    gig_ids = set(gig_ids)
+    if not gig_ids:
+        return
+
+    gigs = list(
+        Gig.objects.filter(pk__in=gig_ids)
+        .select_related('seller__user', 'category', 'subcategory')
+        .prefetch_related('packages')
+    )
+    backend = get_backend()
+    backend.index_gigs(gigs)
+    backend.remove_gigs(gig_ids - {gig.pk for gig in gigs})
+
+
+def schedule_reindex(gig_ids):
+    """Reindex the given gigs once the current transaction commits."""
+    gig_ids = set(gig_ids)
+    if gig_ids:
+        transaction.on_commit(lambda: reindex_gigs(gig_ids))
@@ -1,14 +1,18 @@
 from rest_framework import serializers
-from .models import Category, SubCategory, Gig, GigPackage, GigFAQ, GigGallery, SavedGig
-from accounts.serializers.profile_serializers import SellerProfileMiniSerializer
-import json
+from .models import Category, SubCategory, Gig, GigPackage, GigFAQ, GigGallery, SavedGig, Tag
+from .tags import parse_tags, sync_gig_tags
+from core.fields import ImageVariantsField
+from core.nested_writes import sync_nested
+from accounts.serializers.profile_serializers import SellerProfileMiniSerializer, SellerProfileCardSerializer
 from django.db import transaction
 
 
 class CategorySerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField(source='image')
+
     class Meta:
         model = Category
-        fields = '__all__'
+        exclude = ['image_rendered']
         read_only_fields = ['slug']
 
 
@@ -25,6 +29,7 @@ class GigPackageSerializer(serializers.ModelSerializer):
     class Meta:
         model = GigPackage
         fields = '__all__'
+        read_only_fields = ['gig']
 
 
 class GigFAQSerializer(serializers.ModelSerializer):
@@ -38,29 +43,233 @@ class GigFAQSerializer(serializers.ModelSerializer):
 
 class GigGallerySerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(required=False)
+    media_variants = ImageVariantsField(source='media_file')
 
     class Meta:
         model = GigGallery
-        fields = '__all__'
+        exclude = ['media_file_rendered']
         read_only_fields = ['gig']
 
 
+class GigGalleryUploadSerializer(serializers.ModelSerializer):
+    """A new gallery file paired with its metadata by GigPayloadParserMixin."""
+    class Meta:
+        model = GigGallery
+        fields = ['media_type', 'media_file']
+
+
+class TagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'gig_count']
+        read_only_fields = fields
+
+
 class SavedGigSerializer(serializers.ModelSerializer):
     class Meta:
         model = SavedGig
         fields = '__all__'
         read_only_fields = ['gig']
 
+
+class SavedGigBulkSerializer(serializers.Serializer):
+    MAX_ITEMS = 500
+
+    save = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=MAX_ITEMS)
+    unsave = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=MAX_ITEMS)
+
+    def validate(self, data):
+        both = set(data.get('save', ())) & set(data.get('unsave', ()))
+        if both:
+            raise serializers.ValidationError(f"Gigs cannot be saved and unsaved at once: {sorted(both)}")
+        return data
+
+class GigImportPackageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GigPackage
+        fields = ['package_name', 'description', 'price', 'number_of_revisions', 'delivery_days']
+
+
+class GigImportFAQSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GigFAQ
+        fields = ['question', 'answer']
+
+
+class GigTagsMixin:
+    """Stores ``tags`` as the normalized names parse_tags() reads back, or '' when none are left."""
+
+    def validate_tags(self, value):
+        return ','.join(parse_tags(value))
+
+
+class GigImportSerializer(GigTagsMixin, serializers.ModelSerializer):
+    """
+    One item of a bulk import. Plain JSON only, and foreign keys are taken as
+    raw ids so the importer can resolve the whole batch with one query.
+    """
+    id = serializers.IntegerField(required=False)
+    category_id = serializers.IntegerField(required=False)
+    subcategory_id = serializers.IntegerField()
+    packages = GigImportPackageSerializer(many=True, required=False)
+    faqs = GigImportFAQSerializer(many=True, required=False)
+
+    class Meta:
+        model = Gig
+        fields = [
+            'id', 'title', 'description', 'tags', 'delivery_time', 'status',
+            'category_id', 'subcategory_id', 'packages', 'faqs',
+        ]
+
+
+class EagerLoadingMixin:
+    """
+    Declares the relations each serializer field reads, so views can build a
+    queryset that loads exactly those with joins and prefetches instead of
+    one query per row.
+    """
+    select_related_fields = {}  # field name -> select_related() path
+    prefetch_related_fields = {}  # field name -> prefetch_related() lookup
+    only_fields = None  # field name -> columns for only(); None loads every column
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, extra_columns=()):
+        """
+        ``extra_columns`` are always loaded when columns are restricted, e.g. the
+        sort keys a paginator reads back from the last row.
+        """
+        fields = set(cls.Meta.fields if fields is None else fields)
+        select = [path for field, path in cls.select_related_fields.items() if field in fields]
+        prefetch = [lookup for field, lookup in cls.prefetch_related_fields.items() if field in fields]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if cls.only_fields is not None:
+            columns = {'id', *extra_columns}
+            for field in fields:
+                columns.update(cls.only_fields.get(field, ()))
+            queryset = queryset.only(*columns)
+        return queryset
+
+
+class SparseFieldsMixin:
+    """
+    Lets callers trim the output with ``fields`` and add the relations listed in
+    ``Meta.expandable_fields`` with ``expand``.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand or ():
+            if name in expandable:
+                serializer_class, options = expandable[name]
+                self.fields[name] = serializer_class(**options)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def check_field_selection(cls, fields=None, expand=None):
+        """Reject names the serializer cannot render, rather than silently leaving them out."""
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+        errors = {}
+        unknown = [name for name in expand or () if name not in expandable]
+        if unknown:
+            errors['expand'] = [f"Unknown field: {name}." for name in unknown]
+        known = set(cls.Meta.fields) | set(expandable)
+        unknown = [name for name in fields or () if name not in known]
+        if unknown:
+            errors['fields'] = [f"Unknown field: {name}." for name in unknown]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    @classmethod
+    def get_rendered_field_names(cls, fields=None, expand=None):
+        """Names of the fields an instance built with these arguments will render."""
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+        names = list(cls.Meta.fields) + [name for name in expand or () if name in expandable]
+        if fields:
+            names = [name for name in names if name in fields]
+        return names
+
+
 class GigInlineSerializer(serializers.ModelSerializer):
     class Meta:
         model = Gig
         fields = ['id', 'title', 'category', 'delivery_time'] 
 
-class GigSerializer(serializers.ModelSerializer):
+class GigCardSerializer(EagerLoadingMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact read-only representation used for search results and category pages.
+    Nested collections are only included when requested with ``?expand=``.
+    """
+    seller = SellerProfileCardSerializer(read_only=True)
+    thumbnail_variants = ImageVariantsField(source='thumbnail_image')
+    is_saved = serializers.SerializerMethodField()
+
+    select_related_fields = {
+        'seller': 'seller__user',
+    }
+    prefetch_related_fields = {
+        'packages': 'packages',
+        'faqs': 'faqs',
+        'gallery': 'gallery',
+    }
+    only_fields = {
+        'title': ['title'],
+        'thumbnail_image': ['thumbnail_image'],
+        'thumbnail_variants': ['thumbnail_image', 'thumbnail_image_rendered'],
+        'min_price': ['min_price'],
+        'rating_average': ['rating_average'],
+        'rating_count': ['rating_count'],
+        'saves_count': ['saves_count'],
+        'seller': [
+            'seller__id',
+            'seller__user__id',
+            'seller__user__username',
+            'seller__user__first_name',
+            'seller__user__last_name',
+            'seller__user__profile_picture',
+            'seller__user__profile_picture_rendered',
+        ],
+    }
+
+    class Meta:
+        model = Gig
+        fields = [
+            'id', 'title', 'thumbnail_image', 'thumbnail_variants', 'seller',
+            'min_price', 'rating_average', 'rating_count', 'saves_count', 'is_saved',
+        ]
+        read_only_fields = fields
+        expandable_fields = {
+            'packages': (GigPackageSerializer, {'many': True, 'read_only': True}),
+            'faqs': (GigFAQSerializer, {'many': True, 'read_only': True}),
+            'gallery': (GigGallerySerializer, {'many': True, 'read_only': True}),
+        }
+
+    def get_is_saved(self, obj):
+        # Resolved for the whole page by the view, see SavedFlagViewMixin
+        return obj.pk in self.context.get('saved_gig_ids', ())
+
+
+class GigSerializer(GigTagsMixin, EagerLoadingMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Gig model with nested representations for packages, FAQs, and gallery items.
     Handles creation and updates of gigs along with their related objects.
     """
+    select_related_fields = {
+        'seller': 'seller__user',
+        'category_name': 'category',
+        'subcategory_name': 'subcategory',
+    }
+    prefetch_related_fields = {
+        'packages': 'packages',
+        'faqs': 'faqs',
+        'gallery': 'gallery',
+    }
+
     # ID fields for related models
     seller_id = serializers.PrimaryKeyRelatedField(source='seller', read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
@@ -78,64 +287,45 @@ class GigSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     subcategory_name = serializers.CharField(source='subcategory.name', read_only=True)
     seller = SellerProfileMiniSerializer(read_only=True)
+    thumbnail_variants = ImageVariantsField(source='thumbnail_image')
+    is_saved = serializers.SerializerMethodField()
 
     # Nested serializers
     packages = GigPackageSerializer(many=True, required=False)
     faqs = GigFAQSerializer(many=True, required=False)
     gallery = GigGallerySerializer(many=True, required=False, read_only=True)
+    gallery_uploads = GigGalleryUploadSerializer(many=True, required=False, write_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
 
     class Meta:
         model = Gig
         fields = [
             'id', 'title', 'description', 'tags',
             'delivery_time', 'status', 'is_featured',
-            'thumbnail_image', 'seller_id','seller',
+            'thumbnail_image', 'thumbnail_variants', 'seller_id','seller',
+            'min_price', 'max_price',
+            'rating_average', 'rating_count', 'rating_histogram',
+            'saves_count', 'is_saved',
             'category_id', 'subcategory_id',
             'category_name', 'subcategory_name',
-            'packages', 'faqs', 'gallery',
+            'packages', 'faqs', 'gallery', 'gallery_uploads',
         ]
-        read_only_fields = ['seller', 'seller_id']
+        read_only_fields = ['seller', 'seller_id', 'min_price', 'max_price', 'rating_average', 'rating_count']
 
     def to_internal_value(self, data):
-        # Handle multipart/form-data where nested fields come as JSON strings
-        if isinstance(data, dict):
-            for field in ['packages', 'faqs', 'gallery_meta']:
-                if field in data and isinstance(data[field], str):
-                    try:
-                        data[field] = json.loads(data[field])
-                    except json.JSONDecodeError:
-                        data[field] = []
-            thumbnail = data.get('thumbnail_image')
-            if isinstance(thumbnail, str) and self.instance:
-                data = data.copy()
-                data['thumbnail_image'] = self.instance.thumbnail_image
-        
+        # Clients echo the stored thumbnail back as a URL; only an upload replaces it
+        if self.instance and isinstance(data.get('thumbnail_image'), str):
+            data = {key: value for key, value in data.items() if key != 'thumbnail_image'}
         return super().to_internal_value(data)
 
-    def validate(self, attrs):
-        for field in ['packages', 'faqs']:
-            raw_data = self.initial_data.get(field)
-
-            if raw_data:
-                if isinstance(raw_data, str):
-                    try:
-                        raw_data = json.loads(raw_data)
-                    except json.JSONDecodeError:
-                        raise serializers.ValidationError({field: 'Invalid JSON format'})
-
-                if not isinstance(raw_data, list):
-                    raise serializers.ValidationError({field: 'Expected a list'})
-
-                for i, item in enumerate(raw_data):
-                    if not isinstance(item, dict):
-                        raise serializers.ValidationError({field: f"Item {i} must be an object."})
-                    if field == 'packages':
-                        if 'package_name' not in item:
-                            raise serializers.ValidationError({field: f"package_name missing in item {i}"})
+    def get_is_saved(self, obj):
+        return obj.pk in self.context.get('saved_gig_ids', ())
 
-                attrs[field] = raw_data
-
-        return super().validate(attrs)
+    @staticmethod
+    def publish_drafts(validated_data):
+        """Gigs saved as drafts go live straight away; shared with gigs.bulk."""
+        if validated_data.get('status') == 'draft':
+            validated_data['status'] = 'active'
 
     @transaction.atomic
     def create(self, validated_data):
@@ -146,15 +336,13 @@ class GigSerializer(serializers.ModelSerializer):
         if not request:
             raise serializers.ValidationError("Request context is required")
 
-        # If status is draft, change to active
-        if validated_data.get('status') == 'draft':
-            validated_data['status'] = 'active'
+        self.publish_drafts(validated_data)
 
         # Extract nested data with proper defaults
         packages_data = validated_data.pop('packages', [])
         faqs_data = validated_data.pop('faqs', [])
-        gallery_data = self._parse_gallery_data(request)
-    
+        gallery_data = validated_data.pop('gallery_uploads', [])
+
         # Create main gig instance
         gig = Gig.objects.create(**validated_data)
 
@@ -162,6 +350,8 @@ class GigSerializer(serializers.ModelSerializer):
         self._create_related_objects(gig, packages_data, GigPackage)
         self._create_related_objects(gig, faqs_data, GigFAQ)
         self._create_related_objects(gig, gallery_data, GigGallery)
+        gig.refresh_price_range()
+        sync_gig_tags(gig)
 
         return gig
 
@@ -173,24 +363,26 @@ class GigSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request:
             raise serializers.ValidationError("Request context is required")
-        
-        # If status is draft, change to active
-        if validated_data.get('status') == 'draft':
-            validated_data['status'] = 'active'
+
+        self.publish_drafts(validated_data)
 
         # Handle updates to nested data
         packages_data = validated_data.pop('packages', None)
         faqs_data = validated_data.pop('faqs', None)
-        gallery_data = self._parse_gallery_data(request)
+        gallery_data = validated_data.pop('gallery_uploads', None)
 
         # Update main gig fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
 
+        if 'tags' in validated_data:
+            sync_gig_tags(instance)
+
         # Update nested objects if provided
         if packages_data is not None:
             self._handle_nested_update(instance.packages, packages_data, GigPackage)
+            instance.refresh_price_range()
 
         if faqs_data is not None:
             self._handle_nested_update(instance.faqs, faqs_data, GigFAQ)
@@ -209,71 +401,21 @@ class GigSerializer(serializers.ModelSerializer):
                 [model_class(gig=gig, **item_data) for item_data in items_data]
             )
 
-    def _parse_gallery_data(self, request):
-        """
-        Parse only new gallery data from request.
-        Existing gallery items (URLs) will be preserved by skipping them.
-        """
-        try:
-            gallery_meta = request.data.get('gallery_meta', '[]')
-            if isinstance(gallery_meta, str):
-                gallery_meta = json.loads(gallery_meta)
-
-            gallery_files = request.FILES.getlist('gallery_files', [])
-
-            parsed_gallery = []
-            for i, meta in enumerate(gallery_meta):
-                if isinstance(meta, dict) and i < len(gallery_files):
-                    media_file = gallery_files[i]
-                    if hasattr(media_file, 'read'):  # new file only
-                        parsed_gallery.append({
-                            'media_type': meta.get('media_type'),
-                            'media_file': media_file,
-                        })
-
-            return parsed_gallery
-
-        except json.JSONDecodeError:
-            raise serializers.ValidationError("Invalid gallery metadata format")
-        except Exception as e:
-            raise serializers.ValidationError(f"Error processing gallery data: {str(e)}")
+    # Natural keys used to match submitted items to existing rows when they carry no id
+    NESTED_KEYS = {
+        GigPackage: ('package_name',),
+        GigFAQ: ('question',),
+        GigGallery: (),
+    }
 
     def _handle_nested_update(self, manager, new_data, model_class):
         """
-        Handles updates for nested objects (packages, faqs, gallery).
-        - Updates existing items by ID.
-        - Preserves existing gallery items if they are not new uploads.
-        - Adds new ones.
-        - Only deletes if explicitly missing and it's not a gallery.
+        Diff the submitted packages/FAQs/gallery items against the gig's rows and
+        write only the changes. Gallery items are never deleted here, since only
+        new uploads are submitted.
         """
-        existing_items = {item.id: item for item in manager.all()}
-        new_items = []
-
-        is_gallery = model_class.__name__ == "GigGallery"
-
-        for item_data in new_data:
-            item_id = item_data.get("id")
-
-            # Remove 'gig' from incoming data if present
-            item_data.pop("gig", None)
-
-            # Update existing items
-            if item_id and item_id in existing_items:
-                item = existing_items[item_id]
-                for field, value in item_data.items():
-                    if field != "id" and hasattr(item, field):
-                        setattr(item, field, value)
-                item.save()
-                del existing_items[item_id]
-
-            # Create new item (for gallery, this will be newly uploaded files)
-            else:
-                new_items.append(model_class(gig=manager.instance, **item_data))
-
-        # Create new items if any
-        if new_items:
-            model_class.objects.bulk_create(new_items)
-
-        # For non-gallery models, delete removed items
-        if not is_gallery and existing_items:
-            manager.filter(id__in=existing_items.keys()).delete()
+        sync_nested(
+            manager, new_data,
+            key_fields=self.NESTED_KEYS[model_class],
+            delete_missing=model_class is not GigGallery,
+        )
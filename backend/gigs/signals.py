@@ -0,0 +1,183 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from accounts.models import SellerProfile
+from orders.models import Order
+from .cache import invalidate_gigs, invalidate_taxonomy
+from .models import Category, SubCategory, Gig, GigPackage, GigFAQ, GigGallery, Tag
+from .search import schedule_reindex
+from .suggest import schedule_suggest_update
+from .trending import merge_into_boards, record_events
+
+# Sent with ``gig_ids`` whenever the content of one or more gigs changes.
+gig_content_changed = Signal()
+
+SELLER_NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(pre_save, sender=Gig)
+def remember_previous_category(sender, instance, **kwargs):
+    instance._previous_category_id = None
+    if instance.pk:
+        instance._previous_category_id = (
+            Gig.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Gig)
+def gig_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_category_id', None)
+    if previous and previous != instance.category_id:
+        invalidate_gigs([], category_ids=[previous])
+    gig_content_changed.send(sender=Gig, gig_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Gig)
+def update_trending_boards(sender, instance, **kwargs):
+    """A gig that was paused leaves the trending boards, one made active may join them."""
+    transaction.on_commit(lambda: merge_into_boards([instance.pk]))
+
+
+@receiver(post_delete, sender=Gig)
+def gig_deleted(sender, instance, **kwargs):
+    invalidate_gigs([instance.pk], category_ids=[instance.category_id])
+    schedule_suggest_update([
+        ('gig', instance.pk),
+        ('category', instance.category_id),
+        ('subcategory', instance.subcategory_id),
+    ])
+
+
+@receiver(pre_delete, sender=Gig)
+def release_gig_tags(sender, instance, **kwargs):
+    """The gig's GigTag rows are about to cascade away; keep Tag.gig_count honest."""
+    tag_ids = list(Tag.objects.filter(gig_tags__gig=instance).values_list('pk', flat=True))
+    Tag.objects.filter(pk__in=tag_ids).update(gig_count=F('gig_count') - 1)
+    schedule_suggest_update(('tag', tag_id) for tag_id in tag_ids)
+
+
+@receiver(post_save, sender=GigPackage)
+@receiver(post_delete, sender=GigPackage)
+def gig_package_changed(sender, instance, **kwargs):
+    gig_content_changed.send(sender=sender, gig_ids=[instance.gig_id])
+
+
+@receiver(post_save, sender=GigFAQ)
+@receiver(post_delete, sender=GigFAQ)
+@receiver(post_save, sender=GigGallery)
+@receiver(post_delete, sender=GigGallery)
+def gig_detail_changed(sender, instance, **kwargs):
+    # Not indexed for search, only shown on the detail page
+    invalidate_gigs([instance.gig_id])
+
+
+@receiver(post_save, sender=SellerProfile)
+@receiver(post_delete, sender=SellerProfile)
+def seller_suggestion_changed(sender, instance, **kwargs):
+    schedule_suggest_update([('seller', instance.pk)])
+
+
+@receiver(post_save, sender=SellerProfile)
+def seller_profile_saved(sender, instance, **kwargs):
+    gig_ids = list(instance.gigs.values_list('pk', flat=True))
+    if gig_ids:
+        gig_content_changed.send(sender=sender, gig_ids=gig_ids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def seller_user_saved(sender, instance, update_fields=None, **kwargs):
+    """Seller names are indexed, so renaming a seller refreshes their gigs."""
+    if not instance.is_seller:
+        return
+    if update_fields and not SELLER_NAME_FIELDS.intersection(update_fields):
+        return
+    schedule_suggest_update(
+        ('seller', pk) for pk in SellerProfile.objects.filter(user=instance).values_list('pk', flat=True)
+    )
+    gig_ids = list(Gig.objects.filter(seller__user=instance).values_list('pk', flat=True))
+    if gig_ids:
+        gig_content_changed.send(sender=sender, gig_ids=gig_ids)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def release_saved_gigs(sender, instance, **kwargs):
+    """The user's SavedGig rows are about to cascade away; keep Gig.saves_count honest."""
+    Gig.objects.filter(saved_by_users__user=instance).update(saves_count=F('saves_count') - 1)
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=SubCategory)
+def remember_previous_name(sender, instance, **kwargs):
+    instance._previous_name = None
+    if instance.pk:
+        instance._previous_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=SubCategory)
+def category_renamed(sender, instance, created, **kwargs):
+    """Category names are indexed with every gig, so a rename refreshes them."""
+    if created or instance._previous_name == instance.name:
+        return
+    lookup = 'category' if sender is Category else 'subcategory'
+    gig_ids = list(Gig.objects.filter(**{lookup: instance}).values_list('pk', flat=True))
+    if gig_ids:
+        gig_content_changed.send(sender=sender, gig_ids=gig_ids)
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_status(sender, instance, **kwargs):
+    instance._previous_status = None
+    if instance.pk:
+        instance._previous_status = Order.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_completion_changed(sender, instance, signal, **kwargs):
+    """The gig page shows the seller's completed order count."""
+    if signal is post_delete:
+        changed = instance.status == 'completed'
+    else:
+        previous = instance._previous_status
+        changed = previous != instance.status and 'completed' in (previous, instance.status)
+    if not changed:
+        return
+    invalidate_gigs(Gig.objects.filter(seller__user_id=instance.seller_id).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Order)
+def order_placed(sender, instance, created, **kwargs):
+    if created and instance.status != 'cancelled':
+        record_events([instance.gig_id], 'order', when=instance.created_at)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=SubCategory)
+def taxonomy_changed(sender, instance, **kwargs):
+    invalidate_taxonomy()
+    schedule_suggest_update([('category' if sender is Category else 'subcategory', instance.pk)])
+
+
+@receiver(gig_content_changed)
+def reindex_changed_gigs(sender, gig_ids, **kwargs):
+    schedule_reindex(gig_ids)
+
+
+@receiver(gig_content_changed)
+def invalidate_changed_gigs(sender, gig_ids, **kwargs):
+    invalidate_gigs(gig_ids)
+
+
+@receiver(gig_content_changed)
+def update_gig_suggestions(sender, gig_ids, **kwargs):
+    refs = {('gig', gig_id) for gig_id in gig_ids}
+    # Category scores count active gigs, so a status or category change moves them
+    for category_id, subcategory_id in Gig.objects.filter(pk__in=gig_ids).values_list('category_id', 'subcategory_id'):
+        refs.update([('category', category_id), ('subcategory', subcategory_id)])
+    schedule_suggest_update(refs)
@@ -0,0 +1,290 @@
+"""
+"Similar gigs" recommendations.
+
+Each active gig becomes a TF-IDF vector of hashed unigrams and bigrams drawn
+from its title, tags, subcategory and description. Neighbors are the gigs of
+the same category with the highest cosine similarity; they are computed
+offline by ``build_similar_gigs`` and stored in ``GigNeighbor``, so the gig
+page reads its rail with one indexed query.
+
+Work is done one category at a time. The category's gigs are streamed from
+the database once, and their feature vectors (at most ``MAX_FEATURES`` per
+gig) are appended to temporary files while document frequencies, and so
+IDF, are counted over the category. The files are then memory-mapped and
+read back a block of rows at a time: each block of ``GIG_SIMILAR_BLOCK_ROWS``
+gigs is scored against the category one candidate block after another,
+keeping a running top k per gig. Memory therefore does not grow with the
+category: it holds the fixed-size IDF table and one block of at most
+``GIG_SIMILAR_BLOCK_CELLS`` scores, and the vectors stay on disk
+(``GIG_SIMILAR_TEMP_DIR``, about 8 bytes per feature), paged in by the OS.
+
+An incremental run recomputes the changed gigs and the gigs whose rail lists
+one of them, so edited, moved or deactivated gigs do not linger on other
+rails. A changed gig that became a good match for gigs which did not list it
+before only shows up on their rails after a full rebuild, as do IDF shifts
+across the category; run one regularly (e.g. nightly) next to the
+incremental job.
+"""
+import math
+import os
+import tempfile
+import zlib
+from array import array
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import Gig, GigNeighbor
+from .search import tokenize
+
+N_FEATURES = 2 ** 20
+MAX_FEATURES = 64
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.0,
+    'subcategory': 2.0,
+    'description': 1.0,
+}
+READ_CHUNK_SIZE = 2000
+WRITE_BATCH_SIZE = 500
+
+
+def get_neighbor_count():
+    return getattr(settings, 'GIG_SIMILAR_NEIGHBORS', 12)
+
+
+def _feature(term):
+    # crc32 rather than hash(): it must not change between processes
+    return zlib.crc32(term.encode('utf-8')) % N_FEATURES
+
+
+def gig_features(title, tags, subcategory, description):
+    """``{feature: weight}`` for one gig, trimmed to its ``MAX_FEATURES`` strongest features."""
+    counts = defaultdict(float)
+    texts = {
+        'title': title,
+        'tags': (tags or '').replace(',', ' '),
+        'subcategory': subcategory,
+        'description': description,
+    }
+    for field, text in texts.items():
+        tokens = tokenize(text)
+        terms = tokens + [f'{first} {second}' for first, second in zip(tokens, tokens[1:])]
+        field_counts = defaultdict(int)
+        for term in terms:
+            field_counts[_feature(term)] += 1
+        for feature, count in field_counts.items():
+            # Sublinear term frequency, so a repeated word does not dominate
+            counts[feature] += FIELD_WEIGHTS[field] * (1 + math.log(count))
+    if len(counts) > MAX_FEATURES:
+        counts = dict(sorted(counts.items(), key=lambda item: -item[1])[:MAX_FEATURES])
+    return counts
+
+
+class FeatureMatrix:
+    """
+    L2-normalized TF-IDF rows of one category's active gigs, kept in
+    memory-mapped files under ``directory`` and normalized a block at a time.
+    """
+    FILES = {'ids': np.int64, 'indptr': np.int64, 'indices': np.int32, 'data': np.float32}
+
+    def __init__(self, directory, category_id, wanted=None):
+        self.positions = self._write(directory, category_id, wanted)
+        arrays = {
+            name: np.memmap(os.path.join(directory, name), dtype=dtype, mode='r')
+            if os.path.getsize(os.path.join(directory, name)) else np.zeros(0, dtype=dtype)
+            for name, dtype in self.FILES.items()
+        }
+        self.ids = arrays['ids']
+        self.indptr = arrays['indptr']
+        self.indices = arrays['indices']
+        self.data = arrays['data']
+
+    def _write(self, directory, category_id, wanted):
+        """
+        Stream the category's gigs into the files, count document
+        frequencies and set ``idf``. Returns the positions of the ``wanted``
+        gig ids, or None when every gig is wanted.
+        """
+        files = {name: open(os.path.join(directory, name), 'wb') for name in self.FILES}
+        buffers = {'ids': array('q'), 'indptr': array('q', [0]), 'indices': array('i'), 'data': array('f')}
+        document_frequency = np.zeros(N_FEATURES, dtype=np.int64)
+        positions = None if wanted is None else []
+        count = 0
+        written = 0
+
+        def flush():
+            document_frequency[:] += np.bincount(
+                np.frombuffer(buffers['indices'], dtype=np.int32), minlength=N_FEATURES,
+            )
+            for name, buffer in buffers.items():
+                buffer.tofile(files[name])
+                del buffer[:]
+
+        rows = (
+            Gig.objects.filter(category_id=category_id, status='active')
+            .order_by('pk')
+            .values_list('pk', 'title', 'tags', 'subcategory__name', 'description')
+        )
+        try:
+            for pk, title, tags, subcategory, description in rows.iterator(chunk_size=READ_CHUNK_SIZE):
+                features = gig_features(title, tags, subcategory, description)
+                if positions is not None and pk in wanted:
+                    positions.append(count)
+                buffers['ids'].append(pk)
+                buffers['indices'].extend(features.keys())
+                buffers['data'].extend(features.values())
+                written += len(features)
+                buffers['indptr'].append(written)
+                count += 1
+                if count % READ_CHUNK_SIZE == 0:
+                    flush()
+            flush()
+        finally:
+            for file in files.values():
+                file.close()
+
+        self.idf = np.log((1 + count) / (1 + document_frequency)).astype(np.float32) + 1
+        return positions
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _normalized(self, indptr, indices, data):
+        data = data * self.idf[indices]
+        lengths = np.diff(indptr)
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(lengths))).astype(np.float32)
+        norms[norms == 0] = 1
+        data /= norms[rows]
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(lengths), N_FEATURES))
+
+    def slice(self, start, stop):
+        """Rows ``start`` to ``stop``."""
+        first, last = self.indptr[start], self.indptr[stop]
+        return self._normalized(
+            np.asarray(self.indptr[start:stop + 1]) - first,
+            np.asarray(self.indices[first:last]),
+            np.asarray(self.data[first:last]),
+        )
+
+    def take(self, positions):
+        """The rows at ``positions``."""
+        starts = np.asarray(self.indptr[positions])
+        stops = np.asarray(self.indptr[positions + 1])
+        spans = [np.arange(start, stop) for start, stop in zip(starts, stops)]
+        selected = np.concatenate(spans) if spans else np.zeros(0, dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(stops - starts)])
+        return self._normalized(indptr, np.asarray(self.indices[selected]), np.asarray(self.data[selected]))
+
+
+def top_neighbors(matrix, positions, k, min_score):
+    """
+    Yield ``(position, [(neighbor_position, score), ...])`` for each row in
+    ``positions`` (default: every row), best first. Each block of
+    ``GIG_SIMILAR_BLOCK_ROWS`` rows is scored against the matrix one
+    candidate block at a time, keeping the best ``k`` so far.
+    """
+    count = len(matrix)
+    k = min(k, count - 1)
+    if k <= 0:
+        return
+    if positions is None:
+        positions = np.arange(count)
+    positions = np.asarray(positions, dtype=np.int64)
+    block_rows = getattr(settings, 'GIG_SIMILAR_BLOCK_ROWS', 1000)
+    candidate_rows = max(1, getattr(settings, 'GIG_SIMILAR_BLOCK_CELLS', 8_000_000) // block_rows)
+
+    for first in range(0, len(positions), block_rows):
+        block = positions[first:first + block_rows]
+        queries = matrix.take(block)
+        best_scores = np.full((len(block), k), -np.inf, dtype=np.float32)
+        best_columns = np.zeros((len(block), k), dtype=np.int64)
+        for start in range(0, count, candidate_rows):
+            stop = min(start + candidate_rows, count)
+            scores = (queries @ matrix.slice(start, stop).T).toarray()
+            own = np.flatnonzero((block >= start) & (block < stop))
+            scores[own, block[own] - start] = -np.inf  # a gig is not its own neighbor
+            columns = np.broadcast_to(np.arange(start, stop), scores.shape)
+            if stop - start > k:
+                # The block's own best k first, so the merge below stays small
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                columns = top + start
+            scores = np.concatenate([best_scores, scores], axis=1)
+            columns = np.concatenate([best_columns, columns], axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_columns = np.take_along_axis(columns, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        for row, position in enumerate(block):
+            yield int(position), [
+                (int(best_columns[row, column]), float(best_scores[row, column]))
+                for column in order[row]
+                if best_scores[row, column] >= min_score
+            ]
+
+
+def replace_neighbors(kind, gig_ids, rows):
+    """Swap the ``kind`` neighbors of ``gig_ids`` for ``rows`` in one transaction."""
+    if not gig_ids:
+        return
+    with transaction.atomic():
+        GigNeighbor.objects.filter(kind=kind, gig_id__in=gig_ids).delete()
+        GigNeighbor.objects.bulk_create(rows, batch_size=WRITE_BATCH_SIZE)
+
+
+def delete_inactive_neighbors(kind, gig_ids=None):
+    """Gigs that stopped being active no longer get a rail."""
+    stale = GigNeighbor.objects.filter(kind=kind).exclude(gig__status='active')
+    if gig_ids is not None:
+        stale = stale.filter(gig_id__in=gig_ids)
+    stale.delete()
+
+
+def rebuild_similar_gigs(gig_ids=None):
+    """
+    Recompute the neighbors of ``gig_ids`` (default: every active gig), and
+    of the gigs listing one of them as a neighbor, and return how many gigs
+    were processed. Each affected category is read from the database once.
+    """
+    categories = Gig.objects.filter(status='active')
+    if gig_ids is not None:
+        gig_ids = set(gig_ids)
+        gig_ids.update(
+            GigNeighbor.objects.filter(kind='similar', neighbor_id__in=gig_ids).values_list('gig_id', flat=True)
+        )
+        categories = categories.filter(pk__in=gig_ids)
+    category_ids = sorted(set(categories.values_list('category_id', flat=True)))
+    k = get_neighbor_count()
+    min_score = getattr(settings, 'GIG_SIMILAR_MIN_SCORE', 0.05)
+
+    total = 0
+    for category_id in category_ids:
+        with tempfile.TemporaryDirectory(dir=getattr(settings, 'GIG_SIMILAR_TEMP_DIR', None)) as directory:
+            matrix = FeatureMatrix(directory, category_id, wanted=gig_ids)
+            batch_ids = []
+            rows = []
+            for position, neighbors in top_neighbors(matrix, matrix.positions, k, min_score):
+                gig_id = int(matrix.ids[position])
+                batch_ids.append(gig_id)
+                rows.extend(
+                    GigNeighbor(
+                        gig_id=gig_id, neighbor_id=int(matrix.ids[neighbor]), kind='similar', rank=rank, score=score,
+                    )
+                    for rank, (neighbor, score) in enumerate(neighbors)
+                )
+                if len(batch_ids) == WRITE_BATCH_SIZE:
+                    replace_neighbors('similar', batch_ids, rows)
+                    batch_ids, rows = [], []
+            replace_neighbors('similar', batch_ids, rows)
+            total += len(matrix) if matrix.positions is None else len(matrix.positions)
+            # Release the memory maps before the directory goes
+            del matrix
+
+    delete_inactive_neighbors('similar', gig_ids)
+    return total
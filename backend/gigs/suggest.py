@@ -0,0 +1,253 @@
+"""
+Typeahead suggestions for the search box.
+
+Suggestions are served from an in-process prefix index: a sorted list of
+``(key, kind, id)`` tuples searched with ``bisect``. Every label is indexed
+under its full text and under each word it contains, so "logo" completes
+"Minimalist logo design" as well as "Logo Design". A lookup never touches
+the database; matches are ranked per kind by a popularity score (gig
+popularity, tag and category usage, seller rating count).
+
+The index is built once per process, on the first request that needs it.
+Writes publish the changed entries to the shared cache under an increasing
+version number, and every process applies the changes it has not seen yet
+before answering, so workers stay in sync without rebuilding.
+
+An index is never modified once it is in use. Changes are applied to a copy
+that then replaces it, so a search running on another thread keeps reading
+a consistent index without taking the lock.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+VERSION_KEY = 'gigs:suggest:version'
+CHANGE_KEY = 'gigs:suggest:change:{version}'
+CHANGE_TIMEOUT = 60 * 60 * 24
+# Further behind than this, rebuilding is cheaper than reading every change
+MAX_CATCH_UP = 1000
+
+KINDS = ('gig', 'category', 'subcategory', 'tag', 'seller')
+GROUP_NAMES = {
+    'gig': 'gigs',
+    'category': 'categories',
+    'subcategory': 'subcategories',
+    'tag': 'tags',
+    'seller': 'sellers',
+}
+
+MAX_WORDS = 8
+# Results for very short prefixes span a large slice of the index; they are memoized
+MEMO_PREFIX_LENGTH = 2
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+LAST_KEY_CHAR = '\U0010ffff'
+
+
+def normalize(text):
+    return ' '.join(WORD_RE.findall((text or '').lower()))
+
+
+def index_keys(label):
+    """The full label plus every suffix starting at a word boundary."""
+    words = normalize(label).split()[:MAX_WORDS]
+    return {' '.join(words[position:]) for position in range(len(words))}
+
+
+class PrefixIndex:
+    """Sorted ``(key, kind, id)`` tuples plus the suggestion each ``(kind, id)`` points to."""
+
+    def __init__(self, items=(), version=0):
+        self.version = version
+        self.items = {}
+        self.entries = []
+        self._memo = {}
+        for item in items:
+            ref = (item['type'], item['id'])
+            self.items[ref] = item
+            self.entries.extend((key, *ref) for key in index_keys(item['label']))
+        self.entries.sort()
+
+    def copy(self):
+        index = PrefixIndex(version=self.version)
+        index.items = dict(self.items)
+        index.entries = list(self.entries)
+        return index
+
+    def upsert(self, item):
+        ref = (item['type'], item['id'])
+        self.remove(ref)
+        self.items[ref] = item
+        for key in index_keys(item['label']):
+            bisect.insort(self.entries, (key, *ref))
+        self._memo.clear()
+
+    def remove(self, ref):
+        item = self.items.pop(ref, None)
+        if item is None:
+            return
+        for key in index_keys(item['label']):
+            entry = (key, *ref)
+            position = bisect.bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+        self._memo.clear()
+
+    def apply(self, changes):
+        for ref, item in changes:
+            if item is None:
+                self.remove(tuple(ref))
+            else:
+                self.upsert(item)
+
+    def search(self, prefix, limit):
+        """Return ``{kind: [item, ...]}`` with the ``limit`` most popular matches per kind."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return {kind: [] for kind in KINDS}
+
+        memo_key = (prefix, limit)
+        if len(prefix) <= MEMO_PREFIX_LENGTH and memo_key in self._memo:
+            return self._memo[memo_key]
+
+        start = bisect.bisect_left(self.entries, (prefix,))
+        end = bisect.bisect_left(self.entries, (prefix + LAST_KEY_CHAR,), lo=start)
+        matches = {kind: set() for kind in KINDS}
+        for _, kind, pk in self.entries[start:end]:
+            matches[kind].add(pk)
+
+        results = {
+            kind: heapq.nlargest(
+                limit,
+                (self.items[(kind, pk)] for pk in pks),
+                key=lambda item: (item['score'], -item['id']),
+            )
+            for kind, pks in matches.items()
+        }
+        if len(prefix) <= MEMO_PREFIX_LENGTH:
+            self._memo[memo_key] = results
+        return results
+
+
+def load_items(refs=None):
+    """
+    Load suggestion items from the database.
+
+    With ``refs`` (an iterable of ``(kind, id)``) only those are loaded and the
+    result maps each ref to its item, or to ``None`` when it should no longer
+    be suggested. Without ``refs`` every suggestible object is returned.
+    """
+    from accounts.models import SellerProfile
+    from .models import Category, SubCategory, Gig, Tag
+
+    wanted = None
+    if refs is not None:
+        wanted = {kind: set() for kind in KINDS}
+        for kind, pk in refs:
+            wanted[kind].add(pk)
+
+    active_gigs = Q(gig__status='active')
+    sources = {
+        'gig': Gig.objects.filter(status='active').values_list('pk', 'title', 'popularity_score'),
+        'category': Category.objects.filter(is_active=True)
+            .annotate(score=Count('gig', filter=active_gigs))
+            .values_list('pk', 'name', 'score'),
+        'subcategory': SubCategory.objects.filter(category__is_active=True)
+            .annotate(score=Count('gig', filter=active_gigs))
+            .values_list('pk', 'name', 'score'),
+        'tag': Tag.objects.filter(gig_count__gt=0).values_list('pk', 'name', 'gig_count'),
+        'seller': SellerProfile.objects.filter(user__is_seller=True, user__is_active=True)
+            .values_list('pk', 'user__username', 'rating_count'),
+    }
+
+    items = {}
+    for kind, queryset in sources.items():
+        if wanted is not None:
+            if not wanted[kind]:
+                continue
+            queryset = queryset.filter(pk__in=wanted[kind])
+            items.update({(kind, pk): None for pk in wanted[kind]})
+        for pk, label, score in queryset:
+            items[(kind, pk)] = {'type': kind, 'id': pk, 'label': label, 'score': float(score or 0)}
+    return items
+
+
+_index = None
+# Serializes rebuilds and catch-ups; searches read whichever index is current
+_lock = threading.Lock()
+
+
+def _build():
+    # Seed the counter, so changes published after this build are caught up, not rebuilt
+    cache.add(VERSION_KEY, time.time_ns(), None)
+    version = cache.get(VERSION_KEY) or 0
+    return PrefixIndex(load_items().values(), version=version)
+
+
+def _catch_up(index, current):
+    """
+    Return a copy of ``index`` with the published changes up to ``current``
+    applied, or None when a rebuild is needed.
+    """
+    if not 0 < current - index.version <= MAX_CATCH_UP:
+        # Behind by too much, or the counter was evicted and reseeded
+        return None
+    versions = range(index.version + 1, current + 1)
+    changes = cache.get_many([CHANGE_KEY.format(version=version) for version in versions])
+    updated = index.copy()
+    for version in versions:
+        change = changes.get(CHANGE_KEY.format(version=version))
+        if change is None:
+            # The newest change may still be on its way; anything older has expired
+            return updated if version == current else None
+        updated.apply(change)
+        updated.version = version
+    return updated
+
+
+def get_suggest_index():
+    global _index
+    index = _index
+    if index is not None and (cache.get(VERSION_KEY) or 0) == index.version:
+        return index
+    with _lock:
+        if _index is None:
+            _index = _build()
+        else:
+            current = cache.get(VERSION_KEY) or 0
+            if current != _index.version:
+                _index = _catch_up(_index, current) or _build()
+        return _index
+
+
+def get_suggestions(prefix, limit=None):
+    limit = limit or getattr(settings, 'GIG_SUGGEST_LIMIT', 5)
+    results = get_suggest_index().search(prefix, limit)
+    return {GROUP_NAMES[kind]: results[kind] for kind in KINDS}
+
+
+def publish_changes(refs):
+    """Reload the given ``(kind, id)`` refs and broadcast them to every process."""
+    refs = set(refs)
+    if not refs:
+        return
+    changes = list(load_items(refs).items())
+    # A counter that was evicted restarts from the clock, far ahead of any
+    # version a process holds, so every process rebuilds
+    version = time.time_ns()
+    if not cache.add(VERSION_KEY, version, None):
+        version = cache.incr(VERSION_KEY)
+    cache.set(CHANGE_KEY.format(version=version), changes, CHANGE_TIMEOUT)
+
+
+def schedule_suggest_update(refs):
+    """Publish the given refs once the current transaction commits."""
+    refs = set(refs)
+    if refs:
+        transaction.on_commit(lambda: publish_changes(refs))
@@ -0,0 +1,98 @@
+"""
+Normalized gig tags.
+
+``Gig.tags`` stays the free-form, comma separated source of truth; this module
+mirrors it into ``Tag``/``GigTag`` rows so tag filters are index lookups and
+``Tag.gig_count`` can back a tag cloud without counting at request time.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import GigTag, Tag
+from .suggest import schedule_suggest_update
+
+MAX_TAG_LENGTH = 50
+
+
+def parse_tags(raw):
+    """Split a comma separated tag string into unique, lowercase tag names."""
+    if not raw:
+        return []
+    names = (name.strip().lower()[:MAX_TAG_LENGTH] for name in raw.split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def get_or_create_tags(names):
+    """Return ``{name: Tag}`` for ``names``, creating the missing ones."""
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in tags]
+    if missing:
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        tags.update((tag.name, tag) for tag in Tag.objects.filter(name__in=missing))
+    return tags
+
+
+def sync_gig_tags(gig):
+    """Bring the gig's GigTag rows and the affected Tag.gig_count values in line with gig.tags."""
+    sync_tags_for_gigs([gig])
+
+
+@transaction.atomic
+def sync_tags_for_gigs(gigs):
+    """
+    ``sync_gig_tags`` for many gigs at once, in a fixed number of queries:
+    one read, one delete, one insert, and one count update per distinct delta.
+    """
+    gigs = {gig.pk: gig for gig in gigs}
+    wanted = {gig_id: set(parse_tags(gig.tags)) for gig_id, gig in gigs.items()}
+    current = defaultdict(dict)
+    for gig_id, name, tag_id in GigTag.objects.filter(gig_id__in=gigs).values_list('gig_id', 'tag__name', 'tag_id'):
+        current[gig_id][name] = tag_id
+
+    deltas = Counter()
+    removed = Q()
+    for gig_id, names in wanted.items():
+        removed_ids = [tag_id for name, tag_id in current[gig_id].items() if name not in names]
+        if removed_ids:
+            removed |= Q(gig_id=gig_id, tag_id__in=removed_ids)
+            deltas.update({tag_id: -1 for tag_id in removed_ids})
+    if removed:
+        GigTag.objects.filter(removed).delete()
+
+    added = {gig_id: names - set(current[gig_id]) for gig_id, names in wanted.items()}
+    added_names = sorted(set().union(*added.values()))
+    if added_names:
+        tags = get_or_create_tags(added_names)
+        GigTag.objects.bulk_create([
+            GigTag(gig_id=gig_id, tag=tags[name]) for gig_id, names in added.items() for name in names
+        ])
+        deltas.update(tags[name].pk for names in added.values() for name in names)
+
+    by_delta = defaultdict(list)
+    for tag_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(tag_id)
+    for delta, tag_ids in by_delta.items():
+        Tag.objects.filter(pk__in=tag_ids).update(gig_count=F('gig_count') + delta)
+
+    schedule_suggest_update(('tag', tag_id) for tag_id in deltas)
+
+
+def filter_by_tags(queryset, names, match_all=True):
+    """
+    Restrict ``queryset`` to gigs carrying all (or any) of the tag ``names``.
+    Resolves the tag ids first so the GigTag lookup runs on the (tag, gig) index.
+    """
+    names = parse_tags(','.join(names))
+    if not names:
+        return queryset
+    tag_ids = list(Tag.objects.filter(name__in=names).values_list('pk', flat=True))
+    if not tag_ids or (match_all and len(tag_ids) < len(names)):
+        return queryset.none()
+
+    gig_ids = GigTag.objects.filter(tag_id__in=tag_ids).values('gig_id')
+    if match_all and len(tag_ids) > 1:
+        gig_ids = gig_ids.annotate(matched=Count('tag_id')).filter(matched=len(tag_ids)).values('gig_id')
+    return queryset.filter(pk__in=gig_ids)
@@ -1,3 +1,815 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from accounts.models import User, SellerProfile
+from orders.models import Order
+from .models import Category, SubCategory, Gig, GigPackage, GigFAQ, GigGallery, GigNeighbor, GigSearchTerm, Tag
+from . import suggest
+from .pagination import KeysetPagination
+from .parsers import GigMultiPartParser
+from .facets import compute_facets
+from .search import rank_queryset, reindex_gigs, search_gigs
+from .serializers import GigImportSerializer, GigSerializer
+from .similar import rebuild_similar_gigs
+from .tags import MAX_TAG_LENGTH, parse_tags, sync_gig_tags, sync_tags_for_gigs
+from .trending import record_events
+
+
+class GigTestCase(TestCase):
+    """A seller with one category and subcategory; ``create_gig`` adds active gigs to them."""
+
+    CATEGORY_NAME = 'Design'
+    SUBCATEGORY_NAME = 'Logos'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller_user = User.objects.create_user('seller', 'seller@example.com', 'password123', is_seller=True)
+        cls.seller = SellerProfile.objects.create(user=cls.seller_user, profile_title='Seller', bio='Bio')
+        cls.category = Category.objects.create(name=cls.CATEGORY_NAME)
+        cls.subcategory = SubCategory.objects.create(category=cls.category, name=cls.SUBCATEGORY_NAME)
+
+    @classmethod
+    def create_gig(cls, title='Gig', price=None, subcategory=None, **fields):
+        """An active gig, with one package when ``price`` is given."""
+        subcategory = subcategory or cls.subcategory
+        fields = {'description': 'Description', 'delivery_time': 3, 'status': 'active', **fields}
+        gig = Gig.objects.create(
+            seller=cls.seller, title=title, category=subcategory.category, subcategory=subcategory, **fields,
+        )
+        if price is not None:
+            GigPackage.objects.create(
+                gig=gig, package_name='Basic', description='Basic', price=Decimal(price), delivery_days=3,
+            )
+            gig.refresh_price_range()
+        return gig
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+
+class GigQueryCountTests(GigTestCase):
+    """List and detail must run a fixed number of queries, whatever the page size."""
+
+    # Cards: 1 gig query with seller/user joined
+    EXPECTED_LIST_QUERIES = 1
+    # Detail: 1 gig query with seller/user/category/subcategory joined + 3 prefetches
+    EXPECTED_QUERIES = 4
+    # Bundle: the detail queries (seller counts are subqueries on the gig row) + recent reviews
+    EXPECTED_BUNDLE_QUERIES = EXPECTED_QUERIES + 1
+
+    def create_gigs(self, count):
+        for i in range(count):
+            gig = self.create_gig(f'Gig {i}', price='10')
+            GigFAQ.objects.create(gig=gig, question='Q?', answer='A.')
+            GigGallery.objects.create(gig=gig, media_type='image')
+        return gig
+
+    def test_list_query_count_is_constant(self):
+        self.create_gigs(2)
+        with self.assertNumQueries(self.EXPECTED_LIST_QUERIES):
+            response = self.client.get('/api/gigs/')
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.create_gigs(10)
+        with self.assertNumQueries(self.EXPECTED_LIST_QUERIES):
+            response = self.client.get('/api/gigs/')
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_expanded_list_prefetches_only_requested_relations(self):
+        self.create_gigs(5)
+        with self.assertNumQueries(self.EXPECTED_LIST_QUERIES + 1):
+            response = self.client.get('/api/gigs/', {'expand': 'packages'})
+        self.assertIn('packages', response.data['results'][0])
+        self.assertNotIn('faqs', response.data['results'][0])
+
+    def test_sparse_fields(self):
+        gig = self.create_gigs(2)
+        response = self.client.get('/api/gigs/', {'fields': 'id,title'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+        response = self.client.get('/api/gigs/', {'fields': 'id,packages', 'expand': 'packages'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'packages'})
+        response = self.client.get(f'/api/gigs/{gig.pk}/', {'fields': 'id,description'})
+        self.assertEqual(set(response.data), {'id', 'description'})
+
+    def test_unknown_sparse_fields_are_rejected(self):
+        self.create_gigs(1)
+        response = self.client.get('/api/gigs/', {'fields': 'id,password', 'expand': 'orders'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'fields', 'expand'})
+
+    def test_by_category_query_count_is_constant(self):
+        self.create_gigs(5)
+        with self.assertNumQueries(self.EXPECTED_LIST_QUERIES):
+            self.client.get(f'/api/gigs/by-category/{self.category.pk}/')
+
+    def test_anonymous_list_is_cached_until_a_gig_changes(self):
+        gig = self.create_gigs(2)
+        self.client.get('/api/gigs/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/gigs/')
+        self.assertEqual(len(response.data['results']), 2)
+
+        gig.title = 'Renamed'
+        gig.save()
+        response = self.client.get('/api/gigs/')
+        self.assertIn('Renamed', [item['title'] for item in response.data['results']])
+
+    def test_detail_query_count(self):
+        gig = self.create_gigs(1)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(f'/api/gigs/{gig.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_bundle_query_count_and_etag(self):
+        gig = self.create_gigs(3)
+        with self.assertNumQueries(self.EXPECTED_BUNDLE_QUERIES):
+            response = self.client.get(f'/api/gigs/{gig.pk}/bundle/')
+        self.assertEqual(response.data['seller']['active_gigs_count'], 3)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(f'/api/gigs/{gig.pk}/bundle/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        gig.faqs.all().delete()
+        response = self.client.get(f'/api/gigs/{gig.pk}/bundle/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['gig']['faqs'], [])
+
+    def test_saved_flag_costs_one_query_per_page(self):
+        self.create_gigs(5)
+        buyer = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        saved = Gig.objects.order_by('pk').first()
+        self.client.force_authenticate(buyer)
+        self.client.post('/api/gigs/saved/', {'gig_id': saved.pk}, format='json')
+
+        # The flag adds one query for the whole page
+        with self.assertNumQueries(self.EXPECTED_LIST_QUERIES + 1):
+            response = self.client.get('/api/gigs/')
+        flags = {item['id']: item['is_saved'] for item in response.data['results']}
+        self.assertEqual({gig_id for gig_id, is_saved in flags.items() if is_saved}, {saved.pk})
+
+
+class KeysetPaginationTests(GigTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.gigs = [cls.create_gig(f'Gig {price}', price=price) for price in ['30', None, '10', '30', None]]
+
+    def walk(self, params):
+        ids = []
+        url, params = '/api/gigs/', {**params, 'page_size': 2}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            url, params = response.data['next'], None
+        return ids
+
+    def test_gigs_without_a_price_come_last_in_both_directions(self):
+        cheap, no_price, cheapest, same_price, other_no_price = self.gigs
+        self.assertEqual(
+            self.walk({'sort': 'price-low'}),
+            [cheapest.pk, cheap.pk, same_price.pk, no_price.pk, other_no_price.pk],
+        )
+        self.assertEqual(
+            self.walk({'sort': 'price-high'}),
+            [same_price.pk, cheap.pk, cheapest.pk, other_no_price.pk, no_price.pk],
+        )
+
+    def test_malformed_cursor_values_are_not_found(self):
+        for values in (['garbage', 1], [None, 1], ['2025-01-01T00:00:00+00:00', 'x']):
+            cursor = KeysetPagination().encode_cursor(values)
+            response = self.client.get('/api/gigs/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+class SavedGigTests(GigTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.gigs = [cls.create_gig(f'Gig {i}') for i in range(3)]
+        cls.buyer = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.buyer)
+
+    def saves_count(self, gig):
+        gig.refresh_from_db(fields=['saves_count'])
+        return gig.saves_count
+
+    def test_save_and_unsave_are_idempotent(self):
+        gig = self.gigs[0]
+        self.assertEqual(self.client.post('/api/gigs/saved/', {'gig_id': gig.pk}, format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/gigs/saved/', {'gig_id': gig.pk}, format='json').status_code, 200)
+        self.assertEqual(self.saves_count(gig), 1)
+
+        self.assertEqual(self.client.delete(f'/api/gigs/saved/{gig.pk}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/gigs/saved/{gig.pk}/').status_code, 204)
+        self.assertEqual(self.saves_count(gig), 0)
+
+    def test_bulk(self):
+        first, second, third = self.gigs
+        self.client.post('/api/gigs/saved/', {'gig_id': first.pk}, format='json')
+        response = self.client.post(
+            '/api/gigs/saved/bulk/', {'save': [first.pk, second.pk, 999999], 'unsave': [third.pk]}, format='json',
+        )
+        self.assertEqual(response.data, {'saved': [second.pk], 'unsaved': []})
+        self.assertEqual([self.saves_count(gig) for gig in self.gigs], [1, 1, 0])
+
+    def test_detail_etag_changes_when_saved(self):
+        gig = self.gigs[0]
+        etag = self.client.get(f'/api/gigs/{gig.pk}/')['ETag']
+        self.client.post('/api/gigs/saved/', {'gig_id': gig.pk}, format='json')
+        response = self.client.get(f'/api/gigs/{gig.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_saved'])
+        self.assertEqual(response.data['saves_count'], 1)
+
+    def test_cached_listings_show_the_new_count(self):
+        gig = self.gigs[0]
+        anonymous = APIClient()
+        listings = ['/api/gigs/', f'/api/gigs/by-category/{self.category.pk}/']
+        for path in listings:
+            anonymous.get(path)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/gigs/saved/', {'gig_id': gig.pk}, format='json')
+        for path in listings:
+            counts = {card['id']: card['saves_count'] for card in anonymous.get(path).data['results']}
+            self.assertEqual(counts[gig.pk], 1)
+
+
+class BulkImportTests(GigTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.design = cls.subcategory
+        cls.writing = SubCategory.objects.create(category=Category.objects.create(name='Writing'), name='Blogs')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.seller_user)
+
+    def item(self, title, subcategory, price='10', **extra):
+        return {
+            'title': title, 'description': 'Description', 'delivery_time': 3, 'status': 'active',
+            'subcategory_id': subcategory.pk,
+            'packages': [{'package_name': 'Basic', 'description': 'Basic', 'price': price, 'delivery_days': 3}],
+            **extra,
+        }
+
+    def test_ids_are_matched_without_returning_inserts(self):
+        self.create_gig('Existing')
+        items = [self.item('First', self.design), self.item('Second', self.design)]
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            response = self.client.post('/api/gigs/bulk/', items, format='json')
+        ids = [result['id'] for result in response.data['results']]
+        self.assertEqual([Gig.objects.get(pk=pk).title for pk in ids], ['First', 'Second'])
+
+    def test_repeated_ids_are_rejected(self):
+        gig = self.create_gig('Gig')
+        response = self.client.post(
+            '/api/gigs/bulk/', [{'id': gig.pk, 'status': 'paused'}, {'id': gig.pk, 'title': 'Dup'}], format='json',
+        )
+        self.assertEqual((response.data['updated'], response.data['failed']), (0, 2))
+        gig.refresh_from_db()
+        self.assertEqual((gig.title, gig.status), ('Gig', 'active'))
+
+    def test_drafts_are_published_as_in_a_single_create(self):
+        response = self.client.post('/api/gigs/bulk/', [self.item('Draft', self.design, status='draft')], format='json')
+        self.assertEqual(Gig.objects.get(pk=response.data['results'][0]['id']).status, 'active')
+
+    def test_update_keeps_package_ids_and_invalidates_the_old_category(self):
+        gig_id = self.client.post('/api/gigs/bulk/', [self.item('Gig', self.design)], format='json').data['results'][0]['id']
+        package_id = GigPackage.objects.get(gig_id=gig_id).pk
+        old_listing = f'/api/gigs/by-category/{self.design.category_id}/'
+        self.client.logout()
+        self.assertEqual(len(self.client.get(old_listing).data['results']), 1)
+
+        self.client.force_authenticate(self.seller_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/gigs/bulk/', [self.item('Gig', self.writing, price='20', id=gig_id)], format='json')
+        self.assertEqual(GigPackage.objects.get(gig_id=gig_id).pk, package_id)
+        self.assertEqual(Gig.objects.get(pk=gig_id).min_price, Decimal('20'))
+        self.client.logout()
+        self.assertEqual(self.client.get(old_listing).data['results'], [])
+
+
+class PriceRangeTests(GigTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.seller_user)
+
+    def package(self, name, price, **extra):
+        return {'package_name': name, 'description': name, 'price': price, 'delivery_days': 3, **extra}
+
+    def price_range(self, gig_id):
+        return Gig.objects.values_list('min_price', 'max_price').get(pk=gig_id)
+
+    def test_follows_package_creates_updates_and_deletes(self):
+        response = self.client.post('/api/gigs/', {
+            'title': 'Logo', 'description': 'Description', 'delivery_time': 3, 'status': 'active',
+            'category_id': self.category.pk, 'subcategory_id': self.subcategory.pk,
+            'packages': [self.package('Basic', '10'), self.package('Premium', '50')],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        gig_id = response.data['id']
+        self.assertEqual(self.price_range(gig_id), (Decimal('10'), Decimal('50')))
+
+        # Basic is repriced by id, Premium is deleted and Standard created by sync_nested
+        basic = GigPackage.objects.get(gig_id=gig_id, package_name='Basic')
+        response = self.client.patch(f'/api/gigs/{gig_id}/', {
+            'packages': [self.package('Basic', '15', id=basic.pk), self.package('Standard', '30')],
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.price_range(gig_id), (Decimal('15'), Decimal('30')))
+        self.assertEqual(GigPackage.objects.get(gig_id=gig_id, package_name='Basic').pk, basic.pk)
+
+        response = self.client.patch(f'/api/gigs/{gig_id}/', {'packages': []}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.price_range(gig_id), (None, None))
+
+    def test_backfill_command(self):
+        priced = self.create_gig('Logo', price='10')
+        GigPackage.objects.create(gig=priced, package_name='Premium', description='Premium', price=40, delivery_days=3)
+        unpriced = self.create_gig('Banner')
+        Gig.objects.update(min_price=1, max_price=1)
+
+        call_command('backfill_gig_prices', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(self.price_range(priced.pk), (Decimal('10'), Decimal('40')))
+        self.assertEqual(self.price_range(unpriced.pk), (None, None))
+
+
+class SearchTests(GigTestCase):
+
+    CATEGORY_NAME = 'Writing'
+    SUBCATEGORY_NAME = 'Blogs'
+
+    def create_gig(self, title, description='Description', subcategory=None):
+        # The index is updated on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            return super().create_gig(title, description=description, subcategory=subcategory)
+
+    def test_title_matches_outrank_description_matches(self):
+        in_description = self.create_gig('Minimal design', 'I also draw a logo')
+        in_title = self.create_gig('Logo design')
+        self.create_gig('Translation')
+        self.assertEqual([gig_id for gig_id, _ in search_gigs('logo')], [in_title.pk, in_description.pk])
+
+    def test_last_term_is_a_prefix_scored_once_per_gig(self):
+        gig = self.create_gig('Logo and logos')
+        self.create_gig('Translation')
+        self.assertEqual([gig_id for gig_id, _ in search_gigs('lo')], [gig.pk])
+        # "logo" is a query term of its own, so the prefix adds nothing for it
+        self.assertAlmostEqual(dict(search_gigs('logo lo'))[gig.pk], dict(search_gigs('logo logos'))[gig.pk])
+        self.assertAlmostEqual(dict(search_gigs('lo'))[gig.pk], dict(search_gigs('logos'))[gig.pk])
+
+    def test_frequencies_of_capped_terms_are_cached(self):
+        self.create_gig('Logo design')
+        self.create_gig('Logo redesign')
+        with override_settings(GIG_SEARCH_MAX_POSTINGS=1):
+            ranked = search_gigs('logo')
+            # Postings only: the stats and the capped term's frequency come from the cache
+            with self.assertNumQueries(1):
+                self.assertEqual(search_gigs('logo'), ranked)
+
+    def test_listing_keeps_the_ranked_order(self):
+        gigs = [self.create_gig(title) for title in ['Logo', 'Logo logo', 'Logo logo logo']]
+        ranked = [gig_id for gig_id, _ in search_gigs('logo')]
+        self.assertEqual(ranked, [gig.pk for gig in reversed(gigs)])
+
+        queryset = rank_queryset(Gig.objects.all(), 'logo')
+        self.assertEqual(list(queryset.values_list('pk', flat=True)), ranked)
+        for gig, (_, score) in zip(queryset, search_gigs('logo')):
+            self.assertAlmostEqual(gig.search_rank, score)
+        response = self.client.get('/api/gigs/', {'q': 'logo', 'page_size': 2})
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual([item['id'] for item in response.data['results'] + next_page.data['results']], ranked)
+
+    def test_category_hits_rank_above_description_hits(self):
+        articles = SubCategory.objects.create(category=self.subcategory.category, name='Articles')
+        in_description = self.create_gig('Copywriting', 'Blogs and articles', subcategory=articles)
+        in_category = self.create_gig('Copywriting')
+        self.assertEqual(rank_queryset(Gig.objects.all(), 'mascot').count(), 0)
+        response = self.client.get('/api/gigs/', {'q': 'blogs'})
+        self.assertEqual([item['id'] for item in response.data['results']], [in_category.pk, in_description.pk])
+
+    def test_database_ranking_matches_the_backend_scores(self):
+        for title in ['Logo and logos', 'Logo design', 'Logotype', 'Blog logo', 'Translation']:
+            self.create_gig(title)
+        for query in ['logo', 'lo', 'logo lo', 'design logo']:
+            with self.subTest(query=query):
+                ranked = rank_queryset(Gig.objects.all(), query).values_list('pk', 'search_rank')
+                self.assertEqual([pk for pk, _ in ranked], [pk for pk, _ in search_gigs(query)])
+                for (_, rank), (_, score) in zip(ranked, search_gigs(query)):
+                    self.assertAlmostEqual(rank, score)
+
+    def test_every_match_is_listed(self):
+        gigs = [self.create_gig(f'Logo {i}') for i in range(3)]
+        # The postings cap of search_gigs does not apply to listings
+        with override_settings(GIG_SEARCH_MAX_POSTINGS=1):
+            ids = []
+            response = self.client.get('/api/gigs/', {'q': 'logo', 'page_size': 1})
+            while True:
+                ids += [item['id'] for item in response.data['results']]
+                if not response.data['next']:
+                    break
+                response = self.client.get(response.data['next'])
+        self.assertEqual(sorted(ids), [gig.pk for gig in gigs])
+
+    def test_stop_word_queries_do_not_filter(self):
+        gigs = [self.create_gig(title) for title in ['Logo design', 'Translation']]
+        self.assertEqual(search_gigs('the'), [])
+        self.assertEqual(rank_queryset(Gig.objects.all(), 'the a').count(), 2)
+        response = self.client.get('/api/gigs/', {'q': 'the'})
+        self.assertEqual([item['id'] for item in response.data['results']], [gig.pk for gig in reversed(gigs)])
+
+    def test_index_follows_edits_and_deletes(self):
+        gig = self.create_gig('Logo design')
+        gig.title = 'Mascot design'
+        with self.captureOnCommitCallbacks(execute=True):
+            gig.save()
+        self.assertEqual(search_gigs('logo'), [])
+        self.assertEqual([gig_id for gig_id, _ in search_gigs('mascot')], [gig.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            gig.delete()
+        self.assertEqual(search_gigs('mascot'), [])
+        self.assertFalse(GigSearchTerm.objects.exists())
+
+
+class FacetTests(GigTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        writing = SubCategory.objects.create(category=Category.objects.create(name='Writing'), name='Blogs')
+        cls.gigs = [
+            cls.create_gig('Logo design', price='10', delivery_time=1, tags='logo'),
+            cls.create_gig('Logo redesign', price='24.99', delivery_time=3, tags='logo'),
+            cls.create_gig('Mascot design', price='25', delivery_time=5),
+            cls.create_gig('Brand book', price='300', delivery_time=10),
+            cls.create_gig('Blog post', delivery_time=2, subcategory=writing),
+        ]
+        sync_tags_for_gigs(cls.gigs)
+        reindex_gigs([gig.pk for gig in cls.gigs])
+
+    def listing(self, **params):
+        response = self.client.get('/api/gigs/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def counts(self, facet):
+        return {entry.get('label', entry.get('name')): entry['count'] for entry in facet}
+
+    def test_counts_per_band_and_category(self):
+        facets = compute_facets(Gig.objects.all())
+        self.assertEqual(self.counts(facets['category']), {'Design': 4, 'Writing': 1})
+        self.assertEqual(self.counts(facets['subcategory']), {'Logos': 4, 'Blogs': 1})
+        # Bands are half open: 24.99 is under $25, 25 is not
+        self.assertEqual(self.counts(facets['price']), {'Under $25': 2, '$25 - $50': 1, '$250 & above': 1})
+        self.assertEqual(
+            self.counts(facets['delivery_time']),
+            {'Express 24H': 1, 'Up to 3 days': 2, 'Up to 7 days': 1, 'Anytime': 1},
+        )
+
+    def test_gigs_without_packages_have_no_price_band(self):
+        facets = compute_facets(Gig.objects.filter(min_price__isnull=True))
+        self.assertEqual(facets['price'], [])
+        self.assertEqual(self.counts(facets['delivery_time']), {'Up to 3 days': 1})
+
+    def test_facets_only_when_asked_for(self):
+        self.assertNotIn('facets', self.listing())
+        self.assertNotIn('facets', self.listing(facets='false'))
+        self.assertEqual(self.counts(self.listing(facets='true')['facets']['category']), {'Design': 4, 'Writing': 1})
+
+    def test_facets_follow_the_filters_not_the_page(self):
+        # "logo" also prefixes the Logos subcategory, so it finds every design gig
+        data = self.listing(facets='true', q='logo', page_size=1)
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(self.counts(data['facets']['category']), {'Design': 4})
+        facets = self.listing(facets='true', tag='logo', price_min='20')['facets']
+        self.assertEqual(self.counts(facets['price']), {'Under $25': 1})
+        self.assertEqual(self.counts(facets['delivery_time']), {'Up to 3 days': 1})
+        facets = self.listing(facets='true', price_max='100')['facets']
+        self.assertEqual(self.counts(facets['subcategory']), {'Logos': 3})
+
+
+class SuggestTests(GigTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.animation = cls.create_gig('Logo animation', popularity_score=10)
+        cls.minimal = cls.create_gig('Minimalist logo design', popularity_score=5)
+        cls.mascot = cls.create_gig('Mascot illustration', popularity_score=1)
+
+    def setUp(self):
+        super().setUp()
+        # Each test starts without an in-process index
+        patcher = mock.patch.object(suggest, '_index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def suggested(self, q):
+        response = self.client.get('/api/gigs/suggest/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return {group: [item['id'] for item in items] for group, items in response.data.items() if group != 'query'}
+
+    def test_prefixes_match_any_word_and_rank_per_kind(self):
+        results = self.suggested('Lo')
+        self.assertEqual(results['gigs'], [self.animation.pk, self.minimal.pk])
+        self.assertEqual(results['subcategories'], [self.subcategory.pk])
+        self.assertEqual(results['categories'], [])
+        self.assertEqual(self.suggested('m')['gigs'], [self.minimal.pk, self.mascot.pk])
+        self.assertEqual(self.suggested('logo d')['gigs'], [self.minimal.pk])
+
+    def test_changes_are_applied_without_rebuilding(self):
+        self.assertEqual(self.suggested('logo')['gigs'], [self.animation.pk, self.minimal.pk])
+        with mock.patch.object(suggest, '_build', wraps=suggest._build) as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.animation.title = 'Banner animation'
+                self.animation.save()
+            self.assertEqual(self.suggested('logo')['gigs'], [self.minimal.pk])
+            self.assertEqual(self.suggested('banner')['gigs'], [self.animation.pk])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.minimal.status = 'paused'
+                self.minimal.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.mascot.delete()
+            self.assertEqual(self.suggested('logo')['gigs'], [])
+            self.assertEqual(self.suggested('mascot')['gigs'], [])
+        build.assert_not_called()
+
+    def test_empty_and_one_character_queries(self):
+        nothing = {group: [] for group in suggest.GROUP_NAMES.values()}
+        self.assertEqual(self.suggested(''), nothing)
+        self.assertEqual(self.suggested(' ?! '), nothing)
+
+        self.assertEqual(self.suggested('d')['categories'], [self.category.pk])
+        index = suggest.get_suggest_index()
+        # Short prefixes are memoized until the index changes
+        self.assertIs(index.search('d', 5), index.search('d', 5))
+
+
+class TagTests(GigTestCase):
+
+    def tagged_gig(self, tags):
+        gig = self.create_gig(tags=tags)
+        sync_gig_tags(gig)
+        return gig
+
+    def test_names_are_trimmed_lowercased_and_deduplicated(self):
+        self.assertEqual(parse_tags(' Logo, logo ,MINIMAL,, '), ['logo', 'minimal'])
+        self.assertEqual(parse_tags('x' * 80), ['x' * MAX_TAG_LENGTH])
+        self.assertEqual(parse_tags(None), [])
+
+    def test_tags_without_names_are_stored_empty(self):
+        for serializer_class in (GigImportSerializer, GigSerializer):
+            for raw in (' , ', ',,,'):
+                serializer = serializer_class(data={'tags': raw}, partial=True)
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+                self.assertEqual(serializer.validated_data['tags'], '')
+        self.assertEqual(GigSerializer().validate_tags(' Logo ,logo, Flat'), 'logo,flat')
+
+    def test_counts_follow_the_gigs(self):
+        gig = self.tagged_gig('Logo, Minimal')
+        self.tagged_gig('logo')
+        self.assertEqual(dict(Tag.objects.values_list('name', 'gig_count')), {'logo': 2, 'minimal': 1})
+
+        gig.tags = 'minimal, flat'
+        sync_gig_tags(gig)
+        self.assertEqual(dict(Tag.objects.values_list('name', 'gig_count')), {'logo': 1, 'minimal': 1, 'flat': 1})
+        gig.delete()
+        self.assertEqual(dict(Tag.objects.values_list('name', 'gig_count')), {'logo': 1, 'minimal': 0, 'flat': 0})
+
+    def test_filter_by_all_or_any_tag(self):
+        both = self.tagged_gig('logo, minimal')
+        logo = self.tagged_gig('logo')
+        self.tagged_gig('flat')
+
+        def listed(params):
+            return {item['id'] for item in self.client.get('/api/gigs/', params).data['results']}
+
+        self.assertEqual(listed({'tag': ['Logo', 'minimal']}), {both.pk})
+        self.assertEqual(listed({'tag': ['logo', 'minimal'], 'tag_mode': 'any'}), {both.pk, logo.pk})
+        self.assertEqual(listed({'tag': ['logo', 'unknown']}), set())
+
+
+class GigPayloadParserTests(GigTestCase):
+
+    def build(self, data, files=None):
+        return GigMultiPartParser().build_payload(QueryDict(urlencode(data), mutable=True), MultiValueDict(files or {}))
+
+    def test_bracketed_keys_become_nested_lists_and_dicts(self):
+        upload = SimpleUploadedFile('logo.png', b'image')
+        payload = self.build({
+            'title': 'Logo',
+            'packages[1][package_name]': 'Standard',
+            'packages[0][package_name]': 'Basic',
+            'packages[0][price]': '10',
+            'faqs[0][question]': 'Q?',
+            'gallery_uploads[0][media_type]': 'image',
+        }, {'gallery_uploads[0][media_file]': [upload]})
+        self.assertEqual(payload['title'], 'Logo')
+        self.assertEqual(payload['packages'], [{'package_name': 'Basic', 'price': '10'}, {'package_name': 'Standard'}])
+        self.assertEqual(payload['faqs'], [{'question': 'Q?'}])
+        self.assertEqual(payload['gallery_uploads'], [{'media_type': 'image', 'media_file': upload}])
+
+    def test_json_fields_and_gallery_meta_still_work(self):
+        upload = SimpleUploadedFile('logo.png', b'image')
+        payload = self.build(
+            {'packages': '[{"package_name": "Basic"}]', 'gallery_meta': '[{"media_type": "image"}]'},
+            {'gallery_files': [upload]},
+        )
+        self.assertEqual(payload['packages'], [{'package_name': 'Basic'}])
+        self.assertEqual(payload['gallery_uploads'], [{'media_type': 'image', 'media_file': upload}])
+
+    def test_repeated_keys_keep_every_value(self):
+        first, second = SimpleUploadedFile('a.png', b'a'), SimpleUploadedFile('b.png', b'b')
+        payload = self.build(
+            [('title', 'Logo'), ('tags', 'logo'), ('tags', 'brand'), ('faqs[0][question]', 'Q?')],
+            {'gallery_uploads[0][media_file]': [first, second]},
+        )
+        self.assertEqual(payload['title'], 'Logo')
+        self.assertEqual(payload['tags'], ['logo', 'brand'])
+        self.assertEqual(payload['faqs'], [{'question': 'Q?'}])
+        self.assertEqual(payload['gallery_uploads'], [{'media_file': [first, second]}])
+
+    def test_a_field_sent_both_plain_and_bracketed_is_rejected(self):
+        with self.assertRaises(ParseError):
+            self.build({'packages': '[]', 'packages[0][price]': '10'})
+
+    def test_multipart_create_with_bracketed_packages(self):
+        self.client.force_authenticate(self.seller_user)
+        response = self.client.post('/api/gigs/', {
+            'title': 'Logo', 'description': 'Description', 'delivery_time': 3, 'status': 'active',
+            'category_id': self.category.pk, 'subcategory_id': self.subcategory.pk,
+            'packages[0][package_name]': 'Basic', 'packages[0][description]': 'Basic',
+            'packages[0][price]': '10', 'packages[0][delivery_days]': 3,
+            'faqs[0][question]': 'Q?', 'faqs[0][answer]': 'A.',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        gig = Gig.objects.get()
+        self.assertEqual(list(gig.packages.values_list('package_name', 'price')), [('Basic', Decimal('10'))])
+        self.assertEqual(list(gig.faqs.values_list('question', flat=True)), ['Q?'])
+
+
+class SimilarGigTests(GigTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        titles = ['Minimalist logo design', 'Modern minimalist logo', 'WordPress website setup', 'Mascot illustration']
+        cls.gigs = [cls.create_gig(title, description=title) for title in titles]
+
+    def test_neighbors_are_ranked_and_read_in_one_query(self):
+        call_command('build_similar_gigs', stdout=StringIO())
+        first, second = self.gigs[:2]
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/gigs/{first.pk}/similar/')
+        self.assertEqual(response.data[0]['id'], second.pk)
+        self.assertNotIn(first.pk, [gig['id'] for gig in response.data])
+
+    def test_small_blocks_find_the_same_neighbors(self):
+        def neighbors():
+            rebuild_similar_gigs()
+            return list(GigNeighbor.objects.order_by('gig_id', 'rank').values_list('gig_id', 'neighbor_id', 'rank'))
+
+        expected = neighbors()
+        self.assertTrue(expected)
+        with override_settings(GIG_SIMILAR_BLOCK_ROWS=1, GIG_SIMILAR_BLOCK_CELLS=2):
+            self.assertEqual(neighbors(), expected)
+
+    def test_inactive_gigs_lose_their_neighbors(self):
+        call_command('build_similar_gigs', stdout=StringIO())
+        first, second = self.gigs[:2]
+        Gig.objects.filter(pk=second.pk).update(status='paused')
+        call_command('build_similar_gigs', stdout=StringIO())
+        self.assertFalse(GigNeighbor.objects.filter(gig=second).exists())
+        self.assertFalse(GigNeighbor.objects.filter(neighbor=second).exists())
+
+    def test_incremental_run_refreshes_the_rails_listing_a_changed_gig(self):
+        call_command('build_similar_gigs', stdout=StringIO())
+        first, second = self.gigs[:2]
+        Gig.objects.filter(pk=second.pk).update(status='paused')
+        rebuild_similar_gigs([second.pk])
+        self.assertFalse(GigNeighbor.objects.filter(neighbor=second).exists())
+
+
+class AlsoOrderedTests(GigTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.gigs = [cls.create_gig(f'Gig {i}', price='10') for i in range(3)]
+
+    def order(self, buyer, gig):
+        return Order.objects.create(
+            buyer=buyer, seller=self.seller_user, gig=gig, package=gig.packages.first(),
+            description='Order', total_amount=Decimal('10'),
+        )
+
+    def rail(self, gig):
+        return [card['id'] for card in self.client.get(f'/api/gigs/{gig.pk}/also-ordered/').data]
+
+    def test_rails_need_two_shared_buyers_and_follow_new_orders(self):
+        first, second, third = self.gigs
+        buyers = [User.objects.create_user(f'buyer{i}', f'buyer{i}@example.com', 'password123') for i in range(4)]
+        for buyer in buyers[:2]:
+            self.order(buyer, first)
+            self.order(buyer, second)
+        self.order(buyers[2], first)
+        self.order(buyers[2], third)
+        call_command('build_copurchases', stdout=StringIO())
+        self.assertEqual(self.rail(first), [second.pk])
+        self.assertEqual(self.rail(second), [first.pk])
+
+        self.order(buyers[3], first)
+        self.order(buyers[3], third)
+        cancelled = Order.objects.get(buyer=buyers[0], gig=second)
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        call_command('build_copurchases', updated_within=1, stdout=StringIO())
+        self.assertEqual(self.rail(first), [third.pk])
+        self.assertEqual(self.rail(second), [])
+
+
+class TrendingTests(GigTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.gigs = [cls.create_gig(f'Gig {i}') for i in range(3)]
+
+    def trending(self):
+        response = self.client.get('/api/gigs/', {'sort': 'trending', 'category__slug': 'design'})
+        return [card['id'] for card in response.data['results']]
+
+    def test_recent_events_outrank_old_ones(self):
+        first, second, third = self.gigs
+        now = timezone.now()
+        record_events([first.pk], 'order', when=now - timedelta(days=30))
+        record_events([first.pk], 'order', when=now - timedelta(days=30))
+        record_events([second.pk], 'save', when=now)
+        self.assertEqual(self.trending(), [second.pk, first.pk, third.pk])
+
+        # One more recent event moves the first gig up without rebuilding the board
+        with self.captureOnCommitCallbacks(execute=True):
+            record_events([first.pk], 'order', when=now)
+        self.assertEqual(self.trending(), [first.pk, second.pk, third.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.status = 'paused'
+            first.save()
+        self.assertEqual(self.trending(), [second.pk, third.pk])
+
+
+class GigVisibilityTests(GigTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.active, cls.draft, cls.paused = [
+            cls.create_gig(status, status=status) for status in ('active', 'draft', 'paused')
+        ]
+
+    def listed(self, path='/api/gigs/'):
+        return {card['id'] for card in self.client.get(path).data['results']}
+
+    def test_public_listings_only_show_active_gigs(self):
+        self.assertEqual(self.listed(), {self.active.pk})
+        self.assertEqual(self.listed(f'/api/gigs/by-category/{self.category.pk}/'), {self.active.pk})
+        self.assertEqual(self.client.get(f'/api/gigs/{self.draft.pk}/').status_code, 404)
+
+        buyer = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        self.client.force_authenticate(buyer)
+        self.assertEqual(self.listed(), {self.active.pk})
+
+    def test_sellers_still_see_their_own_gigs(self):
+        self.client.force_authenticate(self.seller_user)
+        self.assertEqual(self.listed(), {self.active.pk, self.draft.pk, self.paused.pk})
+        self.assertEqual(self.client.get(f'/api/gigs/{self.draft.pk}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/gigs/{self.paused.pk}/bundle/').status_code, 200)
@@ -0,0 +1,147 @@
+"""
+Trending gigs.
+
+Orders, saves and ratings each add a weight to a gig's trending score, and
+an event's weight halves every ``GIG_TRENDING_HALF_LIFE`` hours. Instead of
+decaying every score as time passes, an event at time ``t`` is added as
+``weight * 2 ** (t / half_life)``, counting ``t`` from ``EPOCH``. Decaying
+all scores to the present would divide them by the same factor, so the
+stored values already rank gigs the way the decayed ones would. They never
+need rewriting, and an event is a single ``UPDATE`` of one row.
+
+``Gig.trending_score`` stores the log of that sum, which keeps the numbers
+small; the sum is taken with logaddexp in SQL so it cannot overflow. A gig
+without events scores 0, as if it had one event of weight 1 at ``EPOCH``,
+long since decayed.
+
+The best ``GIG_TRENDING_TOP_K`` active gigs of each category, and of the
+whole catalogue, are cached as short boards of ``(score, gig_id)``. Events
+merge the new scores into the cached boards, which is exact because scores
+only ever grow. ``?sort=trending`` lists the gigs of a board.
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from core.versions import bump_versions
+from .models import Category, Gig
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+BOARD_KEY = 'gigs:trending:{slug}'
+ALL_CATEGORIES = '*'
+
+DEFAULT_WEIGHTS = {
+    'order': 3.0,
+    'rating': 2.0,
+    'save': 1.0,
+}
+
+
+def get_half_life():
+    """Hours for an event's weight to halve."""
+    return getattr(settings, 'GIG_TRENDING_HALF_LIFE', 72)
+
+
+def get_weights():
+    return {**DEFAULT_WEIGHTS, **getattr(settings, 'GIG_TRENDING_WEIGHTS', {})}
+
+
+def get_top_k():
+    return getattr(settings, 'GIG_TRENDING_TOP_K', 100)
+
+
+def get_board_timeout():
+    return getattr(settings, 'GIG_TRENDING_BOARD_TIMEOUT', 60 * 60)
+
+
+def event_score(kind, when):
+    """Log of the weight an event of ``kind`` at ``when`` adds to a score."""
+    hours = (when - EPOCH).total_seconds() / 3600
+    return math.log(get_weights()[kind]) + math.log(2) * hours / get_half_life()
+
+
+def logaddexp(first, second):
+    """``log(exp(first) + exp(second))`` without overflowing."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _logaddexp_expression(field, value):
+    value = Value(value, output_field=FloatField())
+    high = Greatest(F(field), value)
+    low = Least(F(field), value)
+    return high + Ln(1 + Exp(low - high))
+
+
+def record_events(gig_ids, kind, when=None):
+    """Add one event of ``kind`` (``order``, ``save``, ``rating``) to each gig's score."""
+    gig_ids = list(gig_ids)
+    if not gig_ids:
+        return
+    score = event_score(kind, when or timezone.now())
+    # update() keeps updated_at, which the incremental jobs read, untouched
+    Gig.objects.filter(pk__in=gig_ids).update(trending_score=_logaddexp_expression('trending_score', score))
+    transaction.on_commit(lambda: merge_into_boards(gig_ids))
+
+
+def _board_queryset(slug):
+    queryset = Gig.objects.active()
+    if slug != ALL_CATEGORIES:
+        queryset = queryset.filter(category__slug=slug)
+    return queryset
+
+
+def trending_gig_ids(category_slug=None):
+    """Ids of the category's (default: the catalogue's) trending gigs, best first."""
+    slug = category_slug or ALL_CATEGORIES
+    key = BOARD_KEY.format(slug=slug)
+    board = cache.get(key)
+    if board is None:
+        board = list(
+            _board_queryset(slug).order_by('-trending_score', '-id')
+            .values_list('trending_score', 'id')[:get_top_k()]
+        )
+        cache.set(key, board, get_board_timeout())
+    return [gig_id for _, gig_id in board]
+
+
+def merge_into_boards(gig_ids):
+    """
+    Move the gigs to their current place on the cached boards, or off them
+    when they are no longer active. Boards that are not cached are left to
+    be built by the next read; a board that loses a gig runs one short until
+    it expires.
+    """
+    gig_ids = set(gig_ids)
+    entries = {}
+    rows = Gig.objects.filter(pk__in=gig_ids).values_list('trending_score', 'pk', 'category__slug', 'status')
+    for score, pk, slug, status in rows:
+        for board_slug in (ALL_CATEGORIES, slug):
+            entries.setdefault(board_slug, [])
+            if status == 'active':
+                entries[board_slug].append((score, pk))
+
+    keys = {BOARD_KEY.format(slug=slug): slug for slug in entries}
+    boards = cache.get_many(keys)
+    top_k = get_top_k()
+    updated = {}
+    for key, board in boards.items():
+        kept = [entry for entry in board if entry[1] not in gig_ids]
+        merged = sorted(kept + entries[keys[key]], reverse=True)[:top_k]
+        if merged != board:
+            updated[key] = merged
+    if updated:
+        cache.set_many(updated, get_board_timeout())
+        bump_versions(['trending'])
+
+
+def clear_boards():
+    slugs = [ALL_CATEGORIES, *Category.objects.values_list('slug', flat=True)]
+    cache.delete_many([BOARD_KEY.format(slug=slug) for slug in slugs])
+    bump_versions(['trending'])
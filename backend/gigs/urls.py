@@ -5,6 +5,7 @@ from .views import (
     SubCategoryViewSet, 
     GigViewSet,
     SavedGigViewSet,
+    TagViewSet,
     GigsByCategoryView
 )
 
@@ -12,6 +13,7 @@ router = DefaultRouter()
 router.register('categories', CategoryViewSet, basename='category')
 router.register('subcategories', SubCategoryViewSet, basename='subcategory')
 router.register('saved', SavedGigViewSet, basename='savedgig')
+router.register('tags', TagViewSet, basename='tag')
 router.register('', GigViewSet, basename='gig')
 
 urlpatterns = [
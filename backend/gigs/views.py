@@ -1,22 +1,105 @@
-from rest_framework import generics, permissions, viewsets
+from rest_framework import generics, mixins, permissions, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.parsers import JSONParser
 from rest_framework import serializers
 from rest_framework.response import Response
-from .models import Category, SubCategory, Gig, GigPackage, GigFAQ, GigGallery, SavedGig
-from .serializers import CategorySerializer, SubCategorySerializer, GigSerializer, GigPackageSerializer, GigFAQSerializer, GigGallerySerializer, SavedGigSerializer
+from .models import Category, SubCategory, Gig, GigPackage, GigFAQ, GigGallery, SavedGig, Tag
+from .serializers import CategorySerializer, SubCategorySerializer, GigSerializer, GigCardSerializer, GigPackageSerializer, GigFAQSerializer, GigGallerySerializer, SavedGigBulkSerializer, SavedGigSerializer, TagSerializer
+from .search import rank_queryset
+from .pagination import KeysetPagination
+from .facets import compute_facets
+from .tags import filter_by_tags
+from .cache import cache_response
+from .suggest import get_suggestions
+from .saves import save_gigs, saved_gig_ids, saved_scope, unsave_gigs
+from .trending import trending_gig_ids
+from .bulk import GigImporter
+from .parsers import GigFormParser, GigMultiPartParser, NDJSONParser
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
-import json
-from django.db.models import Q, Min
-from rest_framework.views import APIView
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from core.conditional import conditional_get
+from core.versions import versions_etag
+from accounts.permissions import IsSeller
+from accounts.serializers.profile_serializers import SellerProfileSummarySerializer
+from orders.models import Order
+from reviews.models import GigRating
+from reviews.serializers import GigReviewSerializer
+
+def count_subquery(queryset, group_by):
+    """Row count of ``queryset`` (correlated through OuterRef) as an annotation."""
+    counts = queryset.order_by().values(group_by).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts[:1]), 0, output_field=IntegerField())
+
+
+class SparseFieldsViewMixin:
+    """
+    Reads ``?fields=`` and ``?expand=`` on safe requests, passes them to the
+    serializer and plans the queryset so only the requested columns and
+    relations are loaded.
+    """
+    ordering_fields = []
+
+    def get_field_selection(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return None, None
+        params = self.request.query_params
+        fields = [name for name in params.get('fields', '').split(',') if name]
+        expand = [name for name in params.get('expand', '').split(',') if name]
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'check_field_selection'):
+            serializer_class.check_field_selection(fields, expand)
+        return fields or None, expand or None
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_field_selection()
+        kwargs.setdefault('fields', fields)
+        kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def plan_queryset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        names = serializer_class.get_rendered_field_names(*self.get_field_selection())
+        # Sort keys are read back by the paginator, so keep them loaded
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        ordering = [field.lstrip('-') for field in queryset.query.order_by if isinstance(field, str)]
+        sort_columns = [name for name in [*ordering, *self.ordering_fields] if name in model_fields]
+        return serializer_class.setup_eager_loading(queryset, names, extra_columns=sort_columns)
+
+
+class SavedFlagViewMixin:
+    """Resolves ``is_saved`` for every gig a serializer renders with a single query."""
+
+    def get_serializer(self, *args, **kwargs):
+        instance = args[0] if args else kwargs.get('instance')
+        if instance is not None:
+            gigs = instance if kwargs.get('many') else [instance]
+            context = kwargs.setdefault('context', self.get_serializer_context())
+            context['saved_gig_ids'] = saved_gig_ids(self.request.user, [gig.pk for gig in gigs])
+        return super().get_serializer(*args, **kwargs)
+
+
+class GigsByCategoryView(SavedFlagViewMixin, SparseFieldsViewMixin, generics.ListAPIView):
+    serializer_class = GigCardSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
+
+    def get_cache_scopes(self):
+        return [f"category:{self.kwargs['category_id']}"]
+
+    @cache_response
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
-class GigsByCategoryView(APIView):
-    def get(self, request, category_id):
-        gigs = Gig.objects.filter(category_id=category_id)
-        serializer = GigSerializer(gigs, many=True, context={"request": request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def get_queryset(self):
+        queryset = Gig.objects.active().filter(category_id=self.kwargs['category_id']).order_by('-created_at')
+        return self.plan_queryset(queryset)
 
 # -----------------------------------------------------------------------------
 # Category Views
@@ -25,6 +108,22 @@ class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
 
+    def get_cache_scopes(self):
+        return ['taxonomy']
+
+    def get_etag(self, request, *args, **kwargs):
+        return versions_etag(self.get_cache_scopes(), request.get_full_path())
+
+    @conditional_get
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
@@ -37,6 +136,22 @@ class CategoryViewSet(viewsets.ModelViewSet):
 class SubCategoryViewSet(viewsets.ModelViewSet):
     serializer_class = SubCategorySerializer
 
+    def get_cache_scopes(self):
+        return ['taxonomy']
+
+    def get_etag(self, request, *args, **kwargs):
+        return versions_etag(self.get_cache_scopes(), request.get_full_path())
+
+    @conditional_get
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_queryset(self):
         category_id = self.request.query_params.get('category')
         queryset = SubCategory.objects.all()
@@ -53,106 +168,144 @@ class SubCategoryViewSet(viewsets.ModelViewSet):
 
 
 
+class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    """Tag cloud: tags in use, most used first. Counts are maintained on write."""
+    serializer_class = TagSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        queryset = Tag.objects.filter(gig_count__gt=0)
+        prefix = self.request.query_params.get('prefix')
+        if prefix:
+            queryset = queryset.filter(name__startswith=prefix.strip().lower())
+        return queryset.order_by('-gig_count', 'name')
+
+
 # -----------------------------------------------------------------------------
 # Gig Views
 # -----------------------------------------------------------------------------
 
-class GigViewSet(viewsets.ModelViewSet):
+class GigViewSet(SavedFlagViewMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
     serializer_class = GigSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['category__slug', 'subcategory__slug', 'seller__id', 'is_featured']
-    search_fields = ['title', 'description', 'seller__user__first_name', 'seller__user__username']
-    ordering_fields = ['min_price', 'created_at']
+    ordering_fields = ['min_price', 'created_at', 'popularity_score', 'rating_average']
+    pagination_class = KeysetPagination
+    parser_classes = [JSONParser, GigMultiPartParser, GigFormParser]
+
+    SORT_ORDERINGS = {
+        'newest': ('-created_at',),
+        'price-low': ('min_price',),
+        'price-high': ('-min_price',),
+        'popular': ('-popularity_score',),
+        'trending': ('-trending_score',),
+    }
 
     def get_queryset(self):
-        queryset = Gig.objects.all().annotate(min_price=Min('packages__price'))
+        # Drafts and paused gigs are only shown to their seller
+        queryset = Gig.objects.visible_to(self.request.user)
         q = self.request.query_params.get('q')
         sort = self.request.query_params.get('sort')
+        price_min = self.request.query_params.get('price_min')
+        price_max = self.request.query_params.get('price_max')
+        tags = self.request.query_params.getlist('tag')
+        tag_mode = self.request.query_params.get('tag_mode', 'all')
 
-        if q:
-            category_matches = queryset.filter(
-                Q(category__name__icontains=q) |
-                Q(subcategory__name__icontains=q)
-            ).distinct()
-
-            if category_matches.exists():
-                queryset = category_matches
-            else:
-                queryset = queryset.filter(
-                    Q(title__icontains=q) |
-                    Q(description__icontains=q) |
-                    Q(seller__user__username__icontains=q) |
-                    Q(seller__user__first_name__icontains=q) |
-                    Q(seller__user__last_name__icontains=q)
-                ).distinct()
-
-        # Handle custom sort logic
-        if sort == 'price-low':
-            queryset = queryset.order_by('min_price')
-        elif sort == 'price-high':
-            queryset = queryset.order_by('-min_price')
-        elif sort == 'newest':
-            queryset = queryset.order_by('-created_at')
-        elif sort == 'popular':
-            queryset = queryset.order_by('-rating')  # Make sure this field exists
+        if tags:
+            queryset = filter_by_tags(queryset, tags, match_all=tag_mode != 'any')
 
-        return queryset
+        try:
+            if price_min:
+                queryset = queryset.filter(min_price__gte=Decimal(price_min))
+            if price_max:
+                queryset = queryset.filter(min_price__lte=Decimal(price_max))
+        except InvalidOperation:
+            raise serializers.ValidationError({'price': 'price_min and price_max must be numbers.'})
+
+        if q:
+            # Ranked in the database from the index; category/subcategory hits are
+            # boosted inside the index rather than searched separately. A query of
+            # stop words only leaves the listing unfiltered.
+            queryset = rank_queryset(queryset, q)
+
+        if sort == 'trending':
+            # Only the gigs on the cached trending board of the category
+            board = trending_gig_ids(self.request.query_params.get('category__slug'))
+            queryset = queryset.filter(pk__in=board)
+
+        # Handle custom sort logic; search results keep their relevance order
+        # unless a sort is requested. KeysetPagination adds the id tie-breaker.
+        if sort in self.SORT_ORDERINGS:
+            queryset = queryset.order_by(*self.SORT_ORDERINGS[sort])
+        elif 'search_rank' not in queryset.query.annotations:
+            queryset = queryset.order_by(*self.SORT_ORDERINGS['newest'])
+
+        return self.plan_queryset(queryset)
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'similar', 'also_ordered'):
+            return GigCardSerializer
+        return GigSerializer
+
+    def get_cache_scopes(self):
+        if self.action in ('retrieve', 'bundle'):
+            return [f"gig:{self.kwargs[self.lookup_field]}"]
+        if self.action in ('similar', 'also_ordered'):
+            return ['gigs', self.action]
+        if self.action == 'list' and self.request.query_params.get('sort') == 'trending':
+            return ['gigs', 'trending']
+        return ['gigs']
+
+    def get_etag(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            # is_saved differs per user
+            scopes = [*self.get_cache_scopes(), saved_scope(request.user)]
+            return versions_etag(scopes, request.get_full_path(), request.user.pk)
+        return versions_etag(self.get_cache_scopes(), request.get_full_path())
+
+    @conditional_get
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        """List gigs; ``?facets=true`` adds filter-sidebar counts over the whole result set."""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        if request.query_params.get('facets', '').lower() in ('1', 'true', 'yes'):
+            response.data['facets'] = compute_facets(queryset)
+        return response
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
-    def _parse_json_fields(self, request, data, fields):
-        """
-        Helper method to parse JSON string fields into Python objects.
-        Handles both direct JSON strings and lists containing JSON strings.
-        """
-        for field in fields:
-            if field not in data:
-                continue
-
-            raw_value = data[field]
-            
-            # Handle case where value is a single-element list
-            if isinstance(raw_value, list) and len(raw_value) == 1:
-                
-                raw_value = raw_value[0]
-            
-            # Parse if the value is a JSON string
-            if isinstance(raw_value, str):
-                try:
-                    data[field] = json.loads(raw_value)
-                except json.JSONDecodeError:
-                    # If parsing fails, keep the original value
-                    continue
-            
-        return data
-
-
     def create(self, request, *args, **kwargs):
-        """Create a new gig with parsed JSON fields."""
-        data = request.data.copy()
-        data = self._parse_json_fields(request, data, ['packages', 'faqs'])
-        
-        serializer = self.get_serializer(data=data)
+        """Create a new gig; multipart payloads arrive already decoded by GigMultiPartParser."""
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)   
         self.perform_create(serializer)
         return Response(serializer.data, status=201)
 
     def update(self, request, *args, **kwargs):
-        """Update an existing gig with parsed JSON fields."""
+        """Update an existing gig; multipart payloads arrive already decoded by GigMultiPartParser."""
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
-        data = request.data.copy()
-        data = self._parse_json_fields(request, data, ['packages', 'faqs'])
 
-        serializer = self.get_serializer(instance, data=data, partial=partial)
-        if not serializer.is_valid():
-            print("Serializer errors:", serializer.errors)  # 👈 helpful log
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
+
+        if getattr(instance, '_prefetched_objects_cache', None):
+            # get_object() prefetched the nested collections; drop them so the
+            # response reflects the update.
+            instance._prefetched_objects_cache = {}
+
         return Response(serializer.data)
 
     def perform_create(self, serializer):
@@ -163,9 +316,122 @@ class GigViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='my-gigs', permission_classes=[permissions.IsAuthenticated])
     def my_gigs(self, request):
         """Get all gigs belonging to the current authenticated user."""
-        gigs = Gig.objects.filter(seller=request.user.seller_profile)
-        serializer = self.get_serializer(gigs, many=True)
-        return Response(serializer.data)
+        gigs = Gig.objects.filter(seller=request.user.seller_profile).order_by('-created_at')
+        gigs = self.plan_queryset(gigs)
+        page = self.paginate_queryset(gigs)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False, methods=['post'], url_path='bulk',
+        permission_classes=[permissions.IsAuthenticated, IsSeller],
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        """
+        Create or update many of the seller's gigs at once. Takes a JSON array,
+        ``{"gigs": [...]}`` or NDJSON; items with an ``id`` update that gig.
+        Invalid items are reported by index and the rest are still saved.
+        """
+        items = request.data.get('gigs') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list):
+            raise serializers.ValidationError({'gigs': 'Expected a list of gigs.'})
+        max_items = getattr(settings, 'GIG_IMPORT_MAX_ITEMS', 1000)
+        if len(items) > max_items:
+            raise serializers.ValidationError({'gigs': f'At most {max_items} gigs per request.'})
+
+        results = GigImporter(request.user.seller_profile).run(items)
+        counts = {'created': 0, 'updated': 0, 'error': 0}
+        for result in results:
+            counts[result['status']] += 1
+        return Response({
+            'created': counts['created'],
+            'updated': counts['updated'],
+            'failed': counts['error'],
+            'results': results,
+        })
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def suggest(self, request):
+        """Prefix completions for the search box, grouped by kind and ranked by popularity."""
+        query = request.query_params.get('q', '')
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 5)), 10))
+        except ValueError:
+            raise serializers.ValidationError({'limit': 'Must be a whole number.'})
+        return Response({'query': query, **get_suggestions(query, limit)})
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    @conditional_get
+    @cache_response
+    def bundle(self, request, pk=None):
+        """
+        Everything the gig page shows in one response: the gig with its packages,
+        FAQs and gallery, the seller summary, the rating summary and recent reviews.
+        Runs a fixed five queries (six when signed in, for ``is_saved``), and
+        none at all for a 304.
+        """
+        # Seller counts ride along on the gig row as correlated subqueries
+        queryset = GigSerializer.setup_eager_loading(Gig.objects.visible_to(request.user)).annotate(
+            seller_active_gigs_count=count_subquery(
+                Gig.objects.filter(seller=OuterRef('seller'), status='active'), 'seller'
+            ),
+            seller_completed_orders_count=count_subquery(
+                Order.objects.filter(seller=OuterRef('seller__user'), status='completed'), 'seller'
+            ),
+        )
+        gig = get_object_or_404(queryset, pk=pk)
+        self.check_object_permissions(request, gig)
+        gig.seller.active_gigs_count = gig.seller_active_gigs_count
+        gig.seller.completed_orders_count = gig.seller_completed_orders_count
+
+        reviews = (
+            GigRating.objects.filter(gig=gig)
+            .select_related('buyer')
+            .order_by('-timestamp')[:getattr(settings, 'GIG_BUNDLE_REVIEWS', 5)]
+        )
+        context = self.get_serializer_context()
+        context['saved_gig_ids'] = saved_gig_ids(request.user, [gig.pk])
+        gig_data = GigSerializer(gig, context=context).data
+        return Response({
+            'gig': gig_data,
+            'seller': SellerProfileSummarySerializer(gig.seller, context=context).data,
+            'rating_summary': {
+                'average': gig_data['rating_average'],
+                'count': gig_data['rating_count'],
+                'histogram': gig_data['rating_histogram'],
+            },
+            'recent_reviews': GigReviewSerializer(reviews, many=True, context=context).data,
+        })
+
+    def neighbor_response(self, request, pk, kind, max_limit):
+        """The gig's precomputed ``kind`` neighbors as cards, closest first, in one query."""
+        if not pk.isdigit():
+            raise NotFound()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', max_limit)), max_limit))
+        except ValueError:
+            raise serializers.ValidationError({'limit': 'Must be a whole number.'})
+        queryset = (
+            Gig.objects.filter(neighbor_of__gig_id=pk, neighbor_of__kind=kind, status='active')
+            .order_by('neighbor_of__rank')
+        )
+        gigs = list(self.plan_queryset(queryset)[:limit])
+        return Response(self.get_serializer(gigs, many=True).data)
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    @cache_response
+    def similar(self, request, pk=None):
+        """Related gigs for the gig page, precomputed by ``build_similar_gigs``."""
+        return self.neighbor_response(request, pk, 'similar', getattr(settings, 'GIG_SIMILAR_NEIGHBORS', 12))
+
+    @action(detail=True, methods=['get'], url_path='also-ordered', permission_classes=[permissions.AllowAny])
+    @cache_response
+    def also_ordered(self, request, pk=None):
+        """The "buyers also ordered" rail, precomputed from orders by ``build_copurchases``."""
+        return self.neighbor_response(
+            request, pk, 'also_ordered', getattr(settings, 'GIG_ALSO_ORDERED_NEIGHBORS', 12),
+        )
 
     @action(detail=True, methods=['get'])
     def packages(self, request, pk=None):
@@ -278,38 +544,47 @@ class GigGalleryViewSet(viewsets.ModelViewSet):
 # -----------------------------------------------------------------------------
 # SavedGig Views
 # -----------------------------------------------------------------------------
-class SavedGigViewSet(viewsets.ModelViewSet):
+class SavedGigViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    The current user's saved gigs, addressed by gig id. Saving a saved gig and
+    unsaving one that is not saved both succeed without changing anything.
+    """
     serializer_class = SavedGigSerializer
     permission_classes = [permissions.IsAuthenticated]
+    lookup_field = 'gig_id'
+    lookup_value_regex = r'\d+'
 
     def get_queryset(self):
         """
         Filters the queryset to only include saved gigs for the current user.
         """
-        return SavedGig.objects.filter(user=self.request.user)
+        return SavedGig.objects.filter(user=self.request.user).order_by('-created_at')
 
-    def perform_create(self, serializer):
-        """
-        Automatically sets the user and gig for the saved gig.
-        """
-        gig_id = self.request.data.get('gig_id', None)
+    def create(self, request, *args, **kwargs):
+        """Save the gig in ``gig_id``: 201 when newly saved, 200 when it already was."""
+        gig_id = request.data.get('gig_id', None)
         if gig_id is None:
             raise serializers.ValidationError("gig_id is required to save a Gig.")
 
         gig = get_object_or_404(Gig, pk=gig_id)
-        # Check if the gig is already saved by the user
-        if SavedGig.objects.filter(user=self.request.user, gig=gig).exists():
-            raise serializers.ValidationError("This gig is already saved.")
-
-        serializer.save(user=self.request.user, gig=gig)
-
-    def destroy(self, request, pk=None):
-        """
-        Allows a user to "unsave" a gig by deleting the SavedGig object.
-        """
-        try:
-            saved_gig = SavedGig.objects.get(pk=pk, user=request.user)
-            saved_gig.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        except SavedGig.DoesNotExist:
-            return Response(status=status.HTTP_404_NOT_FOUND)
+        created = bool(save_gigs(request.user, [gig.pk]))
+        saved_gig = SavedGig.objects.get(user=request.user, gig=gig)
+        return Response(
+            self.get_serializer(saved_gig).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    def destroy(self, request, gig_id=None):
+        """Unsave a gig by its id."""
+        unsave_gigs(request.user, [int(gig_id)])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """Save and unsave many gigs at once: ``{"save": [ids], "unsave": [ids]}``."""
+        serializer = SavedGigBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({
+            'saved': save_gigs(request.user, serializer.validated_data.get('save', [])),
+            'unsaved': unsave_gigs(request.user, serializer.validated_data.get('unsave', [])),
+        })
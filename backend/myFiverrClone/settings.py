@@ -209,6 +209,30 @@ DATABASES = {
     }
 }
 
+# ======================
+# CACHE CONFIG
+# ======================
+# Version counters, cached responses, the homepage snapshot and the search
+# suggestions are shared by every worker, so the cache must be too. Without
+# REDIS_URL (development, tests) each process gets its own in-memory cache,
+# which the core.W001 deploy check reports.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'myfiverrclone',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'myfiverrclone',
+        }
+    }
+
 # ======================
 # AUTHENTICATION SETTINGS
 # ======================
@@ -240,6 +264,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Gig thumbnails, gallery and portfolio media are stored once per distinct content, see core/storage.py
+    'content': {'BACKEND': 'core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # ======================
 # SITE & CUSTOM SETTINGS
 # ======================
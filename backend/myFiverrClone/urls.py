@@ -8,6 +8,7 @@ from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
 from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from core.views import serve_media
 
 @method_decorator(csrf_exempt, name='dispatch')
 class GoogleLogin(SocialLoginView):
@@ -45,4 +46,4 @@ urlpatterns = [
 # Serve media files during development
 if settings.DEBUG:
     # Append media URL patterns to the main URL configuration
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media)
\ No newline at end of file
@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from core.management.base import ChunkedCommand
+from accounts.models import SellerProfile
+from gigs.models import Gig
+from reviews.models import RATING_VALUES, GigRating, OrderRating
+
+
+class Command(ChunkedCommand):
+    help = "Recompute the rating summaries of every gig and seller profile from the ratings tables."
+
+    def handle(self, *args, **options):
+        gig_histograms = defaultdict(lambda: defaultdict(int))
+        seller_histograms = defaultdict(lambda: defaultdict(int))
+
+        gig_ratings = GigRating.objects.values('gig_id', 'gig__seller_id', 'rating').annotate(n=Count('pk')).order_by()
+        for row in gig_ratings:
+            gig_histograms[row['gig_id']][row['rating']] += row['n']
+            seller_histograms[row['gig__seller_id']][row['rating']] += row['n']
+
+        order_ratings = (
+            OrderRating.objects.values('order__gig_id', 'seller__seller_profile', 'rating')
+            .annotate(n=Count('pk'))
+            .order_by()
+        )
+        for row in order_ratings:
+            gig_histograms[row['order__gig_id']][row['rating']] += row['n']
+            if row['seller__seller_profile']:
+                seller_histograms[row['seller__seller_profile']][row['rating']] += row['n']
+
+        self.rebuild(Gig, gig_histograms, options)
+        self.rebuild(SellerProfile, seller_histograms, options)
+
+    def rebuild(self, model, histograms, options):
+        total = 0
+        for chunk in self.chunks(model.objects.values_list('pk', flat=True), options):
+            objects = []
+            fields = None
+            for pk in chunk:
+                obj = model(pk=pk)
+                for value in RATING_VALUES:
+                    setattr(obj, f'rating_{value}_count', histograms.get(pk, {}).get(value, 0))
+                fields = obj.apply_rating_change()
+                objects.append(obj)
+            with transaction.atomic():
+                model.objects.bulk_update(objects, fields)
+
+            total += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating summaries for {total} {model._meta.verbose_name_plural}."))
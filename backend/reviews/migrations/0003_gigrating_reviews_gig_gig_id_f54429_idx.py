@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 12:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0008_tag_gigtag'),
+        ('reviews', '0002_alter_gigrating_rating_alter_orderrating_rating'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gigrating',
+            index=models.Index(fields=['gig', '-timestamp'], name='reviews_gig_gig_id_f54429_idx'),
+        ),
+    ]
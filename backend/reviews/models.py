@@ -1,13 +1,75 @@
+from decimal import Decimal
+
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
 
-# Create your models here.
+RATING_VALUES = range(1, 6)
+
+
+def default_popularity_score():
+    """An unrated object sits at the prior mean."""
+    return getattr(settings, 'RATING_PRIOR_MEAN', 3.5)
+
+
+class RatingAggregate(models.Model):
+    """
+    Rating summary kept on the rated object (gig, seller profile) so listings
+    never aggregate over the ratings tables at request time.
+    Maintained incrementally by reviews.signals.
+    """
+    rating_average = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def rating_histogram(self):
+        return {value: getattr(self, f'rating_{value}_count') for value in RATING_VALUES}
+
+    def apply_rating_change(self, removed=None, added=None):
+        """
+        Adjust the summary for one rating being removed and/or added.
+        Returns the names of the fields that changed.
+        """
+        for value, step in ((removed, -1), (added, 1)):
+            if value in RATING_VALUES:
+                field = f'rating_{value}_count'
+                setattr(self, field, max(getattr(self, field) + step, 0))
+        self.recompute_rating_summary()
+        return ['rating_average', 'rating_count'] + [f'rating_{value}_count' for value in RATING_VALUES]
+
+    def recompute_rating_summary(self):
+        histogram = self.rating_histogram
+        self.rating_count = sum(histogram.values())
+        total = sum(value * count for value, count in histogram.items())
+        self.rating_average = (
+            (Decimal(total) / self.rating_count).quantize(Decimal('0.01')) if self.rating_count else Decimal('0')
+        )
+
+    def bayesian_rating(self):
+        """
+        Average shrunk towards a prior so a single 5-star rating does not
+        outrank hundreds of 4.8s.
+        """
+        prior_mean = getattr(settings, 'RATING_PRIOR_MEAN', 3.5)
+        prior_weight = getattr(settings, 'RATING_PRIOR_WEIGHT', 10)
+        total = sum(value * count for value, count in self.rating_histogram.items())
+        return (prior_weight * prior_mean + total) / (prior_weight + self.rating_count)
+
+
 class OrderRating(models.Model):
     order = models.ForeignKey('orders.Order', on_delete=models.CASCADE, related_name='ratings')
     buyer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ratings_given')
     seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ratings_received')
-    rating = models.IntegerField()
+    rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     review = models.TextField(blank=True, null=True)
     timestamp = models.DateTimeField(default=timezone.now)
 
@@ -20,7 +82,7 @@ class OrderRating(models.Model):
 class GigRating(models.Model):
     gig = models.ForeignKey('gigs.Gig', on_delete=models.CASCADE, related_name='ratings')
     buyer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='gig_ratings_given')
-    rating = models.IntegerField()
+    rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     review = models.TextField(blank=True, null=True)
     timestamp = models.DateTimeField(default=timezone.now)
 
@@ -28,4 +90,7 @@ class GigRating(models.Model):
         return f"Rating for Gig #{self.gig.id} by {self.buyer.username}"
 
     class Meta:
-        unique_together = ('gig', 'buyer')  # Ensure one review per buyer per gig
\ No newline at end of file
+        unique_together = ('gig', 'buyer')  # Ensure one review per buyer per gig
+        indexes = [
+            models.Index(fields=['gig', '-timestamp']),  # recent reviews on the gig page
+        ]
\ No newline at end of file
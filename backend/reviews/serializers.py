@@ -0,0 +1,13 @@
+from rest_framework import serializers
+
+from accounts.serializers.profile_serializers import UserCardSerializer
+from .models import GigRating
+
+
+class GigReviewSerializer(serializers.ModelSerializer):
+    buyer = UserCardSerializer(read_only=True)
+
+    class Meta:
+        model = GigRating
+        fields = ['id', 'rating', 'review', 'timestamp', 'buyer']
+        read_only_fields = fields
@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import SellerProfile
+from accounts.signals import invalidate_seller_profiles
+from gigs.cache import invalidate_gigs
+from gigs.models import Gig
+from gigs.suggest import schedule_suggest_update
+from gigs.trending import record_events
+from orders.models import Order
+from .models import GigRating, OrderRating
+
+
+def apply_rating_change(model, pk, removed=None, added=None):
+    """Incrementally update the rating summary of one gig or seller profile."""
+    if pk is None or removed == added:
+        return
+    with transaction.atomic():
+        obj = model.objects.select_for_update().filter(pk=pk).first()
+        if obj is None:
+            return
+        fields = obj.apply_rating_change(removed=removed, added=added)
+        # update() rather than save() so the search index is not rebuilt for a rating
+        model.objects.filter(pk=pk).update(**{field: getattr(obj, field) for field in fields})
+
+
+def rating_targets(instance):
+    """Return ``(gig_id, seller_profile_id)`` affected by a rating."""
+    if isinstance(instance, GigRating):
+        gig_id = instance.gig_id
+        seller_profile_id = Gig.objects.filter(pk=gig_id).values_list('seller_id', flat=True).first()
+    else:
+        gig_id = Order.objects.filter(pk=instance.order_id).values_list('gig_id', flat=True).first()
+        seller_profile_id = (
+            SellerProfile.objects.filter(user_id=instance.seller_id).values_list('pk', flat=True).first()
+        )
+    return gig_id, seller_profile_id
+
+
+def apply_to_targets(instance, removed=None, added=None):
+    gig_id, seller_profile_id = rating_targets(instance)
+    apply_rating_change(Gig, gig_id, removed=removed, added=added)
+    apply_rating_change(SellerProfile, seller_profile_id, removed=removed, added=added)
+    # Gig ratings are shown on cards and the detail page, but are not indexed for search
+    if gig_id is not None:
+        invalidate_gigs([gig_id])
+        if removed is None and added is not None:
+            record_events([gig_id], 'rating')
+    invalidate_seller_profiles([seller_profile_id])
+    # Suggestions are ranked by gig popularity and seller rating count
+    schedule_suggest_update(
+        ref for ref in [('gig', gig_id), ('seller', seller_profile_id)] if ref[1] is not None
+    )
+
+
+@receiver(pre_save, sender=GigRating)
+@receiver(pre_save, sender=OrderRating)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = sender.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+
+
+@receiver(post_save, sender=GigRating)
+@receiver(post_save, sender=OrderRating)
+def rating_saved(sender, instance, **kwargs):
+    apply_to_targets(instance, removed=getattr(instance, '_previous_rating', None), added=instance.rating)
+
+
+@receiver(post_delete, sender=GigRating)
+@receiver(post_delete, sender=OrderRating)
+def rating_deleted(sender, instance, **kwargs):
+    apply_to_targets(instance, removed=instance.rating)
@@ -1,3 +1,70 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import User, SellerProfile
+from gigs.models import Category, SubCategory, Gig, GigPackage
+from orders.models import Order
+from .models import GigRating, OrderRating
+
+
+class RatingAggregateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller_user = User.objects.create_user('seller', 'seller@example.com', 'password123', is_seller=True)
+        cls.seller = SellerProfile.objects.create(user=cls.seller_user, profile_title='Seller', bio='Bio')
+        category = Category.objects.create(name='Design')
+        cls.gig = Gig.objects.create(
+            seller=cls.seller, title='Logo', description='Description', category=category,
+            subcategory=SubCategory.objects.create(category=category, name='Logos'), delivery_time=3, status='active',
+        )
+        cls.package = GigPackage.objects.create(
+            gig=cls.gig, package_name='Basic', description='Basic', price=Decimal('10'), delivery_days=3,
+        )
+        cls.buyers = [
+            User.objects.create_user(f'buyer{i}', f'buyer{i}@example.com', 'password123') for i in range(3)
+        ]
+
+    def assert_summary(self, obj, histogram, average):
+        obj.refresh_from_db()
+        self.assertEqual(obj.rating_histogram, {value: histogram.get(value, 0) for value in range(1, 6)})
+        self.assertEqual(obj.rating_count, sum(histogram.values()))
+        self.assertEqual(obj.rating_average, Decimal(average))
+
+    def test_create_update_and_delete_keep_the_summaries_in_sync(self):
+        first = GigRating.objects.create(gig=self.gig, buyer=self.buyers[0], rating=5)
+        GigRating.objects.create(gig=self.gig, buyer=self.buyers[1], rating=2)
+        self.assert_summary(self.gig, {5: 1, 2: 1}, '3.50')
+        self.assert_summary(self.seller, {5: 1, 2: 1}, '3.50')
+
+        first.rating = 4
+        first.save()
+        self.assert_summary(self.gig, {4: 1, 2: 1}, '3.00')
+
+        first.delete()
+        self.assert_summary(self.gig, {2: 1}, '2.00')
+        self.assert_summary(self.seller, {2: 1}, '2.00')
+
+    def test_order_ratings_count_for_the_gig_and_its_seller(self):
+        order = Order.objects.create(
+            buyer=self.buyers[2], seller=self.seller_user, gig=self.gig, package=self.package,
+            description='Order', total_amount=Decimal('10'),
+        )
+        rating = OrderRating.objects.create(order=order, buyer=self.buyers[2], seller=self.seller_user, rating=3)
+        self.assert_summary(self.gig, {3: 1}, '3.00')
+        self.assert_summary(self.seller, {3: 1}, '3.00')
+        rating.delete()
+        self.assert_summary(self.seller, {}, '0.00')
+
+    def test_rebuild_command_restores_drifted_summaries(self):
+        GigRating.objects.create(gig=self.gig, buyer=self.buyers[0], rating=5)
+        GigRating.objects.create(gig=self.gig, buyer=self.buyers[1], rating=4)
+        Gig.objects.filter(pk=self.gig.pk).update(rating_count=7, rating_5_count=7, rating_average=Decimal('1.00'))
+        SellerProfile.objects.filter(pk=self.seller.pk).update(rating_count=0, rating_4_count=0, rating_5_count=0)
+
+        call_command('rebuild_rating_aggregates', chunk_size=1, stdout=StringIO())
+        self.assert_summary(self.gig, {5: 1, 4: 1}, '4.50')
+        self.assert_summary(self.seller, {5: 1, 4: 1}, '4.50')
@@ -11,7 +11,7 @@ const useFetchMyGigs = () => {
   const fetchMyGigs = useCallback(async () => {
     try {
       const response = await api.get(GET_MY_GIGS_ROUTE);
-      setMyGigs(response.data);
+      setMyGigs(response.data.results);
     } catch (err) {
       setError(err?.response?.data || "Failed to fetch gigs");
     } finally {
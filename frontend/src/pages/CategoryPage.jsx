@@ -25,7 +25,7 @@ const CategoryPage = () => {
       setLoading(true);
       try {
         const response = await api.get(`/gigs/by-category/${categoryId}/`);
-        setGigs(response.data);
+        setGigs(response.data.results);
       } catch (error) {
         console.error("Error fetching gigs:", error);
         setGigs([]);
@@ -27,7 +27,7 @@ const SearchResults = () => {
           setSearchResults(response.data.results);
         } else if (categoryId) {
           response = await api.get(`/gigs/by-category/${categoryId}/`);
-          setSearchResults(response.data);
+          setSearchResults(response.data.results);
         } else {
           setSearchResults([]);
         }
@@ -138,13 +138,10 @@ const SearchResults = () => {
                   <h3 className="text-lg font-semibold text-gray-800 mb-2 line-clamp-2">
                     {gig.title}
                   </h3>
-                  <p className="text-gray-600 text-sm mb-4 line-clamp-2">
-                    {gig.description}
-                  </p>
                   <div className="flex justify-between items-center">
                     <span className="text-gray-500 text-sm">Starting at</span>
                     <span className="text-xl font-bold text-gray-800">
-                      ${gig.packages?.[0]?.price || 0}
+                      ${gig.min_price || 0}
                     </span>
                   </div>
                 </div>